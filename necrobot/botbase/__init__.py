@@ -45,7 +45,12 @@ cmd_admin
     exception
     botbase/
         commandtype
+        necroevent
         necrobot
+    util/
+        outbox
+        timerwheel
+        topicupdater
 cmd_all
     config
     botbase/
@@ -85,12 +90,18 @@ necrobot
     botbase/
         command
         manager
+        necroevent
         server
     util/
         console
+        outbox
         singleton
+        writebehind
 necroevent
-    util
+    util/
+        console
+        journal
+        singleton
 server
     config
 """
\ No newline at end of file
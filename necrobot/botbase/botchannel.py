@@ -4,6 +4,8 @@ this channel.
 """
 
 import discord
+import unittest
+from typing import Dict, List, Optional
 
 from necrobot.botbase import cmd_all
 from necrobot.util import server
@@ -11,7 +13,10 @@ from necrobot.util import server
 
 class BotChannel(object):
     def __init__(self):
-        self.channel_commands = []     # the list of command.CommandType that can be called on this BotChannel
+        self._channel_commands = []     # the list of command.CommandType that can be called on this BotChannel
+        self._command_index = None      # type: Optional[Dict[str, List]]
+        self._command_index_sizes = None
+        self._all_commands = []
         self.default_commands = [
             cmd_all.ForceCommand(self),
             cmd_all.Help(self),
@@ -22,9 +27,24 @@ class BotChannel(object):
     def client(self) -> discord.Client:
         return server.client
 
+    @property
+    def channel_commands(self) -> list:
+        return self._channel_commands
+
+    @channel_commands.setter
+    def channel_commands(self, commands: list) -> None:
+        self._channel_commands = commands
+        self._command_index = None
+
     @property
     def all_commands(self):
-        return self.channel_commands + self.default_commands
+        self._check_command_index()
+        return self._all_commands
+
+    def get_command_types(self, name: str) -> list:
+        """The CommandTypes on this channel that the given name calls, in the order they should be executed."""
+        self._check_command_index()
+        return self._command_index.get(name, [])
 
     def refresh(self, channel: discord.TextChannel) -> None:
         """Called on Necrobot.refresh()
@@ -40,13 +60,59 @@ class BotChannel(object):
         """Whether the user can access admin commands for this channel"""
         return server.is_admin(discord_member) or self._virtual_is_admin(discord_member)
 
+    def on_message(self, message: discord.Message) -> None:
+        """Called for every message posted in the channel, including the bot's own, before any command in it is
+        executed. Override this to track activity in the channel.
+        """
+        pass
+
     async def execute(self, command) -> None:
         """Attempts to execute the given command (if a command of its type is in channel_commands)"""
-        for cmd_type in self.channel_commands:
-            await cmd_type.execute(command)
-        for cmd_type in self.default_commands:
+        for cmd_type in self.get_command_types(command.command):
             await cmd_type.execute(command)
 
+    def _check_command_index(self) -> None:
+        # The index is rebuilt when channel_commands is reassigned, or when either list is modified in-place (which
+        # some channels do once, after creating their commands)
+        sizes = (len(self._channel_commands), len(self.default_commands))
+        if self._command_index is not None and sizes == self._command_index_sizes:
+            return
+
+        self._all_commands = self._channel_commands + self.default_commands
+        self._command_index = dict()
+        for cmd_type in self._all_commands:
+            for name in cmd_type.command_name_list:
+                cmd_types = self._command_index.setdefault(name, [])
+                if cmd_type not in cmd_types:
+                    cmd_types.append(cmd_type)
+        self._command_index_sizes = sizes
+
     def _virtual_is_admin(self, discord_member: discord.Member) -> bool:
         """Override this to add channel-specific admins."""
         return False
+
+
+class TestBotChannel(unittest.TestCase):
+    class FakeCommandType(object):
+        def __init__(self, *names):
+            self.command_name_list = names
+            self.calls = 0
+
+        async def execute(self, cmd):
+            if cmd.command in self.command_name_list:
+                self.calls += 1
+
+    def test_index(self):
+        bot_channel = BotChannel()
+        make = TestBotChannel.FakeCommandType('make', 'm')
+        bot_channel.channel_commands = [make]
+        self.assertEqual(bot_channel.get_command_types('m'), [make])
+        self.assertEqual(len(bot_channel.all_commands), len(bot_channel.default_commands) + 1)
+
+        enter = TestBotChannel.FakeCommandType('enter', 'join')
+        bot_channel.channel_commands.append(enter)
+        self.assertEqual(bot_channel.get_command_types('join'), [enter])
+
+        bot_channel.channel_commands = [enter]
+        self.assertEqual(bot_channel.get_command_types('make'), [])
+        self.assertEqual(bot_channel.get_command_types('help'), [bot_channel.default_commands[1]])
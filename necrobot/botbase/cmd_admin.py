@@ -1,6 +1,13 @@
+import datetime
+
 import necrobot.exception
 from necrobot.botbase.commandtype import CommandType
+from necrobot.botbase import necroevent
+from necrobot.botbase.necroevent import NEDispatch
 from necrobot.botbase.necrobot import Necrobot
+from necrobot.util import outbox
+from necrobot.util import timerwheel
+from necrobot.util import topicupdater
 
 
 class Die(CommandType):
@@ -33,6 +40,96 @@ class RedoInit(CommandType):
         await Necrobot().redo_init()
 
 
+class EventStats(CommandType):
+    def __init__(self, bot_channel):
+        CommandType.__init__(self, bot_channel, 'eventstats')
+        self.help_text = 'Show queue depths, processing times and errors for each event subscriber.'
+        self.admin_only = True
+
+    @property
+    def short_help_text(self):
+        return 'Show event subscriber statistics.'
+
+    async def _do_execute(self, cmd):
+        text = ''
+        for stats in NEDispatch().get_stats():
+            text += '{0:<16} n={1:<7} err={2:<4} mean={3:>8.2f} maxq={4:<4} blocked={5} ({6:.0f} ms)\n'.format(
+                stats.name,
+                stats.processed,
+                stats.errors,
+                stats.mean_process_ms,
+                stats.max_depth,
+                stats.blocked,
+                stats.blocked_ms
+            )
+
+        if not text:
+            await cmd.channel.send('No event subscribers.')
+            return
+        await cmd.channel.send('```\n{0}```'.format(text))
+
+
+class OutboxStats(CommandType):
+    def __init__(self, bot_channel):
+        CommandType.__init__(self, bot_channel, 'outboxstats')
+        self.help_text = 'Show how many lines of text the rooms have queued, and how many messages they took to send.'
+        self.admin_only = True
+
+    @property
+    def short_help_text(self):
+        return 'Show outbound message statistics.'
+
+    async def _do_execute(self, cmd):
+        stats = outbox.get_stats()
+        waiting = sum(len(channel_outbox) for channel_outbox in outbox.get_outboxes())
+        await cmd.channel.send(
+            '```\nlines={0} urgent={1} messages={2} merged={3} failed={4} waiting={5}\n```'.format(
+                stats.lines,
+                stats.urgent,
+                stats.messages,
+                stats.merged,
+                stats.failed,
+                waiting
+            )
+        )
+
+
+class RecentEvents(CommandType):
+    def __init__(self, bot_channel):
+        CommandType.__init__(self, bot_channel, 'recentevents')
+        self.help_text = 'Show the most recently published events (including those from before the last restart), ' \
+                         'with their arguments. Use `.recentevents N` to show the last N events (default 15).'
+        self.admin_only = True
+
+    @property
+    def short_help_text(self):
+        return 'Show recent events.'
+
+    async def _do_execute(self, cmd):
+        num_events = 15
+        if len(cmd.args) == 1:
+            try:
+                num_events = int(cmd.args[0])
+            except ValueError:
+                await cmd.channel.send('Error: Couldn\'t parse {0} as a number of events.'.format(cmd.args[0]))
+                return
+
+        records = necroevent.recent_records()[-num_events:] if num_events > 0 else []
+        if not records:
+            await cmd.channel.send('No recent events.')
+            return
+
+        text = ''
+        for record in records:
+            line = '{0} {1:<16} {2}'.format(
+                datetime.datetime.utcfromtimestamp(record['t']).strftime('%m-%d %H:%M:%S'),
+                record['ne'],
+                ' '.join('{0}={1}'.format(k, v) for k, v in record['args'].items())
+            )
+            text += line[:110] + '\n'
+        await cmd.channel.send('```\n{0}```'.format(text[:1900]))
+
+
 class RaiseException(CommandType):
     def __init__(self, bot_channel):
         CommandType.__init__(self, bot_channel, 'raiseexception')
@@ -42,3 +139,59 @@ class RaiseException(CommandType):
 
     async def _do_execute(self, cmd):
         raise necrobot.exception.NecroException('Raised by RaiseException.')
+
+
+class Timers(CommandType):
+    def __init__(self, bot_channel):
+        CommandType.__init__(self, bot_channel, 'timers')
+        self.help_text = 'Show the pending timers on the timer wheel, by name, and the wheel\'s statistics.'
+        self.admin_only = True
+
+    @property
+    def short_help_text(self):
+        return 'Show pending timers.'
+
+    async def _do_execute(self, cmd):
+        wheel = timerwheel.get_wheel()
+        counts = dict()
+        next_due = dict()
+        for handle in wheel.pending():
+            counts[handle.name] = counts.get(handle.name, 0) + 1
+            if handle.name not in next_due:
+                next_due[handle.name] = handle.time_remaining
+
+        text = ''
+        for name in sorted(counts.keys()):
+            text += '{0:<20} n={1:<5} next in {2:.1f} s\n'.format(name, counts[name], next_due[name])
+        text += 'scheduled={0} fired={1} errors={2} wakeups={3}\n'.format(
+            wheel.num_scheduled,
+            wheel.num_fired,
+            wheel.num_errors,
+            wheel.num_wakeups
+        )
+        await cmd.channel.send('```\n{0}```'.format(text))
+
+
+class TopicStats(CommandType):
+    def __init__(self, bot_channel):
+        CommandType.__init__(self, bot_channel, 'topicstats')
+        self.help_text = 'Show how many channel topic edits were requested, made, coalesced, skipped and failed, and ' \
+                         'how many channels have an edit waiting.'
+        self.admin_only = True
+
+    @property
+    def short_help_text(self):
+        return 'Show channel topic edit statistics.'
+
+    async def _do_execute(self, cmd):
+        updater = topicupdater.get_updater()
+        await cmd.channel.send(
+            '```\nrequested={0} edits={1} coalesced={2} unchanged={3} failed={4} waiting={5}\n```'.format(
+                updater.num_requested,
+                updater.num_edits,
+                updater.num_coalesced,
+                updater.num_unchanged,
+                updater.num_failed,
+                len(updater)
+            )
+        )
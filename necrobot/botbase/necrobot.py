@@ -6,11 +6,14 @@ from necrobot.test import msgqueue
 
 from necrobot.util import server
 from necrobot.util import console
+from necrobot.util import outbox
+from necrobot.util import writebehind
 
 # from necrobot.botbase.botchannel import BotChannel
 from necrobot.config import Config
 from necrobot.botbase.command import Command, TestCommand
 from necrobot.botbase.manager import Manager
+from necrobot.botbase.necroevent import NEDispatch
 from necrobot.util.singleton import Singleton
 
 
@@ -127,6 +130,9 @@ class Necrobot(object, metaclass=Singleton):
         """Called on shutdown"""
         for manager in self._managers:
             await manager.close()
+        await NEDispatch().join()
+        await outbox.flush_all()
+        await writebehind.flush()
 
     async def logout(self) -> None:
         """Log out of discord"""
@@ -186,12 +192,63 @@ class Necrobot(object, metaclass=Singleton):
             if Config.testing():
                 await msgqueue.send_message(message)
 
+            if message.channel in self._bot_channels:
+                self._bot_channels[message.channel].on_message(message)
+
             if message.author.id == self.client.user.id:
                 return
 
             cmd = Command(message)
             await self._execute(cmd)
 
+        # Keep server's name indexes current
+        @client.event
+        async def on_member_join(member: discord.Member):
+            server.index_member(member)
+
+        @client.event
+        async def on_member_remove(member: discord.Member):
+            server.unindex_member(member)
+
+        # noinspection PyUnusedLocal
+        @client.event
+        async def on_member_update(member_before: discord.Member, member_after: discord.Member):
+            server.index_member(member_after)
+
+        # noinspection PyUnusedLocal
+        @client.event
+        async def on_user_update(user_before: discord.User, user_after: discord.User):
+            server.index_user(user_after)
+
+        @client.event
+        async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+            server.index_channel(channel)
+
+        @client.event
+        async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+            server.unindex_channel(channel)
+
+        # noinspection PyUnusedLocal
+        @client.event
+        async def on_guild_channel_update(
+                channel_before: discord.abc.GuildChannel,
+                channel_after: discord.abc.GuildChannel
+        ):
+            server.index_channel(channel_after)
+
+        @client.event
+        async def on_guild_role_create(role: discord.Role):
+            server.index_role(role)
+
+        @client.event
+        async def on_guild_role_delete(role: discord.Role):
+            server.unindex_role(role)
+
+        # noinspection PyUnusedLocal
+        @client.event
+        async def on_guild_role_update(role_before: discord.Role, role_after: discord.Role):
+            server.index_role(role_after)
+
         # noinspection PyUnusedLocal
         @client.event
         async def on_error(event: str, *args, **kwargs):
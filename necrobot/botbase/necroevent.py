@@ -1,6 +1,33 @@
-from necrobot.util import console
+"""
+A publish-subscribe event bus between bot components (e.g. a MatchRoom publishes 'end_match', and the CondorMgr updates
+the GSheet).
+
+Each subscriber has its own bounded queue of events and its own worker task, so that a slow subscriber doesn't delay
+the publisher or other subscribers; events are delivered to each subscriber in the order they were published.
+`publish` returns once the event is queued for every subscriber to its type. If a subscriber's queue is full,
+`publish` waits for room (and this is counted in the subscriber's stats). Use `publish_and_wait` to also wait until
+every subscriber has processed the event.
+
+Published events are also written to the default journal (see necrobot.util.journal), if one is open, as an audit
+trail of what the bot did; domain objects are written as their IDs. The last RECENT_EVENTS of them are kept through
+journal compaction (see racejournal.compact) and restarts (see `load`), and shown by the `.recentevents` admin
+command, so that e.g. the events leading up to a crash can be read back after the restart.
+"""
+
+import asyncio
+import collections
+import time
+import unittest
+from typing import Dict, Iterable, List, Optional
+
+from necrobot.util import console, journal
 from necrobot.util.singleton import Singleton
 
+DEFAULT_QUEUE_SIZE = 256
+RECENT_EVENTS = 100
+
+_recent_records = collections.deque(maxlen=RECENT_EVENTS)    # type: collections.deque
+
 
 class NecroEvent(object):
     def __init__(self, event_type: str, **kwargs):
@@ -11,11 +38,78 @@ class NecroEvent(object):
         return self._argdict[item]
 
 
+class SubscriberStats(object):
+    def __init__(self, name: str):
+        self.name = name
+        self.queued = 0             # Events queued for this subscriber
+        self.processed = 0          # Events processed (including those that raised)
+        self.errors = 0             # Events whose processing raised an exception
+        self.max_depth = 0          # Largest number of events waiting in the queue
+        self.blocked = 0            # Number of publishes that waited because the queue was full
+        self.blocked_ms = 0.0       # Total time publishers spent waiting for room
+        self.process_ms = 0.0       # Total time spent processing events
+
+    @property
+    def mean_process_ms(self) -> float:
+        return self.process_ms / self.processed if self.processed else 0.0
+
+
+class _Subscription(object):
+    def __init__(self, subscriber, queue_size: int):
+        self.subscriber = subscriber
+        self.queue = asyncio.Queue(maxsize=queue_size)  # type: asyncio.Queue
+        self.stats = SubscriberStats(type(subscriber).__name__)
+        self.worker = None                              # type: Optional[asyncio.Task]
+
+    async def put(self, ev: NecroEvent, done: Optional[asyncio.Future]) -> None:
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.ensure_future(self._work())
+
+        if self.queue.full():
+            self.stats.blocked += 1
+            start = time.monotonic()
+            await self.queue.put((ev, done))
+            self.stats.blocked_ms += 1000 * (time.monotonic() - start)
+        else:
+            self.queue.put_nowait((ev, done))
+        self.stats.queued += 1
+        self.stats.max_depth = max(self.stats.max_depth, self.queue.qsize())
+
+    async def _work(self) -> None:
+        while True:
+            ev, done = await self.queue.get()
+            start = time.monotonic()
+            try:
+                await self.subscriber.ne_process(ev)
+            except Exception as e:
+                self.stats.errors += 1
+                console.error('Error processing event {0} in {1}: {2}'.format(ev.event_type, self.stats.name, e))
+            finally:
+                self.stats.processed += 1
+                self.stats.process_ms += 1000 * (time.monotonic() - start)
+                if done is not None and not done.done():
+                    done.set_result(None)
+                self.queue.task_done()
+
+
 class NEDispatch(object, metaclass=Singleton):
     def __init__(self):
-        self._subscribers = list()
+        self._subscriptions = list()    # type: List[_Subscription]
+        self._by_event_type = dict()    # type: Dict[str, List[_Subscription]]
+        self._all_events = list()       # type: List[_Subscription]
 
-    def subscribe(self, subscriber):
+    def subscribe(self, subscriber, event_types: Iterable[str] = None, queue_size: int = DEFAULT_QUEUE_SIZE):
+        """Subscribe to events.
+
+        Parameters
+        ----------
+        subscriber
+            An object with a coroutine method ne_process(NecroEvent).
+        event_types: Iterable[str]
+            The event types to receive. If None, receive all events.
+        queue_size: int
+            The maximum number of events waiting for this subscriber before publishers must wait.
+        """
         if 'ne_process' not in type(subscriber).__dict__:
             console.warning(
                 "Object of type {0} tried to subscribe to NEDispatch, but doesn't implement ne_process.".format(
@@ -24,11 +118,151 @@ class NEDispatch(object, metaclass=Singleton):
             )
             return
 
-        self._subscribers.append(subscriber)
+        subscription = _Subscription(subscriber, queue_size)
+        self._subscriptions.append(subscription)
+        if event_types is None:
+            self._all_events.append(subscription)
+            for subscriptions in self._by_event_type.values():
+                subscriptions.append(subscription)
+        else:
+            for event_type in event_types:
+                if event_type not in self._by_event_type:
+                    self._by_event_type[event_type] = list(self._all_events)
+                self._by_event_type[event_type].append(subscription)
+
+    async def publish(self, event_type: str, **kwargs) -> None:
+        """Queue the event for every subscriber to its type, without waiting for it to be processed."""
+        await self._publish(event_type, kwargs, wait=False)
 
-    async def publish(self, event_type: str, **kwargs):
+    async def publish_and_wait(self, event_type: str, **kwargs) -> None:
+        """Queue the event for every subscriber to its type, and wait until all of them have processed it (and so
+        also every event published before it).
+        """
+        await self._publish(event_type, kwargs, wait=True)
+
+    async def join(self) -> None:
+        """Wait until every queued event has been processed."""
+        for subscription in self._subscriptions:
+            await subscription.queue.join()
+
+    def get_stats(self) -> List[SubscriberStats]:
+        return [subscription.stats for subscription in self._subscriptions]
+
+    async def _publish(self, event_type: str, kwargs: dict, wait: bool) -> None:
         ev = NecroEvent(event_type, **kwargs)
-        console.info('Processing event of type {0}.'.format(ev.event_type))
+        console.info('Publishing event of type %s.', ev.event_type)
+        _record(event_type, kwargs)
+
+        subscriptions = self._by_event_type.get(event_type, self._all_events)
+        done_futures = []
+        for subscription in subscriptions:
+            done = asyncio.get_event_loop().create_future() if wait else None
+            await subscription.put(ev, done)
+            if done is not None:
+                done_futures.append(done)
+
+        if done_futures:
+            await asyncio.gather(*done_futures)
+
+
+def load(records: Iterable[dict]) -> None:
+    """Take the published-event records from the given journal records, e.g. those read from the journal on startup,
+    as the recent events.
+    """
+    _recent_records.clear()
+    _recent_records.extend(record for record in records if 'ne' in record)
+
+
+def recent_records() -> List[dict]:
+    """The journal records of the last RECENT_EVENTS published events, oldest first. Each is a dict {'ne': the event
+    type, 't': the time it was published (as from time.time()), 'args': its arguments}.
+    """
+    return list(_recent_records)
+
+
+def _record(event_type: str, kwargs: dict) -> None:
+    record = {'ne': event_type, 't': time.time(), 'args': {k: _journal_value(v) for k, v in kwargs.items()}}
+    _recent_records.append(record)
+    the_journal = journal.get_journal()
+    if the_journal is not None:
+        the_journal.append(record)
+
+
+def _journal_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    for id_attr in ['match_id', 'user_id', 'race_id']:
+        if hasattr(value, id_attr):
+            return {id_attr: getattr(value, id_attr)}
+    return type(value).__name__
+
+
+class TestNEDispatch(unittest.TestCase):
+    class Subscriber(object):
+        def __init__(self, delay: float = 0):
+            self.delay = delay
+            self.events = []
+
+        async def ne_process(self, ev: NecroEvent):
+            await asyncio.sleep(self.delay)
+            if ev.event_type == 'bad':
+                raise RuntimeError('bad event')
+            self.events.append(ev.event_type)
+
+    def setUp(self):
+        # Not the singleton, so that tests don't share subscribers
+        self.dispatch = object.__new__(NEDispatch)
+        NEDispatch.__init__(self.dispatch)
+
+    def test_topics(self):
+        slow = TestNEDispatch.Subscriber(delay=0.02)
+        fast = TestNEDispatch.Subscriber()
+        everything = TestNEDispatch.Subscriber()
+        self.dispatch.subscribe(slow, event_types=['a', 'b'])
+        self.dispatch.subscribe(fast, event_types=['b'])
+        self.dispatch.subscribe(everything)
+
+        async def run():
+            start = time.monotonic()
+            for event_type in ['a', 'b', 'c', 'bad', 'b']:
+                await self.dispatch.publish(event_type)
+            self.assertLess(time.monotonic() - start, 0.02)
+            await self.dispatch.publish_and_wait('a')
+            self.assertEqual(slow.events, ['a', 'b', 'b', 'a'])
+            await self.dispatch.join()
+
+        asyncio.run(run())
+        self.assertEqual(fast.events, ['b', 'b'])
+        self.assertEqual(everything.events, ['a', 'b', 'c', 'b', 'a'])
+        self.assertEqual(self.dispatch.get_stats()[2].errors, 1)
+
+    def test_backpressure(self):
+        slow = TestNEDispatch.Subscriber(delay=0.01)
+        self.dispatch.subscribe(slow, queue_size=2)
+
+        async def run():
+            for _ in range(5):
+                await self.dispatch.publish('a')
+            await self.dispatch.join()
+
+        asyncio.run(run())
+        stats = self.dispatch.get_stats()[0]
+        self.assertEqual(slow.events, ['a'] * 5)
+        self.assertGreater(stats.blocked, 0)
+        self.assertLessEqual(stats.max_depth, 2)
+
+    def test_recent_records(self):
+        class Match(object):
+            match_id = 7
+
+        load([{'k': 1, 'e': 'SNAPSHOT'}, {'ne': 'notify', 't': 0.0, 'args': {'message': 'hi'}}])
+        self.assertEqual([record['ne'] for record in recent_records()], ['notify'])
+
+        async def run():
+            await self.dispatch.publish('end_match', match=Match(), winner=None)
 
-        for subber in self._subscribers:
-            await subber.ne_process(ev)
+        asyncio.run(run())
+        record = recent_records()[-1]
+        self.assertEqual(record['ne'], 'end_match')
+        self.assertEqual(record['args'], {'match': {'match_id': 7}, 'winner': None})
+        load([])
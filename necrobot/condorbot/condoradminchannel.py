@@ -1,5 +1,6 @@
-from necrobot.botbase import cmd_seedgen
+from necrobot.botbase import cmd_admin, cmd_seedgen
 from necrobot.botbase.botchannel import BotChannel
+from necrobot.database import cmd_database
 from necrobot.gsheet import cmd_sheet
 from necrobot.league import cmd_league
 from necrobot.speedrun import cmd_speedrun
@@ -15,6 +16,14 @@ class CondorAdminChannel(BotChannel):
     def __init__(self):
         BotChannel.__init__(self)
         self.channel_commands = [
+            cmd_admin.EventStats(self),
+            cmd_admin.OutboxStats(self),
+            cmd_admin.RecentEvents(self),
+            cmd_admin.Timers(self),
+
+            cmd_database.DBMigrate(self),
+            cmd_database.DBStats(self),
+
             cmd_league.CloseAllMatches(self),
             cmd_league.CloseFinished(self),
             cmd_league.Deadline(self),
@@ -44,6 +53,11 @@ class CondorAdminChannel(BotChannel):
             cmd_user.RTMP(self),
             cmd_user.UserInfo(self),
 
+            cmd_test.TestBenchDispatch(self),
+            cmd_test.TestBenchJournal(self),
+            cmd_test.TestBenchMemory(self),
+            cmd_test.TestBenchPrepared(self),
+            cmd_test.TestBenchRecordRace(self),
             cmd_test.TestCreateCategory(self),
             cmd_test.TestOverwriteGSheet(self),
         ]
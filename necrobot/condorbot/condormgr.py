@@ -23,7 +23,12 @@ class CondorMgr(Manager, metaclass=Singleton):
         self._notifications_channel = None
         self._schedule_channel = None
         self._client = None
-        NEDispatch().subscribe(self)
+        NEDispatch().subscribe(
+            self,
+            event_types=[
+                'end_match', 'match_alert', 'notify', 'schedule_match', 'set_cawmentary', 'set_vod', 'submitted_run'
+            ]
+        )
 
     async def initialize(self):
         self._main_channel = server.find_channel(channel_name=Config.MAIN_CHANNEL_NAME)
@@ -30,6 +30,13 @@ RACE_RESULTS_CHANNEL_NAME: str
 
 Database
 --------
+DB_BACKEND: str
+    The storage backend: 'mysql', or 'sqlite' to run against a local SQLite database instead (for offline testing
+    and benchmarking; see necrobot.database.sqlitebackend).
+SQLITE_DB_FILE: str
+    The SQLite database file, if DB_BACKEND is 'sqlite'. Created (with the necrobot schema) if it doesn't exist.
+SQLITE_FIXTURE_FILE: str
+    A JSON file of rows to load into the SQLite database when it is created. If empty, the database starts empty.
 MYSQL_DB_HOST: str
     The database hostname.
 MYSQL_DB_USER: str
@@ -38,6 +45,20 @@ MYSQL_DB_PASSWD: str
     The database password.
 MYSQL_DB_NAME: str
     The default schema name.
+MYSQL_DB_POOL_SIZE: int
+    The number of database connections (and worker threads) to keep in each connection pool.
+MYSQL_DB_REPLICA_HOST: str
+    The hostname of a read replica of the database. Read-only queries are sent here. If empty, all
+    queries go to MYSQL_DB_HOST.
+MYSQL_DB_REPLICA_PORT: int
+    The port of the read replica.
+MYSQL_SLOW_QUERY_MS: int
+    Statements that take at least this many milliseconds are written to the log as slow queries.
+MYSQL_PREPARED_CACHE_SIZE: int
+    The number of server-side prepared statements to keep open on each database connection.
+DB_COMMIT_DELAY_MS: int
+    The number of milliseconds a changed Match or NecroUser waits before it is written to the database, so that
+    several changes in quick succession are written at once (see necrobot.util.writebehind).
 
 GSheet
 ------
@@ -56,6 +77,16 @@ LEAGUE_NAME: str
 LOG_DIRECTORY: str
     The directory to write match logs to.
 
+Logging
+-------
+LOG_ROTATE_BYTES: int
+    The size at which a bot log file is rotated into a compressed archive. If 0, log files aren't rotated by size.
+LOG_ROTATE_HOURS: int
+    The age at which a bot log file is rotated into a compressed archive. If 0, log files aren't rotated by age.
+LOG_RETAIN_BYTES: int
+    The total size of each bot's log files and archives, past which the oldest archives are deleted. If 0, archives
+    are never deleted.
+
 Login
 -----
 LOGIN_TOKEN: str
@@ -85,6 +116,11 @@ INCREMENTAL_COUNTDOWN_START: int
     The second at which to start counting down second-by-second.
 FINALIZE_TIME_SEC: int
     The number of seconds after the end of the race before its data is recorded.
+JOURNAL_FSYNC_MS: int
+    The minimum number of milliseconds between syncs of the race journal to disk (see necrobot.util.journal).
+JOURNAL_COMPACT_EVENTS: int
+    The number of race events to write to the journal between compactions, which replace the journal with a
+    snapshot of each live race.
 
 RaceRooms
 ---------
@@ -99,6 +135,24 @@ NO_ENTRANTS_CLEANUP_WARNING: datetime.timedelta
     deleted from having zero entrants.
 RACE_POKE_DELAY: int
     The minimum number of seconds between .poke mentions.
+TOPIC_DEBOUNCE_MS: int
+    The number of milliseconds to wait after a change to a room's leaderboard before editing the channel topic, so
+    that a burst of changes costs one edit (see necrobot.util.topicupdater).
+TOPIC_EDITS_PER_PERIOD: int
+    The number of edits to a channel's topic Discord allows per TOPIC_EDIT_PERIOD_SEC.
+TOPIC_EDIT_PERIOD_SEC: int
+    The length, in seconds, of Discord's rate-limit window for channel topic edits.
+OUTBOX_BATCH_MS: int
+    The number of milliseconds a room waits for more lines of text to merge into one message, before posting them
+    (see necrobot.util.outbox).
+
+Users
+-----
+USER_CACHE_SIZE: int
+    The number of recently used NecroUsers to keep cached. Users still referenced elsewhere (e.g. by a live Race or
+    Match) stay cached regardless.
+USER_CACHE_TTL: int
+    The number of seconds an unused NecroUser stays cached.
 
 Vod recording
 -------------
@@ -147,10 +201,19 @@ class Config(object):
     SCHEDULE_CHANNEL_NAME = 'schedule'
 
     # Database --------------------------------------------------------------------------------
+    DB_BACKEND = 'mysql'
+    SQLITE_DB_FILE = 'data/necrobot.sqlite3'
+    SQLITE_FIXTURE_FILE = ''
     MYSQL_DB_HOST = 'localhost'
     MYSQL_DB_USER = 'root'
     MYSQL_DB_PASSWD = ''
     MYSQL_DB_NAME = 'necrobot'
+    MYSQL_DB_POOL_SIZE = int(4)
+    MYSQL_DB_REPLICA_HOST = ''
+    MYSQL_DB_REPLICA_PORT = int(3306)
+    MYSQL_SLOW_QUERY_MS = int(250)
+    MYSQL_PREPARED_CACHE_SIZE = int(32)
+    DB_COMMIT_DELAY_MS = int(200)
 
     # GSheet ----------------------------------------------------------------------------------
     OAUTH_CREDENTIALS_JSON = 'data/necrobot-service-acct.json'
@@ -162,6 +225,11 @@ class Config(object):
     LEAGUE_NAME = ''
     LOG_DIRECTORY = 'logs'
 
+    # Logging ---------------------------------------------------------------------------------
+    LOG_ROTATE_BYTES = int(16*1024*1024)
+    LOG_ROTATE_HOURS = int(24)
+    LOG_RETAIN_BYTES = int(1024*1024*1024)
+
     # Login -----------------------------------------------------------------------------------
     LOGIN_TOKEN = ''
     SERVER_ID = None    # type: Optional[int]
@@ -177,6 +245,8 @@ class Config(object):
     UNPAUSE_COUNTDOWN_LENGTH = int(3)
     INCREMENTAL_COUNTDOWN_START = int(3)
     FINALIZE_TIME_SEC = int(30)
+    JOURNAL_FSYNC_MS = int(50)
+    JOURNAL_COMPACT_EVENTS = int(1000)
     RACE_CHANNEL_CATEGORY_NAME = "Race rooms"
 
     # RaceRooms -------------------------------------------------------------------------------
@@ -184,6 +254,14 @@ class Config(object):
     NO_ENTRANTS_CLEANUP = datetime.timedelta(minutes=2)
     NO_ENTRANTS_CLEANUP_WARNING = datetime.timedelta(minutes=1, seconds=30)
     RACE_POKE_DELAY = int(10)
+    TOPIC_DEBOUNCE_MS = int(2000)
+    TOPIC_EDITS_PER_PERIOD = int(2)
+    TOPIC_EDIT_PERIOD_SEC = int(600)
+    OUTBOX_BATCH_MS = int(250)
+
+    # Users -----------------------------------------------------------------------------------
+    USER_CACHE_SIZE = int(2000)
+    USER_CACHE_TTL = int(3600)
 
     # Methods ---------------------------------------------------------------------------------
     @staticmethod
@@ -193,14 +271,34 @@ class Config(object):
             ['server_id', str(Config.SERVER_ID)],
             ['test_level', Config.DEBUG_LEVEL],
 
+            ['db_backend', Config.DB_BACKEND],
+            ['sqlite_db_file', Config.SQLITE_DB_FILE],
+            ['sqlite_fixture_file', Config.SQLITE_FIXTURE_FILE],
             ['mysql_db_host', Config.MYSQL_DB_HOST],
             ['mysql_db_user', Config.MYSQL_DB_USER],
             ['mysql_db_passwd', Config.MYSQL_DB_PASSWD],
             ['mysql_db_name', Config.MYSQL_DB_NAME],
+            ['mysql_db_pool_size', Config.MYSQL_DB_POOL_SIZE],
+            ['mysql_db_replica_host', Config.MYSQL_DB_REPLICA_HOST],
+            ['mysql_db_replica_port', Config.MYSQL_DB_REPLICA_PORT],
+            ['mysql_slow_query_ms', Config.MYSQL_SLOW_QUERY_MS],
+            ['mysql_prepared_cache_size', Config.MYSQL_PREPARED_CACHE_SIZE],
+            ['db_commit_delay_ms', Config.DB_COMMIT_DELAY_MS],
 
             ['main_channel_name', Config.MAIN_CHANNEL_NAME],
             ['match_category_name', Config.MATCH_CHANNEL_CATEGORY_NAME],
             ['league_name', Config.LEAGUE_NAME],
+            ['log_rotate_bytes', Config.LOG_ROTATE_BYTES],
+            ['log_rotate_hours', Config.LOG_ROTATE_HOURS],
+            ['log_retain_bytes', Config.LOG_RETAIN_BYTES],
+            ['journal_fsync_ms', Config.JOURNAL_FSYNC_MS],
+            ['journal_compact_events', Config.JOURNAL_COMPACT_EVENTS],
+            ['topic_debounce_ms', Config.TOPIC_DEBOUNCE_MS],
+            ['topic_edits_per_period', Config.TOPIC_EDITS_PER_PERIOD],
+            ['topic_edit_period_sec', Config.TOPIC_EDIT_PERIOD_SEC],
+            ['outbox_batch_ms', Config.OUTBOX_BATCH_MS],
+            ['user_cache_size', Config.USER_CACHE_SIZE],
+            ['user_cache_ttl', Config.USER_CACHE_TTL],
         ]
 
         with open(Config.CONFIG_FILE, 'w') as file:
@@ -224,14 +322,34 @@ def init(config_filename):
     defaults = {
         'login_token': '',
         'server_id': '',
+        'db_backend': 'mysql',
+        'sqlite_db_file': 'data/necrobot.sqlite3',
+        'sqlite_fixture_file': '',
         'mysql_db_host': 'localhost',
         'mysql_db_user': 'root',
         'mysql_db_passwd': '',
         'mysql_db_name': 'necrobot',
+        'mysql_db_pool_size': '4',
+        'mysql_db_replica_host': '',
+        'mysql_db_replica_port': '3306',
+        'mysql_slow_query_ms': '250',
+        'mysql_prepared_cache_size': '32',
+        'db_commit_delay_ms': '200',
         'league_name': '',
+        'log_rotate_bytes': str(16*1024*1024),
+        'log_rotate_hours': '24',
+        'log_retain_bytes': str(1024*1024*1024),
+        'journal_fsync_ms': '50',
+        'journal_compact_events': '1000',
+        'topic_debounce_ms': '2000',
+        'topic_edits_per_period': '2',
+        'topic_edit_period_sec': '600',
+        'outbox_batch_ms': '250',
         'test_level': '',
         'main_channel_name': 'necrobot_main',
         'match_category_name': 'Race Rooms',
+        'user_cache_size': '2000',
+        'user_cache_ttl': '3600',
         }
 
     with open(config_filename, 'r') as file:
@@ -248,14 +366,34 @@ def init(config_filename):
     Config.LOGIN_TOKEN = defaults['login_token']
     Config.SERVER_ID = int(defaults['server_id'])
 
+    Config.DB_BACKEND = defaults['db_backend'].lower()
+    Config.SQLITE_DB_FILE = defaults['sqlite_db_file']
+    Config.SQLITE_FIXTURE_FILE = defaults['sqlite_fixture_file']
     Config.MYSQL_DB_HOST = defaults['mysql_db_host']
     Config.MYSQL_DB_USER = defaults['mysql_db_user']
     Config.MYSQL_DB_PASSWD = defaults['mysql_db_passwd']
     Config.MYSQL_DB_NAME = defaults['mysql_db_name']
+    Config.MYSQL_DB_POOL_SIZE = int(defaults['mysql_db_pool_size'])
+    Config.MYSQL_DB_REPLICA_HOST = defaults['mysql_db_replica_host']
+    Config.MYSQL_DB_REPLICA_PORT = int(defaults['mysql_db_replica_port'])
+    Config.MYSQL_SLOW_QUERY_MS = int(defaults['mysql_slow_query_ms'])
+    Config.MYSQL_PREPARED_CACHE_SIZE = int(defaults['mysql_prepared_cache_size'])
+    Config.DB_COMMIT_DELAY_MS = int(defaults['db_commit_delay_ms'])
 
     Config.MAIN_CHANNEL_NAME = defaults['main_channel_name']
     Config.MATCH_CHANNEL_CATEGORY_NAME = defaults['match_category_name']
     Config.LEAGUE_NAME = defaults['league_name']
+    Config.LOG_ROTATE_BYTES = int(defaults['log_rotate_bytes'])
+    Config.LOG_ROTATE_HOURS = int(defaults['log_rotate_hours'])
+    Config.LOG_RETAIN_BYTES = int(defaults['log_retain_bytes'])
+    Config.JOURNAL_FSYNC_MS = int(defaults['journal_fsync_ms'])
+    Config.JOURNAL_COMPACT_EVENTS = int(defaults['journal_compact_events'])
+    Config.TOPIC_DEBOUNCE_MS = int(defaults['topic_debounce_ms'])
+    Config.TOPIC_EDITS_PER_PERIOD = int(defaults['topic_edits_per_period'])
+    Config.TOPIC_EDIT_PERIOD_SEC = int(defaults['topic_edit_period_sec'])
+    Config.OUTBOX_BATCH_MS = int(defaults['outbox_batch_ms'])
+    Config.USER_CACHE_SIZE = int(defaults['user_cache_size'])
+    Config.USER_CACHE_TTL = int(defaults['user_cache_ttl'])
 
     if defaults['test_level'] == '0':
         Config.DEBUG_LEVEL = DebugLevel.FULL_DEBUG
@@ -1,4 +1,3 @@
-import asyncio
 import datetime
 from enum import Enum
 
@@ -14,6 +13,7 @@ from necrobot.user.userprefs import UserPrefs
 from necrobot.util import racetime
 from necrobot.util import server
 from necrobot.util import strutil
+from necrobot.util import timerwheel
 from necrobot.util import timestr
 from necrobot.user import userdb
 from necrobot.util.necrodancer import level, seedgen
@@ -48,11 +48,12 @@ class Daily(object):
 
     def __init__(self, daily_type: DailyType):
         self._daily_type = daily_type
-        self._daily_update_future = asyncio.ensure_future(self._daily_update())
+        self._daily_update_timer = None
+        self._schedule_daily_update()
         self._leaderboard_channel = server.find_channel(channel_name=Config.DAILY_LEADERBOARDS_CHANNEL_NAME)
 
     def close(self):
-        self._daily_update_future.cancel()
+        self._daily_update_timer.cancel()
 
     @property
     def client(self) -> discord.Client:
@@ -357,12 +358,18 @@ class Daily(object):
                         await self.get_seed(self.today_number),
                         dailytype.character(self.daily_type, self.today_number)))
 
+    def _schedule_daily_update(self, min_delay: float = 0) -> None:
+        """Schedule _daily_update for just after the next daily begins"""
+        self._daily_update_timer = timerwheel.schedule(
+            max(self.time_until_next.total_seconds() + 1, min_delay),
+            self._daily_update,
+            name='daily-update'
+        )
+
     async def _daily_update(self) -> None:
         """Call DailyManager's on_new_daily coroutine when this daily rolls over"""
-        while True:
-            await asyncio.sleep(self.time_until_next.total_seconds() + 1)  # sleep until next daily
-            await self.on_new_daily()
-            await asyncio.sleep(120)  # buffer b/c i'm worried for some reason about idk
+        self._schedule_daily_update(min_delay=120)  # buffer b/c i'm worried for some reason about idk
+        await self.on_new_daily()
 
     @staticmethod
     def _format_as_timestr(td: datetime.timedelta) -> str:
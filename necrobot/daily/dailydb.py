@@ -9,7 +9,7 @@ from necrobot.database.dbconnect import DBConnect
 async def get_daily_seed(daily_id, daily_type):
     async with DBConnect(commit=False) as cursor:
         params = (daily_id, daily_type,)
-        cursor.execute(
+        await cursor.execute_prepared(
             """
             SELECT seed
             FROM dailies
@@ -22,7 +22,7 @@ async def get_daily_seed(daily_id, daily_type):
 async def get_daily_times(daily_id, daily_type):
     async with DBConnect(commit=False) as cursor:
         params = (daily_id, daily_type,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT users.discord_name,daily_runs.level,daily_runs.time
             FROM daily_runs 
@@ -37,7 +37,7 @@ async def get_daily_times(daily_id, daily_type):
 async def has_submitted_daily(user_id, daily_id, daily_type):
     async with DBConnect(commit=False) as cursor:
         params = (user_id, daily_id, daily_type,)
-        cursor.execute(
+        await cursor.execute_prepared(
             """
             SELECT user_id
             FROM daily_runs_uinfo
@@ -50,7 +50,7 @@ async def has_submitted_daily(user_id, daily_id, daily_type):
 async def has_registered_daily(user_id, daily_id, daily_type):
     async with DBConnect(commit=False) as cursor:
         params = (user_id, daily_id, daily_type,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT user_id
             FROM daily_runs_uinfo
@@ -63,7 +63,7 @@ async def has_registered_daily(user_id, daily_id, daily_type):
 async def register_daily(user_id, daily_id, daily_type, level=necrolevel.LEVEL_NOS, time=-1):
     async with DBConnect(commit=True) as cursor:
         params = (user_id, daily_id, daily_type, level, time,)
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO daily_runs
                 (user_id, daily_id, type, level, time)
@@ -81,7 +81,7 @@ async def register_daily(user_id, daily_id, daily_type, level=necrolevel.LEVEL_N
 async def registered_daily(user_id, daily_type):
     async with DBConnect(commit=False) as cursor:
         params = (user_id, daily_type,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT daily_id
             FROM daily_runs_uinfo
@@ -97,7 +97,7 @@ async def registered_daily(user_id, daily_type):
 async def submitted_daily(user_id, daily_type):
     async with DBConnect(commit=False) as cursor:
         params = (user_id, daily_type,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT daily_id 
             FROM daily_runs_uinfo 
@@ -113,7 +113,7 @@ async def submitted_daily(user_id, daily_type):
 async def delete_from_daily(user_id, daily_id, daily_type):
     async with DBConnect(commit=True) as cursor:
         params = (user_id, daily_id, daily_type,)
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE daily_runs_uinfo 
             SET level=-1 
@@ -125,7 +125,7 @@ async def delete_from_daily(user_id, daily_id, daily_type):
 async def create_daily(daily_id, daily_type, seed, message_id=0):
     async with DBConnect(commit=True) as cursor:
         params = (daily_id, daily_type, seed, message_id)
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO dailies 
             (daily_id, type, seed, msg_id) 
@@ -137,7 +137,7 @@ async def create_daily(daily_id, daily_type, seed, message_id=0):
 async def register_daily_message(daily_id, daily_type, message_id):
     async with DBConnect(commit=True) as cursor:
         params = (message_id, daily_id, daily_type,)
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE dailies 
             SET msg_id=%s 
@@ -149,7 +149,7 @@ async def register_daily_message(daily_id, daily_type, message_id):
 async def get_daily_message_id(daily_id, daily_type):
     async with DBConnect(commit=False) as cursor:
         params = (daily_id, daily_type,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT msg_id 
             FROM dailies 
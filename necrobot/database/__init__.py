@@ -1,18 +1,62 @@
 """
-Class for connecting to the MySQL database, as well as a utility class for database functions.
+Class for connecting to the MySQL database (or a local SQLite database, see sqlitebackend), as well as a utility
+class for database functions.
 
 
 Package Requirements
 --------------------
+botbase (for cmd_database only)
 util
 
 
 Dependencies
 ------------    
+cmd_database
+    botbase/
+        commandtype
+    database/
+        dbmigrate
+        querystats
+
+dbmigrate
+    config
+    database/
+        dbconnect
+    util/
+        console
+
 dbconnect
     config
+    database/
+        dbpool
+        querystats
+        sqlitebackend
+        stmtcache
     util/
         console
-        
+
+dbpool
+    database/
+        stmtcache
+
+dbstream
+    database/
+        dbconnect
+        querystats
+
 dbutil
+
+querystats
+    config
+    util/
+        console
+
+sqlitebackend
+    config
+    database/
+        dbpool
+    util/
+        console
+
+stmtcache
 """
\ No newline at end of file
@@ -0,0 +1,101 @@
+from necrobot.botbase.commandtype import CommandType
+from necrobot.database import dbmigrate
+from necrobot.database import querystats
+
+
+class DBMigrate(CommandType):
+    def __init__(self, bot_channel):
+        CommandType.__init__(self, bot_channel, 'dbmigrate')
+        self.help_text = '`.dbmigrate` creates any missing indexes and generated columns in the necrobot and league ' \
+                         'schemas, and shows the query plans of some common queries before and after. Use ' \
+                         '`.dbmigrate dryrun` to only show what would be created.'
+        self.admin_only = True
+
+    @property
+    def short_help_text(self):
+        return 'Create missing database indexes.'
+
+    async def _do_execute(self, cmd):
+        if len(cmd.args) > 1 or (len(cmd.args) == 1 and cmd.args[0].lower() != 'dryrun'):
+            await cmd.channel.send(
+                'Error: unrecognized arguments for `.dbmigrate`.'
+            )
+            return
+
+        dry_run = len(cmd.args) == 1
+        async with cmd.channel.typing():
+            report = await dbmigrate.migrate(dry_run=dry_run)
+
+        # Split the report over several messages, to stay under Discord's message length limit
+        text = ''
+        for line in report:
+            line = line if len(line) <= 1800 else line[:1797] + '...'
+            if len(text) + len(line) > 1800:
+                await cmd.channel.send('```\n{0}```'.format(text))
+                text = ''
+            text += line + '\n'
+        if text:
+            await cmd.channel.send('```\n{0}```'.format(text))
+
+
+class DBStats(CommandType):
+    def __init__(self, bot_channel):
+        CommandType.__init__(self, bot_channel, 'dbstats')
+        self.help_text = '`.dbstats [num_queries]` shows latency percentiles for the most expensive database ' \
+                         'queries (by total time), and for connection pool waits. Use `.dbstats reset` to clear ' \
+                         'the statistics.'
+        self.admin_only = True
+
+    @property
+    def short_help_text(self):
+        return 'Show database query latencies.'
+
+    async def _do_execute(self, cmd):
+        num_queries = 8
+        if len(cmd.args) == 1 and cmd.args[0].lower() == 'reset':
+            querystats.reset()
+            await cmd.channel.send('Database query statistics reset.')
+            return
+        elif len(cmd.args) == 1:
+            try:
+                num_queries = int(cmd.args[0])
+            except ValueError:
+                await cmd.channel.send(
+                    'Error: couldn\'t parse `{0}` as a number of queries.'.format(cmd.args[0])
+                )
+                return
+        elif len(cmd.args) > 1:
+            await cmd.channel.send(
+                'Error: wrong number of arguments for `.dbstats`.'
+            )
+            return
+
+        text = ''
+        for pool_name, histogram in sorted(querystats.get_pool_waits().items()):
+            text += 'pool {0:<8} n={1:<7} p50={2:>8.2f} p99={3:>8.2f} max={4:>8.2f}\n'.format(
+                pool_name,
+                histogram.count,
+                histogram.percentile(50),
+                histogram.percentile(99),
+                histogram.max_ms
+            )
+
+        for stats in querystats.get_query_stats()[:num_queries]:
+            fp = stats.fingerprint if len(stats.fingerprint) <= 80 else stats.fingerprint[:77] + '...'
+            text += '\n{0}\n    n={1:<7} p50={2:>8.2f} p99={3:>8.2f} max={4:>8.2f} rows={5}\n'.format(
+                fp,
+                stats.count,
+                stats.latency.percentile(50),
+                stats.latency.percentile(99),
+                stats.latency.max_ms,
+                stats.rows
+            )
+
+        if not text:
+            await cmd.channel.send('No database queries recorded yet.')
+            return
+
+        # Stay under Discord's message length limit
+        if len(text) > 1900:
+            text = text[:1900] + '\n...'
+        await cmd.channel.send('Database latencies (ms):\n```\n{0}```'.format(text))
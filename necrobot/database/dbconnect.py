@@ -1,60 +1,314 @@
 import asyncio
+import contextvars
+import time
+from typing import Optional
+
 import mysql.connector
 
 from necrobot.util import console
 from necrobot.config import Config
+from necrobot.database import querystats
+from necrobot.database.dbpool import DBPool
+from necrobot.database.sqlitebackend import SQLitePool
+from necrobot.database.stmtcache import PreparedStatementCache
+
+
+# The UnitOfWork the current task is running in, if any
+_current_unit_of_work = contextvars.ContextVar('current_unit_of_work', default=None)
 
 
 class DBConnect(object):
-    _lock = asyncio.Lock()
-    _db_connection = None
+    _pool = None            # type: DBPool
+    _replica_pool = None    # type: DBPool
 
-    def __init__(self, commit=False):
+    def __init__(self, commit=False, read_your_writes=False, independent=False):
+        """
+        Parameters
+        ----------
+        commit: bool
+            If True, commit on exit. Writing contexts always run on the primary database.
+        read_your_writes: bool
+            If True, a read-only context runs on the primary database instead of the read replica. Use this for
+            reads that must see a write that was just committed (the replica may lag behind the primary).
+        independent: bool
+            If True, run in a transaction of its own even inside a UnitOfWork, if a second connection can be leased
+            without waiting. (Otherwise, e.g. with a single-connection pool, as for the SQLite backend, or when units
+            of work hold every connection, waiting could deadlock; so it joins the unit of work instead.)
+
+        Inside a UnitOfWork, the context instead runs on the unit of work's connection and transaction, and commits
+        (or rolls back) with it.
+        """
         self.cursor = None
         self.commit = commit
+        self._connection = None     # type: mysql.connector.MySQLConnection
+        self._independent = independent
+        self._unit_of_work = UnitOfWork.current()
+        if self._unit_of_work is not None:
+            self._conn_pool = self._unit_of_work.conn_pool
+        else:
+            self._conn_pool = DBConnect.pool() if commit or read_your_writes else DBConnect.replica_pool()
+
+    @property
+    def in_unit_of_work(self) -> bool:
+        """True if the context runs in (and commits with) a UnitOfWork."""
+        return self._unit_of_work is not None
+
+    @classmethod
+    def pool(cls) -> DBPool:
+        """The pool of connections to the primary database."""
+        if cls._pool is None and Config.DB_BACKEND == 'sqlite':
+            cls._pool = SQLitePool(
+                filename=Config.SQLITE_DB_FILE,
+                fixture_file=Config.SQLITE_FIXTURE_FILE,
+                prepared_cache_size=Config.MYSQL_PREPARED_CACHE_SIZE
+            )
+        elif cls._pool is None:
+            cls._pool = DBPool(
+                pool_size=Config.MYSQL_DB_POOL_SIZE,
+                host=Config.MYSQL_DB_HOST,
+                user=Config.MYSQL_DB_USER,
+                passwd=Config.MYSQL_DB_PASSWD,
+                database=Config.MYSQL_DB_NAME,
+                prepared_cache_size=Config.MYSQL_PREPARED_CACHE_SIZE
+            )
+        return cls._pool
+
+    @classmethod
+    def replica_pool(cls) -> DBPool:
+        """The pool of connections to the read replica, or the primary pool if no replica is configured."""
+        if not Config.MYSQL_DB_REPLICA_HOST or Config.DB_BACKEND == 'sqlite':
+            return cls.pool()
+
+        if cls._replica_pool is None:
+            cls._replica_pool = DBPool(
+                pool_size=Config.MYSQL_DB_POOL_SIZE,
+                host=Config.MYSQL_DB_REPLICA_HOST,
+                port=Config.MYSQL_DB_REPLICA_PORT,
+                user=Config.MYSQL_DB_USER,
+                passwd=Config.MYSQL_DB_PASSWD,
+                database=Config.MYSQL_DB_NAME,
+                prepared_cache_size=Config.MYSQL_PREPARED_CACHE_SIZE
+            )
+        return cls._replica_pool
+
+    @classmethod
+    def close_pool(cls) -> None:
+        if cls._pool is not None:
+            cls._pool.close()
+            cls._pool = None
+        if cls._replica_pool is not None:
+            cls._replica_pool.close()
+            cls._replica_pool = None
 
     async def __aenter__(self):
-        await DBConnect._lock.acquire()
+        # Checked here, with no await before the acquire below, so that the free connection can't be taken first
+        if self._independent and self._unit_of_work is not None and self._conn_pool.can_acquire_now:
+            self._unit_of_work = None
+
+        if self._unit_of_work is not None:
+            self._connection = self._unit_of_work.connection
+            self.cursor = self._make_cursor()
+            return self.cursor
+
+        wait_start = time.perf_counter()
+        self._connection = await self._conn_pool.acquire()
+        querystats.record_pool_wait(
+            'primary' if self._conn_pool is DBConnect._pool else 'replica',
+            time.perf_counter() - wait_start
+        )
         try:
-            return self.__enter__()
+            self.cursor = self._make_cursor()
+            return self.cursor
         except Exception:
-            DBConnect._lock.release()
+            self._conn_pool.release(self._connection)
             raise
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._unit_of_work is not None:
+            # The unit of work ends the transaction
+            self.cursor.close()
+            self._connection = None
+            return
+
         try:
-            return self.__exit__(exc_type, exc_val, exc_tb)
+            await self._conn_pool.run(self._end_transaction, exc_type)
         finally:
-            DBConnect._lock.release()
+            self._conn_pool.release(self._connection)
+            self._connection = None
 
-    def __enter__(self):
-        if DBConnect._db_connection is None:
-            DBConnect._db_connection = mysql.connector.connect(
-                user=Config.MYSQL_DB_USER,
-                password=Config.MYSQL_DB_PASSWD,
-                host=Config.MYSQL_DB_HOST,
-                database=Config.MYSQL_DB_NAME)
-        elif not DBConnect._db_connection.is_connected():
-            DBConnect._db_connection.reconnect()
+    def _make_cursor(self):
+        # Buffered, so that execute() reads the whole result set and later fetches don't touch the network
+        cursor = self._connection.cursor(buffered=True)
+        return PooledCursor(
+            LoggingCursor(cursor),
+            self._conn_pool,
+            self._conn_pool.statement_cache(self._connection)
+        )
 
-        if not DBConnect._db_connection.is_connected():
-            raise RuntimeError('Couldn\'t connect to the MySQL database.')
+    def _end_transaction(self, exc_type) -> None:
+        self.cursor.close()
+        if exc_type is None and self.commit:
+            self._connection.commit()
+        else:
+            # Also end read-only transactions, so a pooled connection doesn't hold on to a stale snapshot
+            self._connection.rollback()
 
-        if Config.debugging():
-            self.cursor = LoggingCursor(DBConnect._db_connection.cursor())
+
+class UnitOfWork(object):
+    """Runs every DBConnect context opened inside it (by the same task) on one primary-database connection, in one
+    transaction, which is committed when the unit of work exits normally and rolled back if it exits with an
+    exception. Use it to make a multi-step write atomic:
+
+        async with UnitOfWork():
+            await racedb.record_race(race)
+            await matchdb.record_match_race(...)
+
+    Units of work nest; an inner one simply joins the outer one. Tasks spawned inside a unit of work (e.g. by
+    asyncio.ensure_future) do not join it.
+    """
+    def __init__(self):
+        self.conn_pool = DBConnect.pool()
+        self.connection = None      # type: Optional[mysql.connector.MySQLConnection]
+        self._outer = None          # type: Optional[UnitOfWork]
+        self._task = None
+        self._token = None
+
+    @staticmethod
+    def current():  # -> Optional[UnitOfWork]
+        """The unit of work the current task is running in, if any."""
+        unit_of_work = _current_unit_of_work.get()
+        if unit_of_work is None or unit_of_work.connection is None:
+            return None
+        try:
+            current_task = asyncio.current_task()
+        except RuntimeError:
+            return None
+        return unit_of_work if unit_of_work._task is current_task else None
+
+    async def __aenter__(self):
+        self._outer = UnitOfWork.current()
+        if self._outer is not None:
+            return self
+
+        wait_start = time.perf_counter()
+        self.connection = await self.conn_pool.acquire()
+        querystats.record_pool_wait('primary', time.perf_counter() - wait_start)
+        self._task = asyncio.current_task()
+        self._token = _current_unit_of_work.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._outer is not None:
+            return
+
+        _current_unit_of_work.reset(self._token)
+        try:
+            await self.conn_pool.run(self._end_transaction, exc_type)
+        finally:
+            self.conn_pool.release(self.connection)
+            self.connection = None
+
+    def _end_transaction(self, exc_type) -> None:
+        if exc_type is None:
+            self.connection.commit()
         else:
-            self.cursor = DBConnect._db_connection.cursor()
-        return self.cursor
+            self.connection.rollback()
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.cursor.close()
-        if exc_type is None and self.commit:
-            DBConnect._db_connection.commit()
-        elif self.commit:
-            DBConnect._db_connection.rollback()
+
+class PooledCursor(object):
+    """Cursor wrapper whose execute() and executemany() are coroutines, which run the statement on a pool worker
+    thread so that the event loop doesn't wait on the database. Also adds:
+        execute_prepared(), which runs the statement as a server-side prepared statement, cached per connection. Use
+            it for fixed-shape queries that run often.
+    Results of either are read with the usual fetch methods. (The cursor is buffered, so fetches don't touch the
+    network.)
+    """
+    def __init__(self, cursor, pool: DBPool, statement_cache: PreparedStatementCache):
+        self.cursor = cursor
+        self._pool = pool
+        self._statement_cache = statement_cache
+        self._prepared_result = None    # type: Optional[PreparedResult]
+
+    def __getattr__(self, name):
+        if self._prepared_result is not None and hasattr(self._prepared_result, name):
+            return getattr(self._prepared_result, name)
+        return getattr(self.cursor, name)
+
+    def __next__(self):
+        if self._prepared_result is not None:
+            return self._prepared_result.__next__()
+        return self.cursor.__next__()
+
+    def __iter__(self):
+        if self._prepared_result is not None:
+            return self._prepared_result.__iter__()
+        return self.cursor.__iter__()
+
+    async def execute(self, operation, *args, **kwargs):
+        self._prepared_result = None
+        return await self._pool.run(self.cursor.execute, operation, *args, **kwargs)
+
+    async def executemany(self, operation, seq_params):
+        self._prepared_result = None
+        return await self._pool.run(self.cursor.executemany, operation, seq_params)
+
+    async def execute_prepared(self, operation, params=()):
+        """Only positional (%s) parameters are supported."""
+        self._prepared_result = None
+        if Config.debugging():
+            console.debug('Execute prepared SQL: <{0}> <params={1}>'.format(operation, params))
+        start = time.perf_counter()
+        rows = None
+        try:
+            rows, rowcount, lastrowid = await self._pool.run(self._statement_cache.execute, operation, params)
+            self._prepared_result = PreparedResult(rows, rowcount, lastrowid)
+        finally:
+            querystats.record_query(
+                operation,
+                time.perf_counter() - start,
+                len(rows) if rows is not None else None,
+                params
+            )
+
+
+class PreparedResult(object):
+    """The (fully read) result of a prepared statement, with the fetch interface of a buffered cursor."""
+    def __init__(self, rows: list, rowcount: int, lastrowid: int):
+        self._rows = rows
+        self._next_row = 0
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def fetchone(self):
+        if self._next_row >= len(self._rows):
+            return None
+        self._next_row += 1
+        return self._rows[self._next_row - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._next_row:self._next_row + size]
+        self._next_row += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._next_row:]
+        self._next_row = len(self._rows)
+        return rows
 
 
 class LoggingCursor(object):
+    """Cursor wrapper that records the latency and row count of every statement in querystats, and logs the
+    statement itself when debugging.
+    """
     def __init__(self, cursor):
         self.cursor = cursor
 
@@ -68,5 +322,24 @@ class LoggingCursor(object):
         return self.cursor.__iter__()
 
     def execute(self, operation, *args, **kwargs):
-        console.debug('Execute SQL: <{0}> <args={1}> <kwargs={2}>'.format(operation, args, kwargs))
-        return self.cursor.execute(operation, *args, **kwargs)
+        if Config.debugging():
+            console.debug('Execute SQL: <{0}> <args={1}> <kwargs={2}>'.format(operation, args, kwargs))
+        start = time.perf_counter()
+        try:
+            return self.cursor.execute(operation, *args, **kwargs)
+        finally:
+            querystats.record_query(
+                operation,
+                time.perf_counter() - start,
+                self.cursor.rowcount,
+                args[0] if args else kwargs.get('params')
+            )
+
+    def executemany(self, operation, seq_params):
+        if Config.debugging():
+            console.debug('Executemany SQL: <{0}> <{1} param sets>'.format(operation, len(seq_params)))
+        start = time.perf_counter()
+        try:
+            return self.cursor.executemany(operation, seq_params)
+        finally:
+            querystats.record_query(operation, time.perf_counter() - start, self.cursor.rowcount)
@@ -0,0 +1,281 @@
+"""
+Schema migrations for the indexes that the bot's query paths rely on. Checks the necrobot schema and every league
+schema (from the `leagues` table) for each required index or generated column, and creates whichever are missing.
+
+An index is considered present if some existing index on the table starts with the required columns, in order (so
+e.g. the primary key of daily_runs already satisfies an index on (daily_id, type)). New league schemas copy their
+tables from the necrobot schema with CREATE TABLE ... LIKE, which copies indexes too; running the migration again
+afterwards is harmless.
+
+Adding the generated columns rewrites the users table, so migrating is an operator step (`.dbmigrate`); on startup,
+the bot only calls `check()`, and warns about anything missing. Until the generated columns exist, queries on them
+fall back to computing LOWER(...) (see `lower_name()`).
+"""
+
+from typing import List, Optional
+
+import mysql.connector
+
+from necrobot.config import Config
+from necrobot.database.dbconnect import DBConnect
+from necrobot.util import console
+
+
+class IndexSpec(object):
+    def __init__(self, table: str, name: str, columns: tuple, league_tables: bool = True):
+        """
+        Parameters
+        ----------
+        table: str
+            The table name.
+        name: str
+            The name to give the index, if it has to be created.
+        columns: tuple[str]
+            The indexed columns, in order.
+        league_tables: bool
+            If True, the table also exists in each league schema, and needs the index there.
+        """
+        self.table = table
+        self.name = name
+        self.columns = columns
+        self.league_tables = league_tables
+
+
+class GeneratedColumnSpec(object):
+    def __init__(self, table: str, name: str, definition: str):
+        """
+        Parameters
+        ----------
+        table: str
+            The table name (in the necrobot schema only).
+        name: str
+            The name of the generated column.
+        definition: str
+            The column's type and generating expression, as in an ALTER TABLE ... ADD COLUMN statement.
+        """
+        self.table = table
+        self.name = name
+        self.definition = definition
+
+
+GENERATED_COLUMNS = [
+    # users.discord_name and twitch_name are TEXT columns, which can't be indexed in full; case-insensitive name
+    # lookups go through these columns instead (see userdb)
+    GeneratedColumnSpec('users', 'discord_name_lower', 'VARCHAR(255) AS (LOWER(`discord_name`)) STORED'),
+    GeneratedColumnSpec('users', 'twitch_name_lower', 'VARCHAR(255) AS (LOWER(`twitch_name`)) STORED'),
+    GeneratedColumnSpec('users', 'rtmp_name_lower', 'VARCHAR(25) AS (LOWER(`rtmp_name`)) STORED'),
+]
+
+INDEXES = [
+    # matchdb.get_match_id (both orderings of the racers use this index)
+    IndexSpec('matches', 'idx_matches_racers', ('racer_1_id', 'racer_2_id')),
+    # Channeled-match lookups (matchdb.get_channeled_matches_raw_data, matchutil)
+    IndexSpec('matches', 'idx_matches_channel', ('channel_id',)),
+    # racedb.get_largest_race_number and the per-user stats joins
+    IndexSpec('race_runs', 'idx_race_runs_user', ('user_id', 'race_id')),
+    # Covering index for the fastest-times and most-races leaderboards
+    IndexSpec('race_runs', 'idx_race_runs_level_user', ('level', 'user_id', 'time', 'race_id')),
+    IndexSpec('races', 'idx_races_type', ('type_id', 'private')),
+    IndexSpec('daily_runs', 'idx_daily_runs_daily', ('daily_id', 'type'), league_tables=False),
+    IndexSpec('users', 'idx_users_discord_name_lower', ('discord_name_lower',), league_tables=False),
+    IndexSpec('users', 'idx_users_twitch_name_lower', ('twitch_name_lower',), league_tables=False),
+    IndexSpec('users', 'idx_users_rtmp_name_lower', ('rtmp_name_lower',), league_tables=False),
+]
+
+# The generated columns known to exist in the necrobot schema; filled in by check() and migrate()
+_present_generated_columns = set()
+
+# Representative queries whose plans are reported before and after migrating. {0} is replaced with the schema name.
+EXPLAIN_QUERIES = [
+    ("SELECT `match_id` FROM `{0}`.`matches` "
+     "WHERE (racer_1_id=1 AND racer_2_id=2) OR (racer_1_id=2 AND racer_2_id=1)", True),
+    ("SELECT `match_id` FROM `{0}`.`matches` WHERE `channel_id` = 1", True),
+    ("SELECT `race_id` FROM `{0}`.`race_runs` WHERE `user_id` = 1 ORDER BY `race_id` DESC LIMIT 1", True),
+    ("SELECT `race_id` FROM `{0}`.`races` WHERE `type_id` = 1 AND `private` = 0", True),
+    ("SELECT `user_id` FROM `{0}`.`daily_runs` WHERE `daily_id` = 1 AND `type` = 0", False),
+    ("SELECT `user_id` FROM `{0}`.`users` "
+     "WHERE `discord_name_lower` IN ('a', 'b') OR `twitch_name_lower` IN ('a', 'b') "
+     "OR `rtmp_name_lower` IN ('a', 'b')", False),
+]
+
+
+async def migrate(dry_run: bool = False, explain: bool = True) -> List[str]:
+    """Create any missing generated columns and indexes in the necrobot and league schemas.
+
+    Parameters
+    ----------
+    dry_run: bool
+        If True, only report what would be created.
+    explain: bool
+        If True, include the EXPLAIN plans of some representative queries before and after in the report.
+
+    Returns
+    -------
+    List[str]
+        A human-readable report.
+    """
+    if Config.DB_BACKEND == 'sqlite':
+        return ['The SQLite database is created with its indexes; nothing to migrate.']
+
+    report = []
+    schemas = await _get_schema_names()
+
+    if explain:
+        report.append('EXPLAIN before:')
+        report += await _explain_all(schemas)
+
+    actions = await _get_missing(schemas)
+    if not actions:
+        report.append('Schema is up to date.')
+        return report
+
+    for description, statement, new_column in actions:
+        if dry_run:
+            report.append('Would {0}'.format(description))
+            continue
+        console.info('Migration: {0}'.format(description))
+        async with DBConnect(commit=True) as cursor:
+            await cursor.execute(statement)
+        if new_column is not None:
+            _present_generated_columns.add(new_column)
+        report.append('Did {0}'.format(description))
+
+    if explain and not dry_run:
+        report.append('EXPLAIN after:')
+        report += await _explain_all(schemas)
+    return report
+
+
+async def check() -> List[str]:
+    """Check for missing generated columns and indexes, without creating them.
+
+    Returns
+    -------
+    List[str]
+        A warning for each missing column or index; empty if the schema is up to date.
+    """
+    if Config.DB_BACKEND == 'sqlite':
+        return []
+    actions = await _get_missing(await _get_schema_names())
+    return ['Database migration needed (run `.dbmigrate`) to {0}.'.format(action[0]) for action in actions]
+
+
+def lower_name(column: str) -> str:
+    """The SQL for the lowercased value of a name column of the users table (e.g. 'discord_name'): its indexed
+    generated column, if it exists, or else LOWER(column).
+    """
+    lower_column = '{0}_lower'.format(column)
+    if Config.DB_BACKEND == 'sqlite' or lower_column in _present_generated_columns:
+        return lower_column
+    return 'LOWER({0})'.format(column)
+
+
+async def _get_schema_names() -> List[str]:
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
+        await cursor.execute(
+            """
+            SELECT `leagues`.`schema_name`
+            FROM `leagues`
+            INNER JOIN INFORMATION_SCHEMA.SCHEMATA
+                ON INFORMATION_SCHEMA.SCHEMATA.SCHEMA_NAME = `leagues`.`schema_name`
+            """
+        )
+        return [Config.MYSQL_DB_NAME] + [row[0] for row in cursor]
+
+
+async def _get_missing(schemas: List[str]) -> List[tuple]:
+    """Returns a list of (description, statement, generated column name or None) tuples, one per missing column or
+    index.
+    """
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
+        format_strings = ','.join(['%s'] * len(schemas))
+        await cursor.execute(
+            """
+            SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA IN ({0})
+            """.format(format_strings),
+            schemas
+        )
+        columns = set((row[0], row[1], row[2]) for row in cursor)
+        tables = set((schema, table) for schema, table, _ in columns)
+
+        # Map (schema, table) -> list of index column lists
+        await cursor.execute(
+            """
+            SELECT TABLE_SCHEMA, TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA IN ({0})
+            ORDER BY TABLE_SCHEMA, TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+            """.format(format_strings),
+            schemas
+        )
+        index_columns = dict()
+        for row in cursor:
+            index_columns.setdefault((row[0], row[1], row[2]), []).append(row[4])
+        table_indexes = dict()
+        for (schema, table, _), cols in index_columns.items():
+            table_indexes.setdefault((schema, table), []).append(tuple(cols))
+
+    actions = []
+    for spec in GENERATED_COLUMNS:
+        schema = Config.MYSQL_DB_NAME
+        if (schema, spec.table, spec.name) in columns:
+            _present_generated_columns.add(spec.name)
+        elif (schema, spec.table) in tables:
+            actions.append((
+                'add generated column `{0}`.`{1}`.`{2}`'.format(schema, spec.table, spec.name),
+                'ALTER TABLE `{0}`.`{1}` ADD COLUMN `{2}` {3}'.format(schema, spec.table, spec.name, spec.definition),
+                spec.name
+            ))
+            columns.add((schema, spec.table, spec.name))
+
+    for spec in INDEXES:
+        for schema in (schemas if spec.league_tables else [Config.MYSQL_DB_NAME]):
+            if (schema, spec.table) not in tables:
+                continue
+            if any(cols[:len(spec.columns)] == spec.columns for cols in table_indexes.get((schema, spec.table), [])):
+                continue
+            if any((schema, spec.table, col) not in columns for col in spec.columns):
+                continue
+            actions.append((
+                'create index `{0}`.`{1}`.`{2}` ({3})'.format(schema, spec.table, spec.name, ', '.join(spec.columns)),
+                'CREATE INDEX `{0}` ON `{1}`.`{2}` ({3})'.format(
+                    spec.name, schema, spec.table, ', '.join('`{0}`'.format(col) for col in spec.columns)
+                ),
+                None
+            ))
+    return actions
+
+
+async def _explain_all(schemas: List[str]) -> List[str]:
+    lines = []
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
+        for query, in_league_schemas in EXPLAIN_QUERIES:
+            for schema in (schemas if in_league_schemas else [Config.MYSQL_DB_NAME]):
+                query_str = query.format(schema)
+                lines.append('  {0}'.format(query_str))
+                plan = await _explain(cursor, query_str)
+                lines += ['    {0}'.format(line) for line in plan] if plan else ['    (no plan)']
+    return lines
+
+
+async def _explain(cursor, query: str) -> Optional[List[str]]:
+    try:
+        await cursor.execute('EXPLAIN ' + query)
+    except mysql.connector.Error as e:
+        return ['error: {0}'.format(e.msg)]
+
+    plan = []
+    for row in cursor.fetchall():
+        row_dict = dict(zip(cursor.column_names, row))
+        plan.append(
+            'table={0} type={1} key={2} rows={3} extra={4}'.format(
+                row_dict.get('table'),
+                row_dict.get('type'),
+                row_dict.get('key'),
+                row_dict.get('rows'),
+                row_dict.get('Extra')
+            )
+        )
+    return plan
@@ -0,0 +1,141 @@
+"""
+A fixed-size pool of MySQL connections. All blocking connection work (connecting, reconnecting, committing, and
+optionally executing statements) is run on a worker thread, so that it doesn't stall the event loop.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+from typing import Dict, List, Optional
+
+import mysql.connector
+
+from necrobot.database.stmtcache import PreparedStatementCache
+
+
+class DBPool(object):
+    def __init__(
+            self,
+            pool_size: int,
+            host: str,
+            user: str,
+            passwd: str,
+            database: str,
+            port: int = 3306,
+            prepared_cache_size: int = 32
+    ):
+        """
+        Parameters
+        ----------
+        pool_size: int
+            The maximum number of connections to hold open at once. Also the number of worker threads.
+        host: str
+            The database hostname.
+        user: str
+            The database username.
+        passwd: str
+            The database password.
+        database: str
+            The default schema name.
+        port: int
+            The database port.
+        prepared_cache_size: int
+            The number of prepared statements to keep per connection.
+        """
+        self._pool_size = max(int(pool_size), 1)
+        self._connect_kwargs = {
+            'host': host,
+            'port': port,
+            'user': user,
+            'password': passwd,
+            'database': database,
+        }
+
+        self._prepared_cache_size = prepared_cache_size
+        self._statement_caches = dict()     # type: Dict[mysql.connector.MySQLConnection, PreparedStatementCache]
+        self._idle_connections = []         # type: List[mysql.connector.MySQLConnection]
+        self._available = None              # type: Optional[asyncio.Semaphore]
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._pool_size,
+            thread_name_prefix='dbpool'
+        )
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    @property
+    def single_connection(self) -> bool:
+        """If True, the pool holds only one connection, so a task that has leased it must not wait on another lease."""
+        return self._pool_size == 1
+
+    @property
+    def can_acquire_now(self) -> bool:
+        """True if acquire() would lease a connection without waiting."""
+        return self._available is None or not self._available.locked()
+
+    async def acquire(self) -> mysql.connector.MySQLConnection:
+        """Lease a connection from the pool, waiting if all connections are leased. The connection must be returned
+        with release().
+        """
+        # Created lazily so that the semaphore is bound to the running event loop
+        if self._available is None:
+            self._available = asyncio.Semaphore(self._pool_size)
+
+        await self._available.acquire()
+        try:
+            connection = self._idle_connections.pop() if self._idle_connections else None
+            return await self.run(self._ready_connection, connection)
+        except Exception:
+            self._available.release()
+            raise
+
+    def release(self, connection: mysql.connector.MySQLConnection) -> None:
+        """Return a leased connection to the pool."""
+        self._idle_connections.append(connection)
+        self._available.release()
+
+    def statement_cache(self, connection: mysql.connector.MySQLConnection) -> PreparedStatementCache:
+        """The prepared statement cache for a connection belonging to this pool."""
+        return self._statement_caches[connection]
+
+    async def run(self, fn, *args, **kwargs):
+        """Run the blocking function fn on one of the pool's worker threads."""
+        return await asyncio.get_event_loop().run_in_executor(
+            self._executor,
+            functools.partial(fn, *args, **kwargs)
+        )
+
+    def close(self) -> None:
+        """Close all idle connections and stop the worker threads. Not a coroutine, so that it can be called after
+        the event loop has stopped.
+        """
+        self._executor.shutdown(wait=True)
+        for connection in self._idle_connections:
+            try:
+                self._statement_caches[connection].clear()
+                connection.close()
+            except mysql.connector.Error:
+                pass
+        self._idle_connections = []
+        self._statement_caches = dict()
+
+    def _connect(self) -> mysql.connector.MySQLConnection:
+        return mysql.connector.connect(**self._connect_kwargs)
+
+    def _ready_connection(
+            self,
+            connection: Optional[mysql.connector.MySQLConnection]
+    ) -> mysql.connector.MySQLConnection:
+        if connection is None:
+            connection = self._connect()
+        elif not connection.is_connected():
+            # Server-side prepared statements don't survive the reconnect
+            self._statement_caches[connection].invalidate()
+            connection.reconnect()
+
+        if not connection.is_connected():
+            raise RuntimeError('Couldn\'t connect to the database.')
+        if connection not in self._statement_caches:
+            self._statement_caches[connection] = PreparedStatementCache(connection, self._prepared_cache_size)
+        return connection
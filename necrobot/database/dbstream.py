@@ -0,0 +1,107 @@
+"""
+Streaming reads of large result sets. Rows are read from the server through an unbuffered cursor, a batch at a time,
+as they are consumed; so memory use is bounded by the batch size rather than the size of the result.
+
+Usage:
+    async with DBStream(query, params) as batches:
+        async for rows in batches:
+            for row in rows:
+                ...
+"""
+
+import time
+from typing import Optional
+
+import mysql.connector
+
+from necrobot.database import querystats
+from necrobot.database.dbconnect import DBConnect
+
+
+class DBStream(object):
+    def __init__(self, operation: str, params=(), batch_size: int = 500, read_your_writes: bool = False):
+        """
+        Parameters
+        ----------
+        operation: str
+            The SELECT statement to run.
+        params: tuple
+            The statement parameters.
+        batch_size: int
+            The maximum number of rows in each batch.
+        read_your_writes: bool
+            If True, read from the primary database instead of the read replica.
+
+        Notes
+        -----
+        The stream leases a pool connection until the context exits, so any queries made while consuming the stream
+        use a different connection; don't keep a stream open longer than necessary. (With a single-connection pool,
+        as for the SQLite backend, the whole result is instead read up front and the connection returned at once.)
+        """
+        self._operation = operation
+        self._params = params
+        self._batch_size = max(int(batch_size), 1)
+        self._conn_pool = DBConnect.pool() if read_your_writes else DBConnect.replica_pool()
+        self._connection = None     # type: mysql.connector.MySQLConnection
+        self._cursor = None
+        self._rows = None           # type: Optional[list]
+
+    async def __aenter__(self):
+        wait_start = time.perf_counter()
+        self._connection = await self._conn_pool.acquire()
+        querystats.record_pool_wait(
+            'primary' if self._conn_pool is DBConnect.pool() else 'replica',
+            time.perf_counter() - wait_start
+        )
+        try:
+            self._cursor = self._connection.cursor(buffered=False)
+            start = time.perf_counter()
+            await self._conn_pool.run(self._cursor.execute, self._operation, self._params)
+            querystats.record_query(self._operation, time.perf_counter() - start, None, self._params)
+            if self._conn_pool.single_connection:
+                # Consumers may need the pool's only connection while they read the stream
+                self._rows = await self._conn_pool.run(self._cursor.fetchall)
+        except Exception:
+            try:
+                await self._conn_pool.run(self._end_stream)
+            finally:
+                self._conn_pool.release(self._connection)
+                self._connection = None
+                self._cursor = None
+            raise
+
+        if self._rows is not None:
+            await self.__aexit__(None, None, None)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._connection is None:
+            return
+        try:
+            await self._conn_pool.run(self._end_stream)
+        finally:
+            self._conn_pool.release(self._connection)
+            self._connection = None
+            self._cursor = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> list:
+        if self._rows is not None:
+            rows, self._rows = self._rows[:self._batch_size], self._rows[self._batch_size:]
+        else:
+            rows = await self._conn_pool.run(self._cursor.fetchmany, self._batch_size)
+        if not rows:
+            raise StopAsyncIteration
+        return rows
+
+    def _end_stream(self) -> None:
+        try:
+            # An unbuffered result must be read to the end before the connection can be used again
+            if self._cursor is not None:
+                while self._cursor.fetchmany(self._batch_size):
+                    pass
+                self._cursor.close()
+        finally:
+            self._connection.rollback()
@@ -0,0 +1,173 @@
+"""
+Per-statement query instrumentation. Queries are grouped by a normalized SQL fingerprint (literals, parameter lists
+and schema names removed), and for each fingerprint we keep a latency histogram and a row count. Also tracks the time
+spent waiting to lease a connection from each connection pool.
+
+This module is thread-safe, since queries are run, and recorded, on the pool's worker threads.
+"""
+
+import re
+import threading
+import unittest
+from typing import Dict, List, Optional
+
+from necrobot.util import console
+from necrobot.config import Config
+
+
+# Histogram bucket upper bounds, in milliseconds: 0.05ms to ~105s, four buckets per doubling
+_BUCKET_BOUNDS = [0.05 * 2 ** (i / 4) for i in range(85)]
+
+_lock = threading.Lock()
+_query_stats = dict()   # type: Dict[str, QueryStats]
+_pool_waits = dict()    # type: Dict[str, LatencyHistogram]
+
+_whitespace_re = re.compile(r'\s+')
+_string_literal_re = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_number_literal_re = re.compile(r'\b\d+(?:\.\d+)?\b')
+_placeholder_re = re.compile(r'%\((\w+)\)s|%s')
+_value_list_re = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_schema_name_re = re.compile(r'`[^`]+`\.(`[^`]+`)')
+
+
+class LatencyHistogram(object):
+    def __init__(self):
+        self.buckets = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        lo, hi = 0, len(_BUCKET_BOUNDS)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _BUCKET_BOUNDS[mid] < elapsed_ms:
+                lo = mid + 1
+            else:
+                hi = mid
+        self.buckets[lo] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """The upper bound (in ms) of the bucket containing the given percentile. Exact to within one bucket
+        (about 19%)."""
+        if not self.count:
+            return 0.0
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for idx, num in enumerate(self.buckets):
+            seen += num
+            if seen >= rank and num:
+                return min(_BUCKET_BOUNDS[idx], self.max_ms) if idx < len(_BUCKET_BOUNDS) else self.max_ms
+        return self.max_ms
+
+
+class QueryStats(object):
+    def __init__(self, fingerprint_str: str):
+        self.fingerprint = fingerprint_str
+        self.latency = LatencyHistogram()
+        self.rows = 0
+        self.sample_operation = None    # type: Optional[str]
+        self.sample_params = None       # type: Optional[tuple]
+
+    @property
+    def count(self) -> int:
+        return self.latency.count
+
+
+def fingerprint(operation: str) -> str:
+    """Normalize the SQL statement so that statements differing only in literals, parameters, whitespace, or
+    league schema share a fingerprint."""
+    fp = _string_literal_re.sub('?', operation)
+    fp = _placeholder_re.sub('?', fp)
+    fp = _number_literal_re.sub('?', fp)
+    fp = _schema_name_re.sub(r'\1', fp)
+    fp = _whitespace_re.sub(' ', fp).strip()
+    return _value_list_re.sub('(...)', fp)
+
+
+def record_query(operation: str, elapsed_sec: float, rows: Optional[int], params=None) -> None:
+    """Record the execution of a single statement, and write it to the slow query log if needed. For SELECT
+    statements with positional parameters, the most recent statement and parameters are kept as a sample, so that
+    the statement can be re-run for benchmarking.
+    """
+    elapsed_ms = 1000 * elapsed_sec
+    fp = fingerprint(operation)
+    with _lock:
+        stats = _query_stats.get(fp)
+        if stats is None:
+            stats = QueryStats(fp)
+            _query_stats[fp] = stats
+        stats.latency.add(elapsed_ms)
+        if rows is not None and rows > 0:
+            stats.rows += rows
+        if isinstance(params, (tuple, list)) and fp.upper().startswith('SELECT'):
+            stats.sample_operation = operation
+            stats.sample_params = tuple(params)
+
+    if elapsed_ms >= Config.MYSQL_SLOW_QUERY_MS:
+        console.warning('Slow query ({0:.1f} ms, {1} rows): {2}'.format(elapsed_ms, rows, fp))
+
+
+def record_pool_wait(pool_name: str, elapsed_sec: float) -> None:
+    """Record the time spent waiting to lease a connection from the named pool."""
+    with _lock:
+        histogram = _pool_waits.get(pool_name)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            _pool_waits[pool_name] = histogram
+        histogram.add(1000 * elapsed_sec)
+
+
+def get_query_stats() -> List[QueryStats]:
+    """All recorded QueryStats, sorted by total time spent, descending."""
+    with _lock:
+        stats = list(_query_stats.values())
+    return sorted(stats, key=lambda s: s.latency.total_ms, reverse=True)
+
+
+def get_pool_waits() -> Dict[str, LatencyHistogram]:
+    with _lock:
+        return dict(_pool_waits)
+
+
+def reset() -> None:
+    with _lock:
+        _query_stats.clear()
+        _pool_waits.clear()
+
+
+class TestQueryStats(unittest.TestCase):
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("""
+                SELECT `user_id` FROM `condor_s7`.`entrants`
+                WHERE user_id = %s AND name = 'bob' AND level > -2 LIMIT 5
+                """),
+            'SELECT `user_id` FROM `entrants` WHERE user_id = ? AND name = ? AND level > -? LIMIT ?'
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM users WHERE LOWER(discord_name) IN (%s,%s, %s)'),
+            fingerprint('SELECT * FROM users WHERE LOWER(discord_name) IN (%s)')
+        )
+        self.assertEqual(
+            fingerprint('UPDATE matches SET racer_1_id=%(to_uid)s WHERE racer_1_id=%(from_uid)s'),
+            'UPDATE matches SET racer_1_id=? WHERE racer_1_id=?'
+        )
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.add(1.0)
+        histogram.add(100.0)
+        histogram.add(400.0)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 1.0, delta=0.2)
+        self.assertAlmostEqual(histogram.percentile(99), 100.0, delta=20.0)
+        self.assertEqual(histogram.percentile(100), 400.0)
@@ -0,0 +1,70 @@
+-- The league-only tables and views of a league schema, for the SQLite backend (see sqlitebackend). {schema} is
+-- replaced with the league's schema name. The league's copies of the necrobot tables (matches, match_races, races,
+-- race_runs and speedruns) are created separately, as with CREATE TABLE ... LIKE in leaguedb.create_league.
+
+CREATE TABLE `{schema}__entrants` (
+    `user_id` INTEGER NOT NULL PRIMARY KEY
+);
+
+CREATE VIEW `{schema}__race_summary` AS
+    SELECT
+        `m`.`match_id` AS `match_id`,
+        `mr`.`race_number` AS `race_number`,
+        `users_winner`.`user_id` AS `winner_id`,
+        `users_loser`.`user_id` AS `loser_id`,
+        `race_runs_winner`.`time` AS `winner_time`,
+        `race_runs_loser`.`time` AS `loser_time`
+    FROM
+        `{schema}__matches` `m`
+        JOIN `{schema}__match_races` `mr` ON `m`.`match_id` = `mr`.`match_id`
+        JOIN `users` `users_winner` ON
+            IIF(`mr`.`winner` = 1,
+                `users_winner`.`user_id` = `m`.`racer_1_id`,
+                `users_winner`.`user_id` = `m`.`racer_2_id`)
+        JOIN `users` `users_loser` ON
+            IIF(`mr`.`winner` = 1,
+                `users_loser`.`user_id` = `m`.`racer_2_id`,
+                `users_loser`.`user_id` = `m`.`racer_1_id`)
+        LEFT JOIN `{schema}__race_runs` `race_runs_winner` ON
+            `race_runs_winner`.`user_id` = `users_winner`.`user_id`
+            AND `race_runs_winner`.`race_id` = `mr`.`race_id`
+        LEFT JOIN `{schema}__race_runs` `race_runs_loser` ON
+            `race_runs_loser`.`user_id` = `users_loser`.`user_id`
+            AND `race_runs_loser`.`race_id` = `mr`.`race_id`
+    WHERE NOT `mr`.`canceled`;
+
+CREATE VIEW `{schema}__match_info` AS
+    SELECT
+        `m`.`match_id` AS `match_id`,
+        `ud1`.`twitch_name` AS `racer_1_name`,
+        `ud2`.`twitch_name` AS `racer_2_name`,
+        `m`.`suggested_time` AS `scheduled_time`,
+        `ud3`.`twitch_name` AS `cawmentator_name`,
+        `m`.`vod` AS `vod`,
+        `m`.`is_best_of` AS `is_best_of`,
+        `m`.`number_of_races` AS `number_of_races`,
+        `m`.`autogenned` AS `autogenned`,
+        (`m`.`r1_confirmed` AND `m`.`r2_confirmed`) AS `scheduled`,
+        COUNT(0) AS `num_finished`,
+        SUM(CASE WHEN `mr`.`winner` = 1 THEN 1 ELSE 0 END) AS `racer_1_wins`,
+        SUM(CASE WHEN `mr`.`winner` = 2 THEN 1 ELSE 0 END) AS `racer_2_wins`,
+        (CASE
+            WHEN `m`.`is_best_of`
+            THEN MAX(SUM(CASE WHEN `mr`.`winner` = 1 THEN 1 ELSE 0 END),
+                     SUM(CASE WHEN `mr`.`winner` = 2 THEN 1 ELSE 0 END))
+                 >= (`m`.`number_of_races` / 2 + 1)
+            ELSE COUNT(0) >= `m`.`number_of_races`
+        END) AS `completed`
+    FROM
+        `{schema}__matches` `m`
+        LEFT JOIN `{schema}__match_races` `mr` ON `m`.`match_id` = `mr`.`match_id`
+        JOIN `users` `ud1` ON `m`.`racer_1_id` = `ud1`.`user_id`
+        JOIN `users` `ud2` ON `m`.`racer_2_id` = `ud2`.`user_id`
+        LEFT JOIN `users` `ud3` ON `m`.`cawmentator_id` = `ud3`.`user_id`
+    WHERE `mr`.`canceled` = 0 OR `mr`.`canceled` IS NULL
+    GROUP BY `m`.`match_id`;
+
+CREATE VIEW `{schema}__league_info` AS
+    SELECT *
+    FROM `leagues`
+    WHERE `leagues`.`schema_name` = '{schema}';
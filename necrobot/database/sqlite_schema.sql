@@ -0,0 +1,209 @@
+-- The necrobot schema, for the SQLite backend (see sqlitebackend). Mirrors the MySQL schema described in
+-- docs/Database.txt, including the generated columns and secondary indexes created by dbmigrate.
+
+CREATE TABLE `_schemata` (
+    `SCHEMA_NAME` TEXT NOT NULL PRIMARY KEY
+);
+
+CREATE TABLE `dailies` (
+    `daily_id` INTEGER NOT NULL,
+    `type` INTEGER NOT NULL,
+    `seed` INTEGER,
+    `msg_id` INTEGER,
+    PRIMARY KEY (`daily_id`, `type`)
+);
+
+CREATE TABLE `daily_runs` (
+    `daily_id` INTEGER NOT NULL,
+    `type` INTEGER NOT NULL,
+    `user_id` INTEGER NOT NULL,
+    `level` INTEGER,
+    `time` INTEGER,
+    PRIMARY KEY (`daily_id`, `type`, `user_id`)
+);
+
+CREATE TABLE `entrants` (
+    `user_id` INTEGER NOT NULL PRIMARY KEY
+);
+
+CREATE TABLE `leagues` (
+    `schema_name` VARCHAR(25) NOT NULL PRIMARY KEY,
+    `league_name` TEXT,
+    `race_type` INTEGER,
+    `number_of_races` INTEGER,
+    `is_best_of` BOOLEAN,
+    `ranked` BOOLEAN,
+    `gsheet_id` TEXT,
+    `deadline` TEXT,
+    `speedrun_gsheet_id` TEXT
+);
+
+CREATE TABLE `matches` (
+    `match_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `race_type_id` INTEGER,
+    `racer_1_id` INTEGER,
+    `racer_2_id` INTEGER,
+    `suggested_time` DATETIME,
+    `r1_confirmed` BOOLEAN NOT NULL DEFAULT 0,
+    `r2_confirmed` BOOLEAN NOT NULL DEFAULT 0,
+    `r1_unconfirmed` BOOLEAN NOT NULL DEFAULT 0,
+    `r2_unconfirmed` BOOLEAN NOT NULL DEFAULT 0,
+    `is_best_of` BOOLEAN NOT NULL DEFAULT 0,
+    `number_of_races` INTEGER NOT NULL DEFAULT 0,
+    `cawmentator_id` INTEGER,
+    `channel_id` INTEGER,
+    `ranked` BOOLEAN NOT NULL DEFAULT 0,
+    `sheet_id` INTEGER,
+    `sheet_row` INTEGER,
+    `vod` TEXT,
+    `finish_time` DATETIME,
+    `autogenned` BOOLEAN NOT NULL DEFAULT 0
+);
+CREATE INDEX `idx_matches_racers` ON `matches` (`racer_1_id`, `racer_2_id`);
+CREATE INDEX `idx_matches_channel` ON `matches` (`channel_id`);
+
+CREATE TABLE `match_races` (
+    `match_id` INTEGER NOT NULL,
+    `race_number` INTEGER NOT NULL,
+    `race_id` INTEGER,
+    `winner` INTEGER,
+    `canceled` BOOLEAN NOT NULL DEFAULT 0,
+    `contested` BOOLEAN NOT NULL DEFAULT 0,
+    PRIMARY KEY (`match_id`, `race_number`)
+);
+
+CREATE TABLE `races` (
+    `race_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `timestamp` TIMESTAMP,
+    `seed` INTEGER,
+    `condor` BOOLEAN NOT NULL DEFAULT 0,
+    `private` BOOLEAN NOT NULL DEFAULT 0,
+    `type_id` INTEGER
+);
+CREATE INDEX `idx_races_type` ON `races` (`type_id`, `private`);
+
+CREATE TABLE `race_runs` (
+    `race_id` INTEGER NOT NULL,
+    `user_id` INTEGER NOT NULL,
+    `time` INTEGER,
+    `rank` INTEGER,
+    `igt` INTEGER,
+    `level` INTEGER,
+    `comment` TEXT,
+    PRIMARY KEY (`race_id`, `user_id`)
+);
+CREATE INDEX `idx_race_runs_user` ON `race_runs` (`user_id`, `race_id`);
+CREATE INDEX `idx_race_runs_level_user` ON `race_runs` (`level`, `user_id`, `time`, `race_id`);
+
+CREATE TABLE `race_types` (
+    `type_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `character` VARCHAR(50),
+    `descriptor` VARCHAR(100),
+    `seeded` BOOLEAN,
+    `amplified` BOOLEAN,
+    `seed_fixed` BOOLEAN
+);
+
+CREATE TABLE `ratings` (
+    `discord_id` INTEGER NOT NULL PRIMARY KEY,
+    `trueskill_mu` REAL,
+    `trueskill_sigma` REAL
+);
+
+CREATE TABLE `speedruns` (
+    `submission_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `user_id` INTEGER,
+    `type_id` INTEGER,
+    `score` INTEGER,
+    `vod` TEXT,
+    `submission_time` DATETIME,
+    `verified` BOOLEAN NOT NULL DEFAULT 0
+);
+
+CREATE TABLE `users` (
+    `user_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `discord_id` INTEGER UNIQUE,
+    `discord_name` TEXT,
+    `rtmp_name` VARCHAR(25) UNIQUE,
+    `twitch_name` TEXT,
+    `timezone` TEXT,
+    `user_info` TEXT,
+    `daily_alert` BOOLEAN NOT NULL DEFAULT 0,
+    `race_alert` BOOLEAN NOT NULL DEFAULT 0,
+    `discord_name_lower` VARCHAR(255) GENERATED ALWAYS AS (LOWER(`discord_name`)) STORED,
+    `twitch_name_lower` VARCHAR(255) GENERATED ALWAYS AS (LOWER(`twitch_name`)) STORED,
+    `rtmp_name_lower` VARCHAR(25) GENERATED ALWAYS AS (LOWER(`rtmp_name`)) STORED
+);
+CREATE INDEX `idx_users_discord_name_lower` ON `users` (`discord_name_lower`);
+CREATE INDEX `idx_users_twitch_name_lower` ON `users` (`twitch_name_lower`);
+CREATE INDEX `idx_users_rtmp_name_lower` ON `users` (`rtmp_name_lower`);
+
+CREATE VIEW `daily_runs_uinfo` AS
+    SELECT `daily_id`, `type`, `user_id`, `level`, `time`
+    FROM `daily_runs`;
+
+-- MySQL can update through the view directly; SQLite needs a trigger
+CREATE TRIGGER `daily_runs_uinfo_update` INSTEAD OF UPDATE ON `daily_runs_uinfo`
+BEGIN
+    UPDATE `daily_runs`
+    SET `level` = NEW.`level`, `time` = NEW.`time`
+    WHERE `daily_id` = OLD.`daily_id` AND `type` = OLD.`type` AND `user_id` = OLD.`user_id`;
+END;
+
+CREATE VIEW `race_summary` AS
+    SELECT
+        `matches`.`match_id` AS `match_id`,
+        `match_races`.`race_number` AS `race_number`,
+        `users_winner`.`user_id` AS `winner_id`,
+        `users_loser`.`user_id` AS `loser_id`,
+        `race_runs_winner`.`time` AS `winner_time`,
+        `race_runs_loser`.`time` AS `loser_time`
+    FROM
+        `matches`
+        JOIN `match_races` ON `matches`.`match_id` = `match_races`.`match_id`
+        JOIN `users` `users_winner` ON
+            IIF(`match_races`.`winner` = 1,
+                `users_winner`.`user_id` = `matches`.`racer_1_id`,
+                `users_winner`.`user_id` = `matches`.`racer_2_id`)
+        JOIN `users` `users_loser` ON
+            IIF(`match_races`.`winner` = 1,
+                `users_loser`.`user_id` = `matches`.`racer_2_id`,
+                `users_loser`.`user_id` = `matches`.`racer_1_id`)
+        LEFT JOIN `race_runs` `race_runs_winner` ON
+            `race_runs_winner`.`user_id` = `users_winner`.`user_id`
+            AND `race_runs_winner`.`race_id` = `match_races`.`race_id`
+        LEFT JOIN `race_runs` `race_runs_loser` ON
+            `race_runs_loser`.`user_id` = `users_loser`.`user_id`
+            AND `race_runs_loser`.`race_id` = `match_races`.`race_id`
+    WHERE NOT `match_races`.`canceled`;
+
+CREATE VIEW `match_info` AS
+    SELECT
+        `matches`.`match_id` AS `match_id`,
+        `ud1`.`twitch_name` AS `racer_1_name`,
+        `ud2`.`twitch_name` AS `racer_2_name`,
+        `matches`.`suggested_time` AS `scheduled_time`,
+        `ud3`.`twitch_name` AS `cawmentator_name`,
+        `matches`.`vod` AS `vod`,
+        `matches`.`is_best_of` AS `is_best_of`,
+        `matches`.`number_of_races` AS `number_of_races`,
+        `matches`.`autogenned` AS `autogenned`,
+        (`matches`.`r1_confirmed` AND `matches`.`r2_confirmed`) AS `scheduled`,
+        COUNT(0) AS `num_finished`,
+        SUM(CASE WHEN `match_races`.`winner` = 1 THEN 1 ELSE 0 END) AS `racer_1_wins`,
+        SUM(CASE WHEN `match_races`.`winner` = 2 THEN 1 ELSE 0 END) AS `racer_2_wins`,
+        (CASE
+            WHEN `matches`.`is_best_of`
+            THEN MAX(SUM(CASE WHEN `match_races`.`winner` = 1 THEN 1 ELSE 0 END),
+                     SUM(CASE WHEN `match_races`.`winner` = 2 THEN 1 ELSE 0 END))
+                 >= (`matches`.`number_of_races` / 2 + 1)
+            ELSE COUNT(0) >= `matches`.`number_of_races`
+        END) AS `completed`
+    FROM
+        `matches`
+        LEFT JOIN `match_races` ON `matches`.`match_id` = `match_races`.`match_id`
+        JOIN `users` `ud1` ON `matches`.`racer_1_id` = `ud1`.`user_id`
+        JOIN `users` `ud2` ON `matches`.`racer_2_id` = `ud2`.`user_id`
+        LEFT JOIN `users` `ud3` ON `matches`.`cawmentator_id` = `ud3`.`user_id`
+    WHERE `match_races`.`canceled` = 0 OR `match_races`.`canceled` IS NULL
+    GROUP BY `matches`.`match_id`;
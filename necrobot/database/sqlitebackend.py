@@ -0,0 +1,499 @@
+"""
+A SQLite storage backend, so that the bot (and benchmarks of its queries) can run without a MySQL server. Enabled by
+setting `db_backend=sqlite` in the config file; the database file is created with the necrobot schema, and optionally
+filled from a JSON fixture file (see load_fixtures()), the first time it is opened.
+
+The db modules are written against MySQL, so SQLiteCursor translates their statements on the fly (see translate()):
+    - %s and %(name)s parameters become ? and :name;
+    - schema-qualified names `schema`.`table` (from dbutil.tn()) become `schema__table`, since SQLite has no schemas;
+      league tables live in the one database, prefixed with the league's schema name;
+    - ON DUPLICATE KEY UPDATE ... VALUES(col) becomes ON CONFLICT DO UPDATE SET ... excluded.col, and INSERT IGNORE
+      becomes INSERT OR IGNORE;
+    - LAST_INSERT_ID(), IF(), GREATEST(), LEAST() and DIV become their SQLite equivalents;
+    - INFORMATION_SCHEMA.SCHEMATA is emulated with the _schemata table, and CREATE SCHEMA and CREATE TABLE ... LIKE
+      (as used by leaguedb.create_league) are emulated directly.
+The translation is textual, and covers the SQL used in this codebase rather than MySQL in general.
+
+The pool holds a single connection (SQLite allows only one writer at a time anyway), so database contexts run one at
+a time; see DBPool.single_connection.
+"""
+
+import contextlib
+import datetime
+import functools
+import json
+import os
+import re
+import sqlite3
+import unittest
+from typing import Optional
+
+import mysql.connector
+
+from necrobot.config import Config
+from necrobot.database.dbpool import DBPool
+from necrobot.util import console
+
+
+_SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'sqlite_schema.sql')
+_LEAGUE_SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'sqlite_league_schema.sql')
+
+# The tables a league schema copies from the necrobot schema (as in leaguedb.create_league)
+LEAGUE_TABLES = ['matches', 'match_races', 'races', 'race_runs', 'speedruns']
+
+_placeholder_re = re.compile(r'%\((\w+)\)s|%s|%%')
+_qualified_name_re = re.compile(r'`(\w+)`\s*\.\s*`(\w+)`')
+_on_duplicate_re = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_values_fn_re = re.compile(r'\bVALUES\s*\(\s*(`?\w+`?)\s*\)', re.IGNORECASE)
+_insert_ignore_re = re.compile(r'\bINSERT\s+IGNORE\b', re.IGNORECASE)
+_if_fn_re = re.compile(r'\bIF\s*\(', re.IGNORECASE)
+_greatest_fn_re = re.compile(r'\bGREATEST\s*\(', re.IGNORECASE)
+_least_fn_re = re.compile(r'\bLEAST\s*\(', re.IGNORECASE)
+_div_re = re.compile(r'\bDIV\b', re.IGNORECASE)
+_last_insert_id_re = re.compile(r'\bLAST_INSERT_ID\s*\(\s*\)', re.IGNORECASE)
+_schemata_re = re.compile(r'\bINFORMATION_SCHEMA\s*\.\s*SCHEMATA\b', re.IGNORECASE)
+_table_options_re = re.compile(r'\)\s*(?:DEFAULT\s+)?(?:CHARSET|CHARACTER\s+SET)\b[^)]*$', re.IGNORECASE)
+_create_schema_re = re.compile(r'^\s*CREATE\s+SCHEMA\s+`?(\w+)`?', re.IGNORECASE)
+_create_like_re = re.compile(r'^\s*CREATE\s+TABLE\s+`(\w+)`\s+LIKE\s+`(\w+)`\s*$', re.IGNORECASE)
+_create_view_re = re.compile(r'^\s*CREATE\s+VIEW\b', re.IGNORECASE)
+_ddl_table_name_re = re.compile(r'^(CREATE\s+TABLE\s+)(?:`[^`]+`|"[^"]+"|\w+)', re.IGNORECASE)
+_ddl_index_name_re = re.compile(
+    r'^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+)(?:`([^`]+)`|"([^"]+)"|(\w+))(\s+ON\s+)(?:`[^`]+`|"[^"]+"|\w+)',
+    re.IGNORECASE
+)
+_schema_name_re = re.compile(r'^\w+$')
+
+
+def _adapt_datetime(value: datetime.datetime) -> str:
+    # MySQL DATETIME columns don't keep fractional seconds
+    return value.isoformat(sep=' ', timespec='seconds')
+
+
+def _convert_datetime(value: bytes):
+    try:
+        return datetime.datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+sqlite3.register_adapter(datetime.datetime, _adapt_datetime)
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('TIMESTAMP', _convert_datetime)
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(operation: str, schemas: frozenset = frozenset(), main_schema: str = 'necrobot') -> str:
+    """Translate a MySQL statement, as written in the db modules, to SQLite.
+
+    Parameters
+    ----------
+    operation: str
+        The MySQL statement.
+    schemas: frozenset[str]
+        The names of the existing league schemas. Only names qualified by one of these (or by main_schema) are
+        rewritten, so that `table`.`column` references are left alone.
+    main_schema: str
+        The name of the necrobot schema, whose tables are unprefixed.
+
+    Returns
+    -------
+    str
+        The SQLite statement.
+    """
+    def table_name(match):
+        schema, table = match.group(1), match.group(2)
+        if schema == main_schema:
+            return '`{0}`'.format(table)
+        elif schema in schemas:
+            return '`{0}__{1}`'.format(schema, table)
+        return match.group(0)
+
+    def placeholder(match):
+        if match.group(1) is not None:
+            return ':' + match.group(1)
+        return '?' if match.group(0) == '%s' else '%'
+
+    sql = _qualified_name_re.sub(table_name, operation)
+    sql = _placeholder_re.sub(placeholder, sql)
+    sql = _schemata_re.sub('`_schemata`', sql)
+    sql = _insert_ignore_re.sub('INSERT OR IGNORE', sql)
+    sql = _last_insert_id_re.sub('last_insert_rowid()', sql)
+    sql = _if_fn_re.sub('IIF(', sql)
+    sql = _greatest_fn_re.sub('MAX(', sql)
+    sql = _least_fn_re.sub('MIN(', sql)
+    sql = _div_re.sub('/', sql)
+    sql = _table_options_re.sub(')', sql.rstrip())
+
+    on_duplicate = _on_duplicate_re.search(sql)
+    if on_duplicate is not None:
+        sql = sql[:on_duplicate.start()] \
+            + 'ON CONFLICT DO UPDATE SET' \
+            + _values_fn_re.sub(r'excluded.\1', sql[on_duplicate.end():])
+    return sql
+
+
+def _literal(value) -> str:
+    """The value as a SQL literal, for statements that can't take parameters."""
+    if value is None:
+        return 'NULL'
+    elif isinstance(value, bool):
+        return '1' if value else '0'
+    elif isinstance(value, (int, float)):
+        return str(value)
+    return "'{0}'".format(str(value).replace("'", "''"))
+
+
+def _convert_params(params):
+    if params is None:
+        return ()
+    elif isinstance(params, dict):
+        return params
+    return tuple(params)
+
+
+@contextlib.contextmanager
+def _mysql_errors():
+    """Re-raise sqlite3 errors as the corresponding mysql.connector errors, which is what the db modules catch."""
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        raise mysql.connector.errors.IntegrityError(msg=str(e)) from e
+    except (sqlite3.OperationalError, sqlite3.ProgrammingError) as e:
+        raise mysql.connector.errors.ProgrammingError(msg=str(e)) from e
+    except sqlite3.Error as e:
+        raise mysql.connector.errors.DatabaseError(msg=str(e)) from e
+
+
+class SQLiteCursor(object):
+    """A cursor with the parts of the mysql.connector cursor interface that the bot uses. Results are always read in
+    full on execute(), as with a buffered MySQL cursor.
+    """
+    def __init__(self, connection):
+        self._connection = connection   # type: SQLiteConnection
+        self._rows = []
+        self._next_row = 0
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @property
+    def with_rows(self) -> bool:
+        return self.description is not None
+
+    @property
+    def column_names(self) -> tuple:
+        return tuple(col[0] for col in self.description) if self.description is not None else tuple()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def execute(self, operation: str, params=None, multi=False) -> None:
+        self._rows = []
+        self._next_row = 0
+        self.description = None
+        self.rowcount = -1
+
+        with _mysql_errors():
+            create_schema = _create_schema_re.match(operation)
+            if create_schema is not None:
+                self._connection.create_schema(create_schema.group(1))
+                self.rowcount = 1
+                return
+
+            if params and _create_view_re.match(operation):
+                # SQLite doesn't allow parameters in a view definition
+                if isinstance(params, dict):
+                    operation = operation % {key: _literal(val) for key, val in params.items()}
+                else:
+                    operation = operation % tuple(_literal(val) for val in params)
+                params = None
+
+            sql = translate(operation, self._connection.schemas, self._connection.main_schema)
+            create_like = _create_like_re.match(sql)
+            if create_like is not None:
+                self._connection.copy_table(create_like.group(2), create_like.group(1))
+                self.rowcount = 0
+                return
+
+            cursor = self._connection.db.cursor()
+            try:
+                cursor.execute(sql, _convert_params(params))
+                self._read_result(cursor)
+            finally:
+                cursor.close()
+
+    def executemany(self, operation: str, seq_params) -> None:
+        self._rows = []
+        self._next_row = 0
+        self.description = None
+        with _mysql_errors():
+            sql = translate(operation, self._connection.schemas, self._connection.main_schema)
+            cursor = self._connection.db.cursor()
+            try:
+                cursor.executemany(sql, [_convert_params(params) for params in seq_params])
+                self._read_result(cursor)
+            finally:
+                cursor.close()
+
+    def fetchone(self) -> Optional[tuple]:
+        if self._next_row >= len(self._rows):
+            return None
+        self._next_row += 1
+        return self._rows[self._next_row - 1]
+
+    def fetchmany(self, size=1) -> list:
+        rows = self._rows[self._next_row:self._next_row + size]
+        self._next_row += len(rows)
+        return rows
+
+    def fetchall(self) -> list:
+        rows = self._rows[self._next_row:]
+        self._next_row = len(self._rows)
+        return rows
+
+    def close(self) -> None:
+        self._rows = []
+        self._next_row = 0
+
+    def _read_result(self, cursor: sqlite3.Cursor) -> None:
+        self.description = cursor.description
+        self.lastrowid = cursor.lastrowid
+        if self.description is not None:
+            self._rows = cursor.fetchall()
+            self.rowcount = len(self._rows)
+        else:
+            self.rowcount = cursor.rowcount
+
+
+class SQLiteConnection(object):
+    """A SQLite database with the parts of the mysql.connector connection interface that the bot uses."""
+    def __init__(self, filename: str, main_schema: str):
+        """
+        Parameters
+        ----------
+        filename: str
+            The database file, or ':memory:'.
+        main_schema: str
+            The name of the necrobot schema (i.e. Config.MYSQL_DB_NAME).
+        """
+        self.main_schema = main_schema
+        self.schemas = frozenset()      # type: frozenset
+        self.created = False
+        self.db = None                  # type: Optional[sqlite3.Connection]
+        self._filename = filename
+        self.reconnect()
+
+    def is_connected(self) -> bool:
+        return self.db is not None
+
+    def reconnect(self) -> None:
+        if self._filename != ':memory:' and os.path.dirname(self._filename):
+            os.makedirs(os.path.dirname(self._filename), exist_ok=True)
+        self.db = sqlite3.connect(self._filename, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        if self._filename != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+
+        if self.db.execute("SELECT 1 FROM sqlite_master WHERE name = '_schemata'").fetchone() is None:
+            console.info('Creating SQLite database {0}.'.format(self._filename))
+            with open(_SCHEMA_FILE, 'r') as file:
+                self.db.executescript(file.read())
+            self.db.execute('INSERT INTO `_schemata` (`SCHEMA_NAME`) VALUES (?)', (self.main_schema,))
+            self.db.commit()
+            self.created = True
+        self.schemas = frozenset(row[0] for row in self.db.execute('SELECT `SCHEMA_NAME` FROM `_schemata`'))
+
+    def cursor(self, **kwargs) -> SQLiteCursor:
+        """Keyword arguments (buffered, prepared) are accepted for compatibility, and ignored."""
+        return SQLiteCursor(self)
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def rollback(self) -> None:
+        self.db.rollback()
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def create_schema(self, schema_name: str) -> None:
+        """Emulates CREATE SCHEMA. The schema's tables must be created separately."""
+        self.db.execute('INSERT INTO `_schemata` (`SCHEMA_NAME`) VALUES (?)', (schema_name,))
+        self.schemas = self.schemas | {schema_name}
+
+    def copy_table(self, source: str, dest: str) -> None:
+        """Emulates CREATE TABLE dest LIKE source, by copying the definitions of the table and its indexes."""
+        definitions = self.db.execute(
+            """
+            SELECT `type`, `sql`
+            FROM `sqlite_master`
+            WHERE `tbl_name` = ? AND `type` IN ('table', 'index') AND `sql` IS NOT NULL
+            ORDER BY `type` = 'index'
+            """,
+            (source,)
+        ).fetchall()
+        if not definitions:
+            raise sqlite3.OperationalError('no such table: {0}'.format(source))
+
+        for def_type, sql in definitions:
+            if def_type == 'table':
+                sql = _ddl_table_name_re.sub(lambda m: '{0}`{1}`'.format(m.group(1), dest), sql, count=1)
+            else:
+                sql = _ddl_index_name_re.sub(
+                    lambda m: '{0}`{1}__{2}`{3}`{4}`'.format(
+                        m.group(1), dest, m.group(2) or m.group(3) or m.group(4), m.group(5), dest
+                    ),
+                    sql,
+                    count=1
+                )
+            self.db.execute(sql)
+
+    def create_league_schema(self, schema_name: str) -> None:
+        """Create a league schema's tables and views, as leaguedb.create_league does (without the `leagues` row)."""
+        if not _schema_name_re.match(schema_name):
+            raise ValueError('Invalid schema name: {0}'.format(schema_name))
+        self.create_schema(schema_name)
+        for table in LEAGUE_TABLES:
+            self.copy_table(table, '{0}__{1}'.format(schema_name, table))
+        with open(_LEAGUE_SCHEMA_FILE, 'r') as file:
+            self.db.executescript(file.read().format(schema=schema_name))
+
+
+def load_fixtures(connection: SQLiteConnection, filename: str) -> None:
+    """Load rows into the database from a JSON fixture file. The file holds an object mapping table names to lists of
+    rows, each an object mapping column names to values, e.g.:
+
+        {
+            "users": [{"user_id": 1, "discord_id": 1234, "discord_name": "incnone", "twitch_name": "incnone"}],
+            "condor_s7.matches": [{"match_id": 1, "racer_1_id": 1, "racer_2_id": 2, ...}]
+        }
+
+    Tables are named as `table` in the necrobot schema and as `schema.table` in a league schema; league schemas that
+    don't exist yet are created (their `leagues` rows should be listed in the fixture too). Datetimes are written as
+    'YYYY-MM-DD HH:MM:SS' strings.
+    """
+    with open(filename, 'r') as file:
+        fixtures = json.load(file)
+
+    num_rows = 0
+    for table_name, rows in fixtures.items():
+        schema, _, table = table_name.rpartition('.')
+        if schema and schema != connection.main_schema:
+            if schema not in connection.schemas:
+                connection.create_league_schema(schema)
+            table = '{0}__{1}'.format(schema, table)
+
+        for row in rows:
+            connection.db.execute(
+                'INSERT INTO `{0}` ({1}) VALUES ({2})'.format(
+                    table,
+                    ', '.join('`{0}`'.format(col) for col in row.keys()),
+                    ', '.join(['?'] * len(row))
+                ),
+                tuple(row.values())
+            )
+        num_rows += len(rows)
+
+    connection.db.commit()
+    console.info('Loaded {0} rows from fixture file {1}.'.format(num_rows, filename))
+
+
+def connect(filename: str, main_schema: str, fixture_file: str = '') -> SQLiteConnection:
+    """Open the SQLite database, creating it if needed. A newly created database is filled from fixture_file, if
+    given.
+    """
+    connection = SQLiteConnection(filename, main_schema)
+    if connection.created and fixture_file:
+        try:
+            load_fixtures(connection, fixture_file)
+        except Exception:
+            connection.close()
+            raise
+    return connection
+
+
+class SQLitePool(DBPool):
+    """A DBPool holding a single SQLiteConnection."""
+
+    def __init__(self, filename: str, fixture_file: str = '', prepared_cache_size: int = 32):
+        """
+        Parameters
+        ----------
+        filename: str
+            The database file, or ':memory:'.
+        fixture_file: str
+            A JSON fixture file to load into the database if it is newly created (see load_fixtures()).
+        prepared_cache_size: int
+            The size of the per-connection statement cache. (SQLite statements aren't prepared server-side, but
+            the cache still saves translating them.)
+        """
+        # The MySQL connection arguments are unused
+        DBPool.__init__(
+            self,
+            pool_size=1,
+            host='',
+            user='',
+            passwd='',
+            database=Config.MYSQL_DB_NAME,
+            prepared_cache_size=prepared_cache_size
+        )
+        self._filename = filename
+        self._fixture_file = fixture_file
+
+    def _connect(self) -> SQLiteConnection:
+        return connect(self._filename, Config.MYSQL_DB_NAME, self._fixture_file)
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    def test_translate(self):
+        schemas = frozenset(['necrobot', 'condor_s7'])
+        self.assertEqual(
+            translate('SELECT `user_id` FROM `condor_s7`.`entrants` WHERE `entrants`.`user_id`=%s', schemas),
+            'SELECT `user_id` FROM `condor_s7__entrants` WHERE `entrants`.`user_id`=?'
+        )
+        self.assertEqual(
+            translate('SELECT * FROM `necrobot`.`users` WHERE user_id=%(uid)s', schemas),
+            'SELECT * FROM `users` WHERE user_id=:uid'
+        )
+        self.assertEqual(
+            translate('INSERT INTO ratings (discord_id, mu) VALUES (%s,%s) ON DUPLICATE KEY UPDATE mu=VALUES(mu)'),
+            'INSERT INTO ratings (discord_id, mu) VALUES (?,?) ON CONFLICT DO UPDATE SET mu=excluded.mu'
+        )
+        self.assertEqual(
+            translate('SELECT IF(a, GREATEST(b, c), d DIV 2), LAST_INSERT_ID()'),
+            'SELECT IIF(a, MAX(b, c), d / 2), last_insert_rowid()'
+        )
+        self.assertEqual(
+            translate('CREATE TABLE `x` (`user_id` smallint unsigned NOT NULL) DEFAULT CHARSET=utf8'),
+            'CREATE TABLE `x` (`user_id` smallint unsigned NOT NULL)'
+        )
+
+    def test_league_schema(self):
+        connection = SQLiteConnection(':memory:', 'necrobot')
+        cursor = connection.cursor()
+        cursor.execute('CREATE SCHEMA `s1` DEFAULT CHARACTER SET = utf8')
+        cursor.execute('CREATE TABLE `s1`.`races` LIKE `necrobot`.`races`')
+        cursor.execute(
+            'SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_NAME = %s',
+            ('s1',)
+        )
+        self.assertEqual(cursor.fetchall(), [('s1',)])
+
+        timestamp = datetime.datetime(2019, 5, 1, 20, 30)
+        cursor.execute('INSERT INTO `s1`.`races` (timestamp, type_id) VALUES (%s, %s)', (timestamp, 3))
+        cursor.execute('SELECT LAST_INSERT_ID()')
+        race_id = cursor.fetchone()[0]
+        cursor.execute('SELECT `timestamp` FROM `s1`.`races` WHERE `race_id` = %s', (race_id,))
+        self.assertEqual(cursor.fetchone(), (timestamp,))
+
+        cursor.execute('INSERT IGNORE INTO `races` (race_id, type_id) VALUES (%s, %s), (%s, %s)', (1, 1, 1, 2))
+        self.assertEqual(cursor.rowcount, 1)
+        connection.close()
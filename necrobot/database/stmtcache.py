@@ -0,0 +1,82 @@
+"""
+A per-connection LRU cache of server-side prepared statements. Each cached statement is held open by its own prepared
+cursor, so re-executing the same SQL text only sends the parameters.
+"""
+
+import collections
+from typing import Tuple
+
+import mysql.connector
+import mysql.connector.cursor
+
+
+class PreparedStatementCache(object):
+    def __init__(self, connection: mysql.connector.MySQLConnection, capacity: int):
+        """
+        Parameters
+        ----------
+        connection: MySQLConnection
+            The connection the statements are prepared on.
+        capacity: int
+            The maximum number of statements to keep prepared; the least recently used is deallocated first.
+        """
+        self._connection = connection
+        self._capacity = max(int(capacity), 1)
+        self._cursors = collections.OrderedDict()   # type: collections.OrderedDict
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def execute(self, operation: str, params: tuple = ()) -> Tuple[list, int, int]:
+        """Execute the statement, preparing it first if it isn't cached. Only positional (%s) parameters are
+        supported.
+
+        Returns
+        -------
+        Tuple[list, int, int]
+            The result rows, the rowcount, and the lastrowid.
+        """
+        entry = self._cursors.get(operation)
+        if entry is None:
+            self.misses += 1
+            # MySQLCursorPrepared only reuses its statement if it is passed the *same* string object, so we store the
+            # string alongside the cursor.
+            entry = (operation, self._connection.cursor(prepared=True))
+            self._cursors[operation] = entry
+            if len(self._cursors) > self._capacity:
+                _, (_, evicted_cursor) = self._cursors.popitem(last=False)
+                evicted_cursor.close()
+        else:
+            self.hits += 1
+            self._cursors.move_to_end(operation)
+
+        cached_operation, cursor = entry
+        try:
+            cursor.execute(cached_operation, tuple(params))
+            rows = cursor.fetchall() if cursor.with_rows else []
+        except mysql.connector.Error:
+            # Don't trust a statement whose execution failed; prepare it again next time
+            del self._cursors[operation]
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+            raise
+        return rows, cursor.rowcount, cursor.lastrowid
+
+    def clear(self) -> None:
+        """Deallocate all cached statements."""
+        for _, cursor in self._cursors.values():
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        self._cursors.clear()
+
+    def invalidate(self) -> None:
+        """Forget all cached statements without deallocating them. Call this after the connection reconnects, since
+        the server has already dropped the old session's statements.
+        """
+        self._cursors.clear()
@@ -75,6 +75,7 @@ standingssheet
         match
         matchinfo
     user/
+        necrouser
         userlib
     util/
         console
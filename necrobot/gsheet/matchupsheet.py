@@ -15,6 +15,8 @@ from necrobot.match.match import Match
 from necrobot.user import userlib
 from necrobot.util import console
 
+MATCHVIEW_PAGE_SIZE = 500
+
 
 class MatchupSheetIndexData(WorksheetIndexData):
     def __init__(self, gsheet_id: str):
@@ -76,58 +78,77 @@ class MatchupSheet(object):
         await self.column_data.refresh_all()
         header_row = ['Match ID', 'Autogenned', 'Racer 1', 'Racer 2', 'Date', 'Winner', 'Score', 'Cawmentary', 'Vod']
 
-        # Get the match data
-        matchview_data = await matchdb.get_matchview_raw_data()
-
-        # Construct the SheetRange to update
-        range_to_update = SheetRange(
-            ul_cell=(1, 1),
-            lr_cell=(len(matchview_data) + 1, len(header_row)),
-            wks_name=self.wks_name,
+        # Write the header, then the match data a batch at a time
+        await self.column_data.update_cells(
+            sheet_range=SheetRange(ul_cell=(1, 1), lr_cell=(1, len(header_row)), wks_name=self.wks_name),
+            values=[header_row],
+            raw_input=False
         )
 
-        # Construct the value array to place in the sheet
-        values = [header_row]
-        for raw_match in matchview_data:
-            cawmentator_name = raw_match[4]
+        # Read and write a page at a time; no database connection is held while we wait on the Sheets API
+        next_row = 2
+        matchview_data = await matchdb.get_matchview_raw_data_page(limit=MATCHVIEW_PAGE_SIZE)
+        while matchview_data:
+            # Construct the SheetRange to update
+            range_to_update = SheetRange(
+                ul_cell=(next_row, 1),
+                lr_cell=(next_row + len(matchview_data) - 1, len(header_row)),
+                wks_name=self.wks_name,
+            )
+            next_row += len(matchview_data)
 
-            cawmentator_str = 'twitch.tv/{0}'.format(cawmentator_name) if cawmentator_name else ''
-            if raw_match[3] is None or not raw_match[10]:
-                time_str = ''
-            else:
-                time_str = pytz.utc.localize(raw_match[3]).astimezone(pytz.timezone('US/Eastern'))\
-                    .strftime('%Y-%m-%d %H:%M:%S')
-
-            if raw_match[7]:    # completed
-                if raw_match[5] >= raw_match[6]:
-                    winner_str = raw_match[1]
-                    score_str = "'{r1}-{r2}".format(r1=raw_match[5], r2=raw_match[6])
-                else:
-                    winner_str = raw_match[2]
-                    score_str = "'{r2}-{r1}".format(r1=raw_match[5], r2=raw_match[6])
-            else:
-                winner_str = ''
-                score_str = ''
-
-            autogen_str = 'Auto-gen' if raw_match[9] else 'Challenge'
-
-            values.append([
-                raw_match[0],
-                autogen_str,
-                raw_match[1],
-                raw_match[2],
-                time_str,
-                winner_str,
-                score_str,
-                cawmentator_str,
-                raw_match[8] if raw_match[8] is not None else '',
-            ])
+            # Construct the value array to place in the sheet
+            values = []
+            for raw_match in matchview_data:
+                values.append(self._get_matchview_row(raw_match))
 
-        await self.column_data.update_cells(
-            sheet_range=range_to_update,
-            values=values,
-            raw_input=False
-        )
+            await self.column_data.update_cells(
+                sheet_range=range_to_update,
+                values=values,
+                raw_input=False
+            )
+
+            if len(matchview_data) < MATCHVIEW_PAGE_SIZE:
+                break
+            matchview_data = await matchdb.get_matchview_raw_data_page(
+                after_row=matchview_data[-1], limit=MATCHVIEW_PAGE_SIZE
+            )
+
+    @staticmethod
+    def _get_matchview_row(raw_match) -> list:
+        cawmentator_name = raw_match[4]
+
+        cawmentator_str = 'twitch.tv/{0}'.format(cawmentator_name) if cawmentator_name else ''
+        if raw_match[3] is None or not raw_match[10]:
+            time_str = ''
+        else:
+            time_str = pytz.utc.localize(raw_match[3]).astimezone(pytz.timezone('US/Eastern'))\
+                .strftime('%Y-%m-%d %H:%M:%S')
+
+        if raw_match[7]:    # completed
+            if raw_match[5] >= raw_match[6]:
+                winner_str = raw_match[1]
+                score_str = "'{r1}-{r2}".format(r1=raw_match[5], r2=raw_match[6])
+            else:
+                winner_str = raw_match[2]
+                score_str = "'{r2}-{r1}".format(r1=raw_match[5], r2=raw_match[6])
+        else:
+            winner_str = ''
+            score_str = ''
+
+        autogen_str = 'Auto-gen' if raw_match[9] else 'Challenge'
+
+        return [
+            raw_match[0],
+            autogen_str,
+            raw_match[1],
+            raw_match[2],
+            time_str,
+            winner_str,
+            score_str,
+            cawmentator_str,
+            raw_match[8] if raw_match[8] is not None else '',
+        ]
 
     async def get_matches(self, **kwargs):
         """Read racer names and match types from the GSheet; create corresponding matches.
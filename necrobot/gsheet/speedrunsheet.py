@@ -65,6 +65,7 @@ class SpeedrunSheet(object):
 
         # Construct the value array to place in the sheet
         values = [header_row]
+        racer_users = await userlib.get_users(user_ids=[raw_entry[1] for raw_entry in speedrun_data])
         for raw_entry in speedrun_data:
             run_id = raw_entry[0]
             user_id = raw_entry[1]
@@ -75,7 +76,7 @@ class SpeedrunSheet(object):
             verified_bool = raw_entry[6]
 
             # Convert user ID to a username
-            racer_user = await userlib.get_user(user_id=user_id)
+            racer_user = racer_users.get(user_id)
 
             # Convert run type to a string
             race_info = await racedb.get_race_info_from_type_id(race_type=run_type_id)
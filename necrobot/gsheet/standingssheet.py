@@ -10,7 +10,7 @@ from necrobot.gsheet.worksheetindexdata import WorksheetIndexData
 from necrobot.match import matchdb, matchutil
 from necrobot.match.match import Match
 from necrobot.match.matchinfo import MatchInfo
-from necrobot.user import userlib
+from necrobot.user import necrouser, userlib
 from necrobot.util import console
 
 
@@ -137,10 +137,12 @@ class StandingsSheet(object):
             r1_col = None
             r2_col = None
             values = value_range['values']
+            racers = [match.racer_1, match.racer_2]
 
             for row, row_values in enumerate(values):
                 gsheet_name = row_values[self.column_data.racer]
-                if match.racer_1.name_regex.match(gsheet_name):
+                row_racer = necrouser.find_by_name(racers, gsheet_name)
+                if row_racer is not None and row_racer is match.racer_1:
                     r1_row = row
                     match_dupe_1 = match_dupe_number
                     for col in range(self.column_data.getcol(colname), len(row_values)):
@@ -149,7 +151,7 @@ class StandingsSheet(object):
                             if match_dupe_1 < 0:
                                 r1_col = col
                                 break
-                elif match.racer_2.name_regex.match(gsheet_name):
+                elif row_racer is not None and row_racer is match.racer_2:
                     r2_row = row
                     match_dupe_2 = match_dupe_number
                     for col in range(self.column_data.getcol(colname), len(row_values)):
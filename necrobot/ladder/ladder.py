@@ -1,7 +1,7 @@
-import asyncio
 import datetime
 import pytz
 from necrobot.util import server
+from necrobot.util import timerwheel
 
 
 DO_AUTOMATCHING = False
@@ -11,31 +11,34 @@ AUTOMATCH_HOUR = 12  # Noon UTC
 
 class Ladder(object):
     def __init__(self):
-        self._ladder_automatch_future = asyncio.ensure_future(self._wait_and_automatch())
+        self._ladder_automatch_timer = None
+        self._schedule_automatch()
 
     def refresh(self):
         pass
 
     def close(self):
-        self._ladder_automatch_future.cancel()
+        if self._ladder_automatch_timer is not None:
+            self._ladder_automatch_timer.cancel()
 
     @property
     def client(self):
         return server.client
 
-    async def _wait_and_automatch(self):
+    def _schedule_automatch(self):
         if not DO_AUTOMATCHING:
             return
 
-        utcnow_dt = datetime.datetime.utcnow()
+        utcnow_dt = pytz.utc.localize(datetime.datetime.utcnow())
         today_date = utcnow_dt.date()
         automatch_date = today_date + datetime.timedelta(days=((AUTOMATCH_WEEKDAY - today_date.weekday()) % 7))
         automatch_dt = pytz.utc.localize(
             datetime.datetime.combine(automatch_date, datetime.time(hour=AUTOMATCH_HOUR)))
         time_until_automatch = automatch_dt - utcnow_dt
 
-        await asyncio.sleep(time_until_automatch)
-        await self._make_automatches()
+        self._ladder_automatch_timer = timerwheel.schedule(
+            time_until_automatch.total_seconds(), self._make_automatches, name='ladder-automatch'
+        )
 
     async def _make_automatches(self):
         pass
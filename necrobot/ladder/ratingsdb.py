@@ -9,9 +9,9 @@ from necrobot.ladder.rating import Rating
 
 
 async def get_rating(discord_id: int) -> Rating:
-    async with DBConnect(commit=False) as cursor:
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
         params = (discord_id,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT trueskill_mu, trueskill_sigma 
             FROM ratings 
@@ -28,7 +28,7 @@ async def get_rating(discord_id: int) -> Rating:
     async with DBConnect(commit=True) as cursor:
         rating = ratingutil.create_rating()
         params = (discord_id, rating.mu, rating.sigma,)
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO ratings 
             (discord_id, trueskill_mu, trueskill_sigma) 
@@ -42,7 +42,7 @@ async def get_rating(discord_id: int) -> Rating:
 async def set_rating(discord_id: int, rating: Rating):
     async with DBConnect(commit=True) as cursor:
         params = (discord_id, rating.mu, rating.sigma,)
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO ratings 
                 (discord_id, trueskill_mu, trueskill_sigma) 
@@ -52,7 +52,7 @@ async def create_league(schema_name: str) -> League:
 
     params = (schema_name,)
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT `league_name` 
             FROM `leagues` 
@@ -63,7 +63,7 @@ async def create_league(schema_name: str) -> League:
         for row in cursor:
             raise necrobot.exception.LeagueAlreadyExists(row[0])
 
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT SCHEMA_NAME 
             FROM INFORMATION_SCHEMA.SCHEMATA 
@@ -74,14 +74,14 @@ async def create_league(schema_name: str) -> League:
         for _ in cursor:
             raise necrobot.exception.LeagueAlreadyExists('Schema exists, but is not a CoNDOR event.')
 
-        cursor.execute(
+        await cursor.execute(
             """
             CREATE SCHEMA `{schema_name}` 
             DEFAULT CHARACTER SET = utf8 
             DEFAULT COLLATE = utf8_general_ci
             """.format(schema_name=schema_name)
         )
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO `leagues` 
             (`schema_name`) 
@@ -90,7 +90,7 @@ async def create_league(schema_name: str) -> League:
             params
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             CREATE TABLE `{schema_name}`.`entrants` (
                 `user_id` smallint unsigned NOT NULL,
@@ -100,7 +100,7 @@ async def create_league(schema_name: str) -> League:
         )
 
         for tablename in ['matches', 'match_races', 'races', 'race_runs', 'speedruns']:
-            cursor.execute(
+            await cursor.execute(
                 "CREATE TABLE `{league_schema}`.`{table}` LIKE `{necrobot_schema}`.`{table}`".format(
                     league_schema=schema_name,
                     necrobot_schema=Config.MYSQL_DB_NAME,
@@ -111,7 +111,7 @@ async def create_league(schema_name: str) -> League:
         def tablename(table):
             return '`{league_schema}`.`{table}`'.format(league_schema=schema_name, table=table)
 
-        cursor.execute(
+        await cursor.execute(
             """
             CREATE VIEW {race_summary} AS
                 SELECT 
@@ -149,7 +149,7 @@ async def create_league(schema_name: str) -> League:
             )
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             CREATE VIEW {match_info} AS
                 SELECT 
@@ -202,7 +202,7 @@ async def create_league(schema_name: str) -> League:
             )
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             CREATE VIEW {league_info} AS
                 SELECT *
@@ -228,7 +228,7 @@ async def get_entrant_ids() -> list:
     list[int]
     """
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT `user_id`
             FROM {entrants}
@@ -254,7 +254,7 @@ async def get_league(schema_name: str) -> League:
     """
     params = (schema_name,)
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT 
                `leagues`.`league_name`, 
@@ -319,7 +319,7 @@ async def register_user(user_id: int) -> None:
     """
     async with DBConnect(commit=True) as cursor:
         params = (user_id,)
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO {entrants}
                 (user_id)
@@ -356,7 +356,7 @@ async def write_league(league: League) -> None:
             league.speedrun_gsheet_id
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO `leagues` 
             (
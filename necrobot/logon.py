@@ -6,7 +6,6 @@ should be placed in a coroutine and passed to logon in the on_ready_fn parameter
 """
 
 import asyncio
-import datetime
 import logging
 import os
 import sys
@@ -17,8 +16,10 @@ import discord
 
 from necrobot import config
 from necrobot.botbase.necrobot import Necrobot
+from necrobot.database.dbconnect import DBConnect
+from necrobot.race import racejournal
 # from necrobot.stream.vodrecord import VodRecorder
-from necrobot.util import console
+from necrobot.util import console, journal, logsink
 from necrobot.util.necrodancer import seedgen
 
 
@@ -51,12 +52,16 @@ def logon(
         warnings.simplefilter("always", ResourceWarning)
 
     # Logging--------------------------------------------------
-    log_timestr_format = '%Y-%m-%d-%H-%M-%S'
-    log_file_format = '{prefix}-{timestr}.log'
-    log_output_filename = os.path.join(
-        'logging',
-        log_file_format.format(prefix=logging_prefix, timestr=datetime.datetime.utcnow().strftime(log_timestr_format))
-    )
+    # Each bot logs to its own directory, with one rotating log file per logger
+    log_directory = os.path.join('logging', logging_prefix)
+
+    def make_file_handler(logger_name: str) -> logging.Handler:
+        return logsink.RotatingLogSink(
+            filename=os.path.join(log_directory, '{0}.log'.format(logger_name)),
+            max_bytes=config.Config.LOG_ROTATE_BYTES,
+            max_age=config.Config.LOG_ROTATE_HOURS * 3600,
+            retain_bytes=config.Config.LOG_RETAIN_BYTES
+        )
 
     # Set up logger
     if config.Config.full_debugging():
@@ -81,29 +86,35 @@ def logon(
 
     stdout_handler = logging.StreamHandler(stream=sys.stdout)
     stderr_handler = logging.StreamHandler()
-    file_handler = logging.FileHandler(filename=log_output_filename, encoding='utf-8', mode='w')
+    file_handlers = {
+        logger_name: make_file_handler(logger_name) for logger_name in ['necrobot', 'discord', 'asyncio']
+    }
 
     # stdout_handler.setLevel(logging.INFO)
     # stderr_handler.setLevel(logging.INFO)
 
     stdout_handler.setFormatter(stream_formatter)
     stderr_handler.setFormatter(stream_formatter)
-    file_handler.setFormatter(file_formatter)
+    for file_handler in file_handlers.values():
+        file_handler.setFormatter(file_formatter)
 
     logging.getLogger('discord').setLevel(discord_level)
-    logging.getLogger('discord').addHandler(file_handler)
-    logging.getLogger('discord').addHandler(stderr_handler)
     logging.getLogger('asyncio').setLevel(asyncio_level)
-    logging.getLogger('asyncio').addHandler(file_handler)
-    logging.getLogger('asyncio').addHandler(stderr_handler)
-
     logger = logging.getLogger('necrobot')
     logger.setLevel(necrobot_level)
-    logger.addHandler(file_handler)
-    logger.addHandler(stdout_handler)
+
+    # Handlers run on a background thread, so that the event loop never waits on log I/O
+    console.start_background_logging({
+        'discord': [file_handlers['discord'], stderr_handler],
+        'asyncio': [file_handlers['asyncio'], stderr_handler],
+        'necrobot': [file_handlers['necrobot'], stdout_handler],
+    })
 
     console.info('Initializing necrobot...')
 
+    # Race journal--------------------------------------------
+    racejournal.load(journal.open_journal(os.path.join('data', 'journal', '{0}.journal'.format(logging_prefix))))
+
     # Seed the random number generator------------------------
     seedgen.init_seed()
 
@@ -120,4 +131,8 @@ def logon(
 
     finally:
         # VodRecorder().end_all_async_unsafe()
+        DBConnect.close_pool()
+        journal.close()
         config.Config.write()
+        console.stop_background_logging()
+        logsink.wait_for_archives()
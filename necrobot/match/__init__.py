@@ -43,6 +43,7 @@ cmd_match
     match/
         matchdb
     user/
+        necrouser
         userlib
     util/
         console
@@ -62,6 +63,7 @@ match
     util/
         console
         decorators
+        writebehind
 matchchannelutil
     botbase/
         necrobot
@@ -121,6 +123,8 @@ matchroom
     botbase/
         botchannel
         necroevent
+    database/
+        dbconnect
     match/
         cmd_match
         matchdb
@@ -129,6 +133,7 @@ matchroom
     race/
         cmd_race
         raceinfo
+        racejournal
         race
         raceconfig
     user/
@@ -136,7 +141,9 @@ matchroom
     util/
         console
         ordinal
+        outbox
         server
+        timerwheel
         timestr
 matchutil
     botbase/
@@ -151,6 +158,7 @@ matchutil
         raceinfo
     user/
         necrouser
+        userlib
     util/
         console
         timestr
@@ -8,7 +8,7 @@ from necrobot.botbase.commandtype import CommandType
 from necrobot.botbase.necroevent import NEDispatch
 from necrobot.match import matchdb, matchfindparse
 from necrobot.match.matchglobals import MatchGlobals
-from necrobot.user import userlib
+from necrobot.user import necrouser, userlib
 from necrobot.util import console, timestr, writechannel
 from necrobot.util.parse import dateparse
 
@@ -124,6 +124,7 @@ class Confirm(CommandType):
                 timestr.str_full_12h(match.suggested_time.astimezone(author_as_necrouser.timezone))))
 
         if match.is_scheduled:
+            await match.commit()    # Subscribers read the schedule back from the database
             await NEDispatch().publish('schedule_match', match=match)
             await cmd.channel.send(
                 'The match has been officially scheduled.')
@@ -397,12 +398,10 @@ class ChangeWinner(CommandType):
         winner = None
         winner_name = cmd.args[1]
         match = self.bot_channel.match
-        if match.racer_1.name_regex.match(winner_name):
-            winner = 1
-            winner_name = match.racer_1.display_name
-        elif match.racer_2.name_regex.match(winner_name):
-            winner = 2
-            winner_name = match.racer_2.display_name
+        winner_user = necrouser.find_by_name([match.racer_1, match.racer_2], winner_name)
+        if winner_user is not None:
+            winner = 1 if winner_user is match.racer_1 else 2
+            winner_name = winner_user.display_name
         if winner is None:
             await cmd.channel.send(
                 "Couldn't identify `{0}` as one of the racers in this match.".format(winner_name)
@@ -489,6 +488,7 @@ class ForceConfirm(CommandType):
             return
 
         match.force_confirm()
+        await match.commit()    # Subscribers read the schedule back from the database
         await NEDispatch().publish('schedule_match', match=match)
 
         await cmd.channel.send(
@@ -527,12 +527,10 @@ class ForceRecordRace(CommandType):
         winner = None
         winner_name = cmd.args[0]
         match = self.bot_channel.match
-        if match.racer_1.name_regex.match(winner_name):
-            winner = 1
-            winner_name = match.racer_1.display_name
-        elif match.racer_2.name_regex.match(winner_name):
-            winner = 2
-            winner_name = match.racer_2.display_name
+        winner_user = necrouser.find_by_name([match.racer_1, match.racer_2], winner_name)
+        if winner_user is not None:
+            winner = 1 if winner_user is match.racer_1 else 2
+            winner_name = winner_user.display_name
 
         if winner is None:
             await cmd.channel.send(
@@ -753,6 +751,7 @@ async def _do_cawmentary_command(cmd: Command, cmd_type: CommandType, add: bool)
         else:
             await cmd.channel.set_permissions(author_user.member, overwrite=None)
 
+    await match.commit()    # Subscribers read the cawmentary back from the database
     await NEDispatch().publish(event_type='set_cawmentary', match=match)
 
     # Log success
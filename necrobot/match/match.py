@@ -1,5 +1,5 @@
 import datetime
-from typing import Callable, Optional
+from typing import Callable, Dict, Optional
 
 import pytz
 
@@ -9,11 +9,17 @@ from necrobot.match.matchinfo import MatchInfo
 from necrobot.race.raceinfo import RaceInfo
 from necrobot.user import userlib
 from necrobot.user.necrouser import NecroUser
-from necrobot.util import console
+from necrobot.util import console, writebehind
 from necrobot.util.decorators import commits
 
 
 class Match(object):
+    __slots__ = (
+        '_match_id', '_racer_1_id', '_racer_1', '_racer_2_id', '_racer_2', '_suggested_time', '_finish_time',
+        '_confirmed_by_r1', '_confirmed_by_r2', '_r1_wishes_to_unconfirm', '_r2_wishes_to_unconfirm', '_match_info',
+        '_cawmentator_id', '_channel_id', '_gsheet_info', '_autogenned', '_commit'
+    )
+
     def __init__(
             self,
             commit_fn,
@@ -105,9 +111,20 @@ class Match(object):
     def __str__(self):
         return self.matchroom_name
 
-    async def initialize(self):
-        self._racer_1 = await userlib.get_user(user_id=self._racer_1_id)
-        self._racer_2 = await userlib.get_user(user_id=self._racer_2_id)
+    async def initialize(self, users: Optional[Dict[int, NecroUser]] = None):
+        """Look up the racers.
+
+        Parameters
+        ----------
+        users: Optional[Dict[int, NecroUser]]
+            Users already looked up, by user ID (e.g. by matchutil.prefetch_match_users). Racers not in it are looked
+            up in the user library.
+        """
+        racers = users if users is not None else dict()
+        if self._racer_1_id not in racers or self._racer_2_id not in racers:
+            racers = await userlib.get_users(user_ids=[self._racer_1_id, self._racer_2_id])
+        self._racer_1 = racers.get(self._racer_1_id)
+        self._racer_2 = racers.get(self._racer_2_id)
         if self._racer_1 is None or self._racer_2 is None:
             raise RuntimeError('Attempted to make a Match object with an unregistered racer.')
 
@@ -232,7 +249,11 @@ class Match(object):
         return (self.suggested_time - pytz.utc.localize(datetime.datetime.utcnow())) if self.is_scheduled else None
 
     async def commit(self) -> None:
-        """Write the match to the database."""
+        """Write the match to the database now, through the write-behind queue (see writebehind.commit)."""
+        await writebehind.commit(self)
+
+    async def write(self) -> None:
+        """Write the match to the database. Called by the write-behind queue; use commit() instead."""
         await self._commit(self)
 
     async def get_cawmentator(self) -> NecroUser or None:
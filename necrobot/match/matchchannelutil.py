@@ -87,9 +87,15 @@ async def delete_all_match_channels(
     completed_only: bool
         If True, will only find completed matches.
     """
-    for row in await matchdb.get_channeled_matches_raw_data():
-        match_id = int(row[0])
-        channel_id = int(row[13])
+    # Read just the IDs, and close the stream before talking to Discord or writing to the database, so that the
+    # stream's connection isn't held while we wait on either
+    match_channel_ids = []
+    async with matchdb.stream_channeled_matches_raw_data() as batches:
+        async for rows in batches:
+            for row in rows:
+                match_channel_ids.append((int(row[0]), int(row[13]),))
+
+    for match_id, channel_id in match_channel_ids:
         channel = server.find_channel(channel_id=channel_id)
         delete_this = True
         if channel is not None:
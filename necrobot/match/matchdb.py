@@ -4,7 +4,8 @@ Interaction with matches and match_races tables (in the necrobot schema, or a co
 import datetime
 from typing import Optional
 
-from necrobot.database.dbconnect import DBConnect
+from necrobot.database.dbconnect import DBConnect, UnitOfWork
+from necrobot.database.dbstream import DBStream
 from necrobot.database.dbutil import tn
 from necrobot.match.match import Match
 from necrobot.match.matchracedata import MatchRaceData
@@ -32,7 +33,7 @@ async def record_match_race(
             contested
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO {match_races} 
             (match_id, race_number, race_id, winner, canceled, contested) 
@@ -51,7 +52,7 @@ async def get_matches_between(user_1_id, user_2_id):
     params = (user_1_id, user_2_id, user_2_id, user_1_id,)
 
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT
                 match_id
@@ -70,7 +71,7 @@ async def add_vod(match: Match, vodlink: str):
     params = (vodlink, match.match_id,)
 
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE {matches}
             SET `vod`=%s
@@ -92,7 +93,7 @@ async def set_match_race_contested(
             race_number,
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE {match_races}
             SET `contested`=%s
@@ -114,7 +115,7 @@ async def change_winner(match: Match, race_number: int, winner: int) -> bool:
             race_to_change,
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE {match_races}
             SET `winner` = %s
@@ -136,7 +137,7 @@ async def cancel_race(match: Match, race_number: int) -> bool:
             race_to_cancel,
         )
 
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE {match_races}
             SET `canceled` = TRUE
@@ -150,7 +151,7 @@ async def cancel_race(match: Match, race_number: int) -> bool:
 async def cancel_match(match: Match) -> bool:
     params = (match.match_id,)
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             DELETE
             FROM {match_races}
@@ -158,7 +159,7 @@ async def cancel_match(match: Match) -> bool:
             """.format(match_races=tn('match_races')),
             params
         )
-        cursor.execute(
+        await cursor.execute(
             """
             DELETE
             FROM {matches}
@@ -170,6 +171,11 @@ async def cancel_match(match: Match) -> bool:
 
 
 async def write_match(match: Match):
+    async with UnitOfWork():
+        await _write_match(match)
+
+
+async def _write_match(match: Match):
     if not match.is_registered:
         await _register_match(match)
 
@@ -197,7 +203,7 @@ async def write_match(match: Match):
     )
 
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE {matches}
             SET
@@ -227,7 +233,7 @@ async def write_match(match: Match):
 async def register_match_channel(match_id: int, channel_id: int or None) -> None:
     params = (channel_id, match_id,)
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE {matches}
             SET channel_id=%s
@@ -240,7 +246,7 @@ async def register_match_channel(match_id: int, channel_id: int or None) -> None
 async def get_match_channel_id(match_id: int) -> int:
     params = (match_id,)
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT channel_id 
             FROM {matches} 
@@ -258,6 +264,24 @@ async def get_channeled_matches_raw_data(
         order_by_time: bool = False,
         racer_id: int = None
 ) -> list:
+    operation, params = _channeled_matches_query(must_be_scheduled, order_by_time, racer_id)
+    async with DBConnect(commit=False) as cursor:
+        await cursor.execute(operation, params)
+        return cursor.fetchall()
+
+
+def stream_channeled_matches_raw_data(
+        must_be_scheduled: bool = False,
+        order_by_time: bool = False,
+        racer_id: int = None,
+        batch_size: int = 100
+) -> DBStream:
+    """As get_channeled_matches_raw_data, but returns a DBStream that yields the rows in batches."""
+    operation, params = _channeled_matches_query(must_be_scheduled, order_by_time, racer_id)
+    return DBStream(operation, params, batch_size=batch_size)
+
+
+def _channeled_matches_query(must_be_scheduled: bool, order_by_time: bool, racer_id: Optional[int]) -> tuple:
     params = tuple()
 
     where_query = "`channel_id` IS NOT NULL"
@@ -271,57 +295,79 @@ async def get_channeled_matches_raw_data(
     if order_by_time:
         order_query = "ORDER BY `suggested_time` ASC"
 
+    operation = """
+        SELECT 
+             match_id, 
+             race_type_id, 
+             racer_1_id, 
+             racer_2_id, 
+             suggested_time, 
+             r1_confirmed, 
+             r2_confirmed, 
+             r1_unconfirmed, 
+             r2_unconfirmed, 
+             ranked, 
+             is_best_of, 
+             number_of_races, 
+             cawmentator_id, 
+             channel_id,
+             sheet_id,
+             sheet_row,
+             finish_time,
+             autogenned
+        FROM {matches} 
+        WHERE {where_query} {order_query}
+        """.format(matches=tn('matches'), where_query=where_query, order_query=order_query)
+    return operation, params
+
+
+async def get_matchview_raw_data():
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
-            """
-            SELECT 
-                 match_id, 
-                 race_type_id, 
-                 racer_1_id, 
-                 racer_2_id, 
-                 suggested_time, 
-                 r1_confirmed, 
-                 r2_confirmed, 
-                 r1_unconfirmed, 
-                 r2_unconfirmed, 
-                 ranked, 
-                 is_best_of, 
-                 number_of_races, 
-                 cawmentator_id, 
-                 channel_id,
-                 sheet_id,
-                 sheet_row,
-                 finish_time,
-                 autogenned
-            FROM {matches} 
-            WHERE {where_query} {order_query}
-            """.format(matches=tn('matches'), where_query=where_query, order_query=order_query), params)
+        await cursor.execute(_matchview_query())
         return cursor.fetchall()
 
 
-async def get_matchview_raw_data():
+async def get_matchview_raw_data_page(after_row: Optional[list] = None, limit: int = 500) -> list:
+    """As get_matchview_raw_data, but returns only the (up to) `limit` rows that come after `after_row` (the last row
+    of the previous page, or None for the first page). Each page is read with its own query, using the sort key of
+    `after_row` rather than an OFFSET, so no connection is held between pages and each page costs the same to read.
+    """
+    where_query = 'TRUE'
+    params = tuple()
+    if after_row is not None and after_row[3] is not None:
+        where_query = "(scheduled_time IS NULL OR scheduled_time > %s OR (scheduled_time = %s AND match_id > %s))"
+        params = (after_row[3], after_row[3], after_row[0],)
+    elif after_row is not None:
+        where_query = "(scheduled_time IS NULL AND match_id > %s)"
+        params = (after_row[0],)
+
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
-            """
-            SELECT 
-                match_id,
-                racer_1_name,
-                racer_2_name,
-                scheduled_time,
-                cawmentator_name,
-                racer_1_wins,
-                racer_2_wins,
-                completed,
-                vod,
-                autogenned,
-                scheduled
-            FROM {match_info}
-            ORDER BY -scheduled_time DESC
-            """.format(match_info=tn('match_info'))
-        )
+        await cursor.execute(_matchview_query(where_query, 'LIMIT {}'.format(int(limit))), params)
         return cursor.fetchall()
 
 
+def _matchview_query(where_query: str = 'TRUE', limit_query: str = '') -> str:
+    # Unscheduled matches last; match_id breaks ties, so that pages can be read by keyset
+    return """
+        SELECT 
+            match_id,
+            racer_1_name,
+            racer_2_name,
+            scheduled_time,
+            cawmentator_name,
+            racer_1_wins,
+            racer_2_wins,
+            completed,
+            vod,
+            autogenned,
+            scheduled
+        FROM {match_info}
+        WHERE {where_query}
+        ORDER BY scheduled_time IS NULL, scheduled_time ASC, match_id ASC
+        {limit_query}
+        """.format(match_info=tn('match_info'), where_query=where_query, limit_query=limit_query)
+
+
 async def get_all_matches_raw_data(
         must_be_channeled: bool = False,
         must_be_scheduled: bool = False,
@@ -347,7 +393,7 @@ async def get_all_matches_raw_data(
     limit_query = '' if limit is None else 'LIMIT {}'.format(limit)
 
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT 
                  match_id, 
@@ -383,14 +429,14 @@ async def get_all_matches_raw_data(
 async def delete_match(match_id: int):
     params = (match_id,)
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             DELETE FROM {match_races} 
             WHERE `match_id`=%s
             """.format(match_races=tn('match_races')),
             params
         )
-        cursor.execute(
+        await cursor.execute(
             """
             DELETE FROM {matches} 
             WHERE `match_id`=%s
@@ -402,7 +448,7 @@ async def delete_match(match_id: int):
 async def get_match_race_data(match_id: int) -> MatchRaceData:
     params = (match_id,)
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute_prepared(
             """
             SELECT canceled, winner 
             FROM {match_races} 
@@ -471,7 +517,7 @@ async def get_match_id(
         )
 
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT 
                 match_id, 
@@ -495,7 +541,7 @@ async def get_match_id(
 async def get_fastest_wins_raw(limit: int = None) -> list:
     params = (limit,)
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT
                 {race_runs}.`time` AS `time`,
@@ -543,7 +589,7 @@ async def get_fastest_wins_raw(limit: int = None) -> list:
 async def get_matchstats_raw(user_id: int) -> list:
     params = (user_id,)
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT
                 COUNT(*) AS wins,
@@ -558,7 +604,7 @@ async def get_matchstats_raw(user_id: int) -> list:
         winner_data = cursor.fetchone()
         if winner_data is None:
             winner_data = [0, None, None]
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT COUNT(*) AS losses
             FROM {race_summary}
@@ -577,7 +623,7 @@ async def get_raw_match_data(match_id: int) -> list:
     params = (match_id,)
 
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT 
                  match_id, 
@@ -621,7 +667,7 @@ async def get_match_gsheet_duplication_number(match: Match) -> int:
         the same racers that appear in rows ahead of this match; otherwise, 0.
     """
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT COUNT(*)
             FROM {matches}
@@ -643,7 +689,7 @@ async def get_match_gsheet_duplication_number(match: Match) -> int:
 
 async def scrub_unchanneled_unraced_matches() -> None:
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             DELETE {matches}
             FROM {matches}
@@ -683,7 +729,7 @@ async def _register_match(match: Match) -> None:
     )
 
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO {matches} 
             (
@@ -706,11 +752,11 @@ async def _register_match(match: Match) -> None:
             """.format(matches=tn('matches')),
             params
         )
-        cursor.execute("SELECT LAST_INSERT_ID()")
+        await cursor.execute("SELECT LAST_INSERT_ID()")
         match.set_match_id(int(cursor.fetchone()[0]))
 
         params = (match.racer_1.user_id, match.racer_2.user_id,)
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT IGNORE INTO {entrants} (user_id)
             VALUES (%s), (%s)
@@ -721,8 +767,8 @@ async def _register_match(match: Match) -> None:
 
 async def _get_uncanceled_race_number(match: Match, race_number: int) -> int or None:
     params = (match.match_id,)
-    async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
+        await cursor.execute(
             """
             SELECT `race_number` 
             FROM {0} 
@@ -740,8 +786,8 @@ async def _get_uncanceled_race_number(match: Match, race_number: int) -> int or
 
 async def _get_new_race_number(match: Match) -> int:
     params = (match.match_id,)
-    async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
+        await cursor.execute(
             """
             SELECT `race_number` 
             FROM {0} 
@@ -6,6 +6,8 @@ from necrobot.race.raceinfo import RaceInfo
 
 
 class MatchInfo(object):
+    __slots__ = ('max_races', 'is_best_of', 'ranked', 'race_info')
+
     @staticmethod
     def copy(match_info):
         the_copy = MatchInfo()
@@ -12,7 +12,7 @@ from necrobot.config import Config
 
 class MatchMgr(Manager, metaclass=Singleton):
     def __init__(self):
-        NEDispatch().subscribe(self)
+        NEDispatch().subscribe(self, event_types=['rtmp_name_change'])
 
     async def initialize(self):
         await self._recover_stored_match_rooms()
@@ -31,15 +31,14 @@ class MatchMgr(Manager, metaclass=Singleton):
     # noinspection PyMethodMayBeStatic
     async def ne_process(self, ev: NecroEvent):
         if ev.event_type == 'rtmp_name_change':
-            for row in await matchdb.get_channeled_matches_raw_data():
-                if int(row[2]) == ev.user.user_id or int(row[3]) == ev.user.user_id:
-                    channel_id = int(row[13])
-                    channel = server.find_channel(channel_id=channel_id)
-                    if channel is not None:
-                        await channel.set_permissions(
-                            target=ev.user.member,
-                            read_messages=True
-                        )
+            for row in await matchdb.get_channeled_matches_raw_data(racer_id=ev.user.user_id):
+                channel_id = int(row[13])
+                channel = server.find_channel(channel_id=channel_id)
+                if channel is not None:
+                    await channel.set_permissions(
+                        target=ev.user.member,
+                        read_messages=True
+                    )
 
     @staticmethod
     async def _recover_stored_match_rooms() -> None:
@@ -49,11 +48,13 @@ class MatchMgr(Manager, metaclass=Singleton):
         some discord.Channel on the server.
         """
         console.info('Recovering stored match rooms------------')
-        for row in await matchdb.get_channeled_matches_raw_data():
+        rows = await matchdb.get_channeled_matches_raw_data()
+        users = await matchutil.prefetch_match_users(rows)
+        for row in rows:
             channel_id = int(row[13])
             channel = server.find_channel(channel_id=channel_id)
             if channel is not None:
-                match = await matchutil.make_match_from_raw_db_data(row=row)
+                match = await matchutil.make_match_from_raw_db_data(row=row, users=users)
                 new_room = MatchRoom(match_discord_channel=channel, match=match)
                 Necrobot().register_bot_channel(channel, new_room)
                 await new_room.initialize()
@@ -10,18 +10,22 @@ import pytz
 from necrobot.botbase.necroevent import NEDispatch
 from necrobot.botbase.botchannel import BotChannel
 from necrobot.config import Config
+from necrobot.database.dbconnect import UnitOfWork
 from necrobot.match import matchdb
 from necrobot.match import cmd_match
 from necrobot.match.match import Match
 from necrobot.match.matchracedata import MatchRaceData
 from necrobot.race import cmd_race
 from necrobot.race import raceinfo
+from necrobot.race import racejournal
 from necrobot.race.race import Race, RaceEvent
 from necrobot.race.raceconfig import RaceConfig
 from necrobot.test import cmd_test
 from necrobot.user import cmd_user
 from necrobot.util import console
 from necrobot.util import ordinal
+from necrobot.util import outbox
+from necrobot.util import timerwheel
 from necrobot.util import timestr
 from necrobot.race import racedb
 
@@ -44,7 +48,7 @@ class MatchRoom(BotChannel):
         self._current_race = None               # type: Optional[Race]
         self._last_begun_race = None            # type: Optional[Race]
 
-        self._countdown_to_match_future = None  # type: Optional[asyncio.Future]
+        self._match_timer = None                # type: Optional[timerwheel.TimerHandle]
 
         self._current_race_number = None        # type: Optional[int]
 
@@ -179,9 +183,7 @@ class MatchRoom(BotChannel):
 
     async def initialize(self) -> None:
         """Async initialization method"""
-        if self._countdown_to_match_future is not None:
-            self._countdown_to_match_future.cancel()
-        self._countdown_to_match_future = asyncio.ensure_future(self._countdown_to_match_start(warn=True))
+        self._start_match_countdown(warn=True)
         self._match_race_data = await matchdb.get_match_race_data(self.match.match_id)
         self._current_race_number = self._match_race_data.num_finished + self._match_race_data.num_canceled
         self._last_begun_race_number = self._current_race_number
@@ -241,16 +243,13 @@ class MatchRoom(BotChannel):
         # noinspection PyUnresolvedReferences
         msg += '\N{BULLET} This match is a {0}.'.format(self.match.format_str)
 
-        await self.channel.send(msg)
+        await self.write(msg)
 
     async def update(self) -> None:
         if self.match.is_scheduled and self.current_race is None:
-            if self._countdown_to_match_future is not None:
-                self._countdown_to_match_future.cancel()
-            self._countdown_to_match_future = asyncio.ensure_future(self._countdown_to_match_start())
+            self._start_match_countdown()
         elif not self.match.is_scheduled:
-            if self._countdown_to_match_future is not None:
-                self._countdown_to_match_future.cancel()
+            self._cancel_match_countdown()
             self._current_race = None
 
         self._set_channel_commands()
@@ -319,9 +318,9 @@ class MatchRoom(BotChannel):
             if not self.played_all_races:
                 await self._begin_new_race()
 
-    async def write(self, text: str) -> None:
-        """Write text to the channel"""
-        await self.channel.send(text)
+    async def write(self, text: str, urgent: bool = False) -> None:
+        """Queue text to be written to the channel; urgent text skips ahead (see necrobot.util.outbox)"""
+        outbox.write(self.channel, text, urgent=urgent)
 
     async def alert_racers(self) -> None:
         """Post an alert pinging both racers in the match"""
@@ -373,52 +372,76 @@ class MatchRoom(BotChannel):
         self._update_race_data(race_winner=winner)
         await self.update()
 
+    def _start_match_countdown(self, warn: bool = False) -> None:
+        """(Re)start the countdown to the match, on the timer wheel"""
+        self._cancel_match_countdown()
+        self._match_timer = timerwheel.schedule(0, self._countdown_to_match_start, warn, name='match-countdown')
+
+    def _cancel_match_countdown(self) -> None:
+        if self._match_timer is not None:
+            if self._match_timer.cancel():
+                console.info('MatchRoom countdown to match start was canceled.')
+            self._match_timer = None
+
     async def _countdown_to_match_start(self, warn: bool = False) -> None:
         """Does things at certain times before the match
         
         Posts alerts to racers in this channel, and sends NecroEvents at alert times. Begins the match
-        at the appropriate time. This is stored as a future in this object, and is meant to be canceled
-        if this object closes.
+        at the appropriate time. Each of these is a timer on the timer wheel, which schedules the next; the
+        pending timer is stored in this object, and is meant to be canceled if this object closes.
         """
-        try:
-            if not self.match.is_scheduled:
-                return
-
-            time_until_match = self.match.time_until_match
-
-            # Begin match now if appropriate
-            if time_until_match < datetime.timedelta(seconds=0):
-                if not self.played_all_races:
-                    if warn:
-                        await self.write(
-                            'I believe that I was just restarted; an error may have occurred. I am '
-                            'beginning a new race and attempting to pick up this match where we left '
-                            'off. If this is an error, or if there are unrecorded races, please contact '
-                            'an admin.')
-                    await self._begin_new_race()
-                return
-
-            # Wait until the first warning
-            if time_until_match > Config.MATCH_FIRST_WARNING:
-                await asyncio.sleep((time_until_match - Config.MATCH_FIRST_WARNING).total_seconds())
-                await self.alert_racers()
-                await NEDispatch().publish('match_alert', match=self.match, final=False)
-
-            # Wait until the final warning
-            time_until_match = self.match.time_until_match
-            if time_until_match > Config.MATCH_FINAL_WARNING:
-                await asyncio.sleep((time_until_match - Config.MATCH_FINAL_WARNING).total_seconds())
-
-            # At this time, we've either just passed the FINAL_MATCH_WARNING or the function was just called
-            # (happens if the call comes sometime after the FINAL_MATCH_WARNING but before the match).
-            await self.alert_racers()
-            await NEDispatch().publish('match_alert', match=self.match, final=True)
-
-            await asyncio.sleep(self.match.time_until_match.total_seconds())
-            await self._begin_new_race()
-        except asyncio.CancelledError:
-            console.info('MatchRoom._countdown_to_match_start() was cancelled.')
-            raise
+        if not self.match.is_scheduled:
+            return
+
+        time_until_match = self.match.time_until_match
+
+        # Begin match now if appropriate
+        if time_until_match < datetime.timedelta(seconds=0):
+            if not self.played_all_races:
+                saved_race_state = racejournal.pop_saved_state(self.channel.id) if warn else None
+                if saved_race_state is not None:
+                    await self._restore_race(saved_race_state)
+                    return
+                if warn:
+                    await self.write(
+                        'I believe that I was just restarted; an error may have occurred. I am '
+                        'beginning a new race and attempting to pick up this match where we left '
+                        'off. If this is an error, or if there are unrecorded races, please contact '
+                        'an admin.')
+                await self._begin_new_race()
+            return
+
+        # Wait until the first warning; or, if we're past it, the final warning (if we're past that too, the
+        # final warning is given right away)
+        if time_until_match > Config.MATCH_FIRST_WARNING:
+            self._match_timer = timerwheel.schedule(
+                (time_until_match - Config.MATCH_FIRST_WARNING).total_seconds(),
+                self._match_alert, False,
+                name='match-alert'
+            )
+        else:
+            self._match_timer = timerwheel.schedule(
+                (time_until_match - Config.MATCH_FINAL_WARNING).total_seconds(),
+                self._match_alert, True,
+                name='match-alert'
+            )
+
+    async def _match_alert(self, final: bool) -> None:
+        """Alert the racers to the upcoming match, and schedule the next step of the countdown"""
+        time_until_match = self.match.time_until_match
+        if final:
+            self._match_timer = timerwheel.schedule(
+                time_until_match.total_seconds(), self._begin_new_race, name='match-start'
+            )
+        else:
+            self._match_timer = timerwheel.schedule(
+                (time_until_match - Config.MATCH_FINAL_WARNING).total_seconds(),
+                self._match_alert, True,
+                name='match-alert'
+            )
+
+        await self.alert_racers()
+        await NEDispatch().publish('match_alert', match=self.match, final=final)
 
     async def _begin_new_race(self):
         """Begin a new race"""
@@ -443,8 +466,25 @@ class MatchRoom(BotChannel):
                 ordinal.num_to_text(match_race_data.num_finished + 1),
                 self.current_race.race_info.seed))
 
-        if self._countdown_to_match_future is not None:
-            self._countdown_to_match_future.cancel()
+        self._cancel_match_countdown()
+
+    async def _restore_race(self, race_state: dict) -> None:
+        """Pick up the race that was in progress when the bot stopped, from the race journal"""
+        self.channel_commands = self._during_match_channel_commands
+
+        match_race_data = await matchdb.get_match_race_data(self.match.match_id)
+        self._current_race = Race(self, self.match.race_info,
+                                  race_config=RaceConfig(finalize_time_sec=15, auto_forfeit=1))
+        self._current_race_number = match_race_data.num_races + 1
+        await self._current_race.restore(race_state)
+        if not self._current_race.before_race:
+            self._last_begun_race = self._current_race
+            self._last_begun_race_number = self._current_race_number
+
+        await self.write(
+            'I was just restarted, and have restored the race in progress. ({0}) If this is an error, please '
+            'contact an admin.'.format(self._current_race.status_str)
+        )
 
     async def _end_match(self):
         """End the match"""
@@ -466,6 +506,7 @@ class MatchRoom(BotChannel):
             loser_wins = self._match_race_data.r2_wins
 
         self.match.set_finish_time(pytz.utc.localize(datetime.datetime.utcnow()))
+        await self.match.commit()   # Subscribers read the result back from the database
 
         await NEDispatch().publish(
             'end_match',
@@ -481,15 +522,16 @@ class MatchRoom(BotChannel):
 
     async def _record_race(self, race: Race, race_winner: int) -> None:
         """Record the given race as part of this match"""
-        await racedb.record_race(race)
-        await matchdb.record_match_race(
-            match=self.match,
-            race_number=self._current_race_number,
-            race_id=self.current_race.race_id,
-            winner=race_winner,
-            contested=self._current_race_contested,
-            canceled=False
-        )
+        async with UnitOfWork():
+            await racedb.record_race(race)
+            await matchdb.record_match_race(
+                match=self.match,
+                race_number=self._current_race_number,
+                race_id=self.current_race.race_id,
+                winner=race_winner,
+                contested=self._current_race_contested,
+                canceled=False
+            )
         self._update_race_data(race_winner=race_winner)
 
     # TODO: move to LadderManager class, trigger on appropriate event
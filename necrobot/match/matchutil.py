@@ -1,5 +1,5 @@
 import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 import pytz
 
@@ -10,6 +10,8 @@ from necrobot.match.match import Match
 from necrobot.match.matchinfo import MatchInfo
 from necrobot.race import racedb
 from necrobot.race.raceinfo import RaceInfo
+from necrobot.user import userlib
+from necrobot.user.necrouser import NecroUser
 from necrobot.util import console, timestr, strutil, rtmputil
 from necrobot.util import server
 
@@ -112,12 +114,14 @@ async def get_upcoming_and_current() -> list:
         A list of all upcoming and ongoing matches, in order. 
     """
     matches = []
-    for row in await matchdb.get_channeled_matches_raw_data(must_be_scheduled=True, order_by_time=True):
+    rows = await matchdb.get_channeled_matches_raw_data(must_be_scheduled=True, order_by_time=True)
+    users = await prefetch_match_users(rows)
+    for row in rows:
         channel_id = int(row[13]) if row[13] is not None else None
         if channel_id is not None:
             channel = server.find_channel(channel_id=channel_id)
             if channel is not None:
-                match = await make_match_from_raw_db_data(row=row)
+                match = await make_match_from_raw_db_data(row=row, users=users)
                 if match.suggested_time is None:
                     console.warning('Found match object {} has no suggested time.'.format(repr(match)))
                     continue
@@ -170,7 +174,26 @@ async def delete_match(match_id: int) -> None:
         del match_library[match_id]
 
 
-async def make_match_from_raw_db_data(row: list) -> Match:
+async def prefetch_match_users(rows: list) -> dict:
+    """Look up the racers and cawmentators for the given raw match rows (as returned by matchdb) at once, so that
+    making the matches doesn't look them up one at a time.
+
+    Returns
+    -------
+    dict[int, NecroUser]
+        The users found, by user ID. Pass this to make_match_from_raw_db_data, so that the matches are made from
+        these users even if they've since been evicted from the user cache.
+    """
+    user_ids = set()
+    for row in rows:
+        user_ids.add(int(row[2]))
+        user_ids.add(int(row[3]))
+        if row[12] is not None:
+            user_ids.add(int(row[12]))
+    return await userlib.get_users(user_ids=user_ids)
+
+
+async def make_match_from_raw_db_data(row: list, users: Optional[Dict[int, NecroUser]] = None) -> Match:
     match_id = int(row[0])
     if match_id in match_library:
         return match_library[match_id]
@@ -204,7 +227,7 @@ async def make_match_from_raw_db_data(row: list) -> Match:
         autogenned=bool(row[17])
     )
 
-    await new_match.initialize()
+    await new_match.initialize(users=users)
     match_library[new_match.match_id] = new_match
     return new_match
 
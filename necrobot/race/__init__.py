@@ -42,6 +42,9 @@ and recording, whether to auto-forfeit the last racer when all others have finis
 `racetime` has functions for converting different time-data storage (ints as hundredths of a second and XX:XX.xx 
 format).
 
+`racejournal` writes every `RaceEvent` to a durable journal, and replays it on startup, so that races in progress can
+be restored after the bot restarts.
+
 `cmd_race` and `cmd_racemake` have typical race-related commands.
 
 
@@ -70,11 +73,15 @@ race
     race/
         raceconfig
         raceinfo
+        racejournal
         racer
+    user/
+        necrouser
     util/
         console
         racetime
         ordinal
+        timerwheel
         necrodancer/
             level
             seedgen
@@ -87,6 +94,16 @@ racedb
     race/
         race
         raceinfo
+racejournal
+    config
+    botbase/
+        necroevent
+    race/
+        raceinfo
+    util/
+        journal
+        necrodancer/
+            character
 raceinfo
     exception
     util/
@@ -111,6 +128,7 @@ raceutil
     botbase/
         necrobot
     race/
+        racejournal
         publicrace/
             raceroom
     user/
@@ -176,9 +176,9 @@ class ForceForfeit(CommandType):
             return
 
         for name in cmd.args:
-            for racer in self.bot_channel.last_begun_race.racers:
-                if racer.name.lower() == name.lower():
-                    await self.bot_channel.last_begun_race.forfeit_racer(racer)
+            racer = self.bot_channel.last_begun_race.find_racer(name)
+            if racer is not None:
+                await self.bot_channel.last_begun_race.forfeit_racer(racer)
 
 
 class ForceForfeitAll(CommandType):
@@ -2,6 +2,7 @@
 
 import asyncio
 import datetime
+import time
 
 import discord
 
@@ -14,7 +15,10 @@ from necrobot.race.publicrace import cmd_publicrace
 from necrobot.race.race import Race, RaceEvent
 from necrobot.test import cmd_test
 from necrobot.util import server
+from necrobot.util import outbox
 from necrobot.util import strutil
+from necrobot.util import timerwheel
+from necrobot.util import topicupdater
 from necrobot.race import racedb
 
 
@@ -31,6 +35,8 @@ class RaceRoom(BotChannel):
         self._mention_on_new_race = []          # A list of users that should be @mentioned when a rematch is created
         self._mentioned_users = []              # A list of users that were @mentioned when this race was created
         self._nopoke = False                    # When True, the .poke command fails
+        self._cleanup_timer = None              # The timer for the next check for cleanup
+        self._last_activity = time.monotonic()  # System clock time for the last message in the channel
 
         self.channel_commands = [
             cmd_race.Enter(self),
@@ -136,20 +142,37 @@ class RaceRoom(BotChannel):
     def refresh(self, channel: discord.TextChannel):
         self._channel = channel
 
+    # Notes the activity, which puts off cleaning up the room after a race (the cleanup timer picks up the change
+    # when it fires)
+    def on_message(self, message: discord.Message):
+        self._last_activity = time.monotonic()
+
 # Coroutine methods ---------------------------------------------------
     # Set up the leaderboard etc. Should be called after creation; code not put into __init__ b/c coroutine
     async def initialize(self):
-        asyncio.ensure_future(self._monitor_for_cleanup())
         await self._make_new_race()
         await self.write('Enter the race with `.enter`, and type `.ready` when ready. '
                          'Finish the race with `.done` or `.forfeit`. Use `.help` for a command list.')
 
-    # Write text to the raceroom. Return a Message for the text written
-    async def write(self, text: str):
-        await self._channel.send(text)
+    # Set up the room with a race restored from the race journal. Should be called after creation in place of
+    # initialize()
+    async def restore(self, race_state: dict):
+        self._race_number += 1
+        self._current_race = Race(self, self.race_info)
+        await self._current_race.restore(race_state)
+        self._schedule_cleanup_check()
+        await self.update()
+        await self.write('I was just restarted, and have restored the race in progress. ({0})'.format(
+            self._current_race.status_str))
+
+    # Queue text to be written to the raceroom (see necrobot.util.outbox). Urgent text skips ahead of other text.
+    async def write(self, text: str, urgent: bool = False):
+        self._last_activity = time.monotonic()
+        outbox.write(self._channel, text, urgent=urgent)
 
     # Processes a race event
     async def process(self, race_event: RaceEvent):
+        self._schedule_cleanup_check()
         if race_event.event == RaceEvent.EventType.RACE_END:
             await asyncio.sleep(1)  # Waiting for a short time feels good UI-wise
             await self.write(
@@ -170,9 +193,9 @@ class RaceRoom(BotChannel):
         else:
             await self.update()
 
-    # Updates the leaderboard
+    # Updates the leaderboard. The channel topic is edited in the background (see necrobot.util.topicupdater).
     async def update(self):
-        await self._channel.edit(topic=self.leaderboard)
+        topicupdater.set_topic(self._channel, self.leaderboard)
 
     # Post the race result to the race necrobot
     async def post_result(self, race: Race):
@@ -206,6 +229,10 @@ class RaceRoom(BotChannel):
 
     # Close the channel.
     async def close(self):
+        if self._cleanup_timer is not None:
+            self._cleanup_timer.cancel()
+        topicupdater.cancel(self._channel)
+        outbox.close(self._channel)
         Necrobot().unregister_bot_channel(self._channel)
         await self._channel.delete()
 
@@ -236,7 +263,7 @@ class RaceRoom(BotChannel):
             for racer in unready_racers:
                 alert_string += racer.member.mention + ', '
             await self.write('Poking {0}.'.format(alert_string[:-2]))
-            asyncio.ensure_future(self._run_nopoke_delay())
+            timerwheel.schedule(Config.RACE_POKE_DELAY, self._end_nopoke, name='raceroom-nopoke')
 
 # Private -----------------------------------------------------------------
     # Makes a new Race (and stores the previous one in self._previous race)
@@ -246,6 +273,7 @@ class RaceRoom(BotChannel):
         self._previous_race = self._current_race
         self._current_race = Race(self, self.race_info)
         await self._current_race.initialize()
+        self._schedule_cleanup_check()
         await self.update()
 
         # Send @mention message
@@ -258,40 +286,65 @@ class RaceRoom(BotChannel):
         self._mention_on_new_race = []
 
         if self.race_info.seeded:
-            await self._channel.send(
+            await self.write(
                 '{0}\nRace number {1} is open for entry. Seed: {2}.'.format(
                     mention_text, self._race_number, self.current_race.race_info.seed))
         else:
-            await self._channel.send(
+            await self.write(
                 '{0}\nRace number {1} is open for entry.'.format(mention_text, self._race_number))
 
-    # Checks to see whether the room should be cleaned.
-    async def _monitor_for_cleanup(self):
-        while True:
-            await asyncio.sleep(30)  # Wait between check times
+    # Schedules the check for whether the room should be cleaned for the next time it could be due: the no-entrants
+    # warning or cleanup time before a race, or CLEANUP_TIME after the last activity once the race is complete.
+    # Replaces any check already scheduled; called whenever the race changes.
+    def _schedule_cleanup_check(self):
+        if self._cleanup_timer is not None:
+            self._cleanup_timer.cancel()
+            self._cleanup_timer = None
+
+        race = self._current_race
+        if race is None:
+            delay = datetime.timedelta(0)
+        elif race.before_race and not race.any_entrants:
+            if race.passed_no_entrants_warning_time:
+                delay = Config.NO_ENTRANTS_CLEANUP - race.time_since_no_entrants
+            else:
+                delay = Config.NO_ENTRANTS_CLEANUP_WARNING - race.time_since_no_entrants
+        elif race.complete:
+            delay = Config.CLEANUP_TIME - datetime.timedelta(seconds=time.monotonic() - self._last_activity)
+        else:
+            # Entrants, or a race underway; the next race event reschedules
+            return
+
+        self._cleanup_timer = timerwheel.schedule(
+            max(delay.total_seconds(), 0), self._check_for_cleanup, name='raceroom-cleanup'
+        )
+
+    # Checks to see whether the room should be cleaned. Unless it closes the room, schedules the next check.
+    async def _check_for_cleanup(self):
+        self._cleanup_timer = None
+
+        # No race object
+        if self._current_race is None:
+            await self.close()
+            return
 
-            # No race object
-            if self._current_race is None:
+        # Pre-race
+        elif self._current_race.before_race:
+            if not self._current_race.any_entrants:
+                if self._current_race.passed_no_entrants_cleanup_time:
+                    await self.close()
+                    return
+                elif self._current_race.passed_no_entrants_warning_time:
+                    await self.write('Warning: Race has had zero entrants for some time and will be closed soon.')
+
+        # Post-race
+        elif self._current_race.complete:
+            if datetime.timedelta(seconds=time.monotonic() - self._last_activity) > Config.CLEANUP_TIME:
                 await self.close()
                 return
 
-            # Pre-race
-            elif self._current_race.before_race:
-                if not self._current_race.any_entrants:
-                    if self._current_race.passed_no_entrants_cleanup_time:
-                        await self.close()
-                        return
-                    elif self._current_race.passed_no_entrants_warning_time:
-                        await self.write('Warning: Race has had zero entrants for some time and will be closed soon.')
-
-            # Post-race
-            elif self._current_race.complete:
-                async for msg in self._channel.history(limit=1):
-                    if (datetime.datetime.utcnow() - msg.created_at) > Config.CLEANUP_TIME:
-                        await self.close()
-                        return
-
-    # Implements a delay before pokes can happen again
-    async def _run_nopoke_delay(self):
-        await asyncio.sleep(Config.RACE_POKE_DELAY)
+        self._schedule_cleanup_check()
+
+    # Ends the delay before pokes can happen again
+    def _end_nopoke(self):
         self._nopoke = False
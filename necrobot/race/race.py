@@ -1,9 +1,10 @@
 # Class implementing a single race. The parent passed to the constructor should implement the methods:
-#   async def write(str)
+#   async def write(str, urgent=False)
 #   async def process(RaceEvent)
 
 import asyncio
 import datetime
+import math
 import time
 from enum import IntEnum, Enum
 from typing import List, Optional, Union
@@ -12,10 +13,12 @@ import discord
 
 from necrobot.util.necrodancer import level as necrolevel
 from necrobot.config import Config
+from necrobot.race import racejournal
 from necrobot.race.raceconfig import RaceConfig
 from necrobot.race.raceinfo import RaceInfo
 from necrobot.race.racer import Racer
-from necrobot.util import console, racetime
+from necrobot.user import necrouser
+from necrobot.util import console, racetime, timerwheel
 from necrobot.util.ordinal import ordinal
 from necrobot.util.necrodancer import seedgen
 
@@ -112,6 +115,7 @@ class Race(object):
     # NB: Call the coroutine initialize() to set up the room
     def __init__(self, parent, race_info: RaceInfo, race_config: RaceConfig = RaceConfig()):
         self.race_id = None                       # After recording, the ID of the race in the DB
+        self.journal_id = time.time_ns()          # Identifies the race in the race journal; later races' are larger
         self.parent = parent                      # The parent managing this race. Must implement write() and process().
         self.race_info = RaceInfo.copy(race_info)
         self.racers = []                          # A list of Racer
@@ -120,6 +124,7 @@ class Race(object):
         self._config = race_config                # The RaceConfig to use (determines some race behavior)
 
         self._countdown = int(0)                  # The current countdown
+        self._countdown_begin_time = float(0)     # System clock time for the beginning of the race countdown
         self._start_datetime = None               # UTC time for the beginning of the race
         self._adj_start_time = float(0)           # System clock time for the beginning of the race (modified by pause)
         self._last_pause_time = float(0)          # System clock time for last time we called pause()
@@ -128,7 +133,7 @@ class Race(object):
 
         self._delay_record = False                # If true, delay an extra config.FINALIZE_TIME_SEC before recording
         self._countdown_future = None             # The Future object for the race countdown
-        self._finalize_future = None              # The Future object for the finalization countdown
+        self._finalize_timer = None               # The TimerHandle for the finalization countdown
 
 # Race data
     # Returns the status string
@@ -175,6 +180,15 @@ class Race(object):
     def complete(self) -> bool:
         return self._status >= RaceStatus.completed
 
+    # True if the race's recording will be delayed an extra config.FINALIZE_TIME_SEC when the finalization timer fires
+    @property
+    def delay_record(self) -> bool:
+        return self._delay_record
+
+    @delay_record.setter
+    def delay_record(self, value: bool):
+        self._delay_record = value
+
     # True if racers can enter the race
     @property
     def entry_open(self) -> bool:
@@ -185,6 +199,11 @@ class Race(object):
     def final(self) -> bool:
         return self._status >= RaceStatus.finalized
 
+    # The time since the race last had zero entrants
+    @property
+    def time_since_no_entrants(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=(time.monotonic() - self._last_no_entrants_time))
+
     # True if we've passed the "no entrants" warning
     @property
     def passed_no_entrants_warning_time(self) -> bool:
@@ -290,6 +309,15 @@ class Race(object):
             if racer.member.id == racer_usr.id:
                 return racer
 
+    def find_racer(self, name: str) -> Optional[Racer]:
+        """The first racer with the given RTMP, discord, twitch, or display name (case-insensitive), or None."""
+        racers = list(self.racers)
+        user = necrouser.find_by_name([racer.user for racer in racers], name)
+        for racer in racers:
+            if user is not None and racer.user is user:
+                return racer
+        return None
+
 # Public methods (all coroutines)
     # Sets up the leaderboard, etc., for the race
     async def initialize(self):
@@ -310,6 +338,7 @@ class Race(object):
     async def begin_race_countdown(self):
         if self._status == RaceStatus.entry_open:
             self._status = RaceStatus.counting_down
+            self._countdown_begin_time = time.monotonic()
             self._countdown_future = asyncio.ensure_future(self._race_countdown())
             await self._process(RaceEvent.EventType.RACE_BEGIN_COUNTDOWN)
 
@@ -562,8 +591,9 @@ class Race(object):
 
     # Kicks the specified racers from the race (they can re-enter)
     async def kick_racers(self, names_to_kick: list, mute=False):
-        for racer in self.racers:
-            if racer.name.lower() in names_to_kick:
+        for name in names_to_kick:
+            racer = self.find_racer(name)
+            if racer is not None:
                 await self.unenter_member(racer.member, mute=mute)
 
     # Cancel the race.
@@ -589,6 +619,79 @@ class Race(object):
             await self._write(mute=mute, text='Changed seed to {0}.'.format(self.race_info.seed))
             await self._process(RaceEvent.EventType.CHANGE_RULES)
 
+    # The state of this race, less its racers, for the race journal. Times are stored as wall-clock times, since the
+    # system clock doesn't survive a restart.
+    def journal_state(self) -> dict:
+        now_wall = time.time()
+        now_monotonic = time.monotonic()
+
+        def to_wall(monotonic_time: float) -> float:
+            return now_wall - (now_monotonic - monotonic_time)
+
+        return {
+            'status': int(self._status),
+            'room': type(self.parent).__name__,
+            'race_info': racejournal.race_info_to_dict(self.race_info),
+            'config': dict(vars(self._config)),
+            'countdown_begin': to_wall(self._countdown_begin_time)
+            if self._status == RaceStatus.counting_down else None,
+            'start': to_wall(self._adj_start_time) if self._status >= RaceStatus.racing else None,
+            'paused_at': to_wall(self._last_pause_time) if self._status == RaceStatus.paused else None,
+            'start_datetime': self._start_datetime.isoformat() if self._start_datetime is not None else None,
+        }
+
+    # Restore this race, which must not yet be initialized, from a state replayed from the race journal (see
+    # racejournal.replay). Resumes any countdown, and restarts the finalization countdown of a completed race. Time
+    # the bot was down counts as race time, unless the race was paused.
+    async def restore(self, state: dict):
+        if self._status != RaceStatus.uninitialized:
+            return
+
+        race_state = state['race']
+        if state.get('n') is not None:
+            self.journal_id = state['n']
+        self.race_info = racejournal.race_info_from_dict(race_state['race_info'])
+        self._config = RaceConfig(**race_state['config'])
+
+        for racer_state in state['racers']:
+            racer = Racer(discord.Object(id=racer_state['id']))
+            await racer.initialize()
+            racer.restore_journal_state(racer_state)
+            self.racers.append(racer)
+
+        now_wall = time.time()
+        now_monotonic = time.monotonic()
+
+        def to_monotonic(wall_time: float) -> float:
+            return now_monotonic - (now_wall - wall_time)
+
+        self._last_no_entrants_time = now_monotonic
+        if race_state['start'] is not None:
+            self._adj_start_time = to_monotonic(race_state['start'])
+        if race_state['paused_at'] is not None:
+            self._last_pause_time = to_monotonic(race_state['paused_at'])
+        if race_state['start_datetime'] is not None:
+            self._start_datetime = datetime.datetime.fromisoformat(race_state['start_datetime'])
+
+        status = RaceStatus(race_state['status'])
+        if status == RaceStatus.counting_down:
+            # Resume the countdown, but give the racers at least an unpause countdown's warning
+            elapsed = now_wall - race_state['countdown_begin']
+            remaining = max(
+                int(math.ceil(self._config.countdown_length - elapsed)),
+                self._config.unpause_countdown_length
+            )
+            self._status = RaceStatus.counting_down
+            self._countdown_begin_time = now_monotonic - (self._config.countdown_length - remaining)
+            self._countdown_future = asyncio.ensure_future(self._race_countdown(length=remaining))
+        elif status == RaceStatus.completed:
+            self._status = RaceStatus.completed
+            self._start_finalization_countdown()
+        else:
+            self._status = status
+
+        racejournal.record_snapshot(self)
+
 # Private methods
     # Sort racer list
     def _sort_racers(self):
@@ -602,6 +705,7 @@ class Race(object):
 
     # Process an event
     async def _process(self, event_type: RaceEvent.EventType, **kwargs):
+        racejournal.record_event(self, event_type, kwargs.get('racer_member'))
         await self.parent.process(RaceEvent(self, event_type, **kwargs))
 
     # Actually enter the racer
@@ -622,7 +726,7 @@ class Race(object):
         self._status = RaceStatus.racing
         self._adj_start_time = time.monotonic()
         self._start_datetime = datetime.datetime.utcnow()
-        await self._write(mute=mute, text='GO!')
+        await self._write(mute=mute, urgent=True, text='GO!')
         await self._process(RaceEvent.EventType.RACE_BEGIN)
 
     # Checks to see if all racers have either finished or forfeited. If so, ends the race.
@@ -641,15 +745,15 @@ class Race(object):
     async def _end_race(self):
         if self._status == RaceStatus.racing:
             self._status = RaceStatus.completed
-            self._finalize_future = asyncio.ensure_future(self._finalization_countdown())
+            self._start_finalization_countdown()
             await self._process(RaceEvent.EventType.RACE_END)
 
     # Countdown coroutine to be wrapped in self._countdown_future.
     # Warning: Do not call this -- use begin_countdown instead.
-    async def _race_countdown(self, mute=False):
+    async def _race_countdown(self, length: int = None, mute=False):
         # TODO: The warnings = [5] is a hardcoded hack due to mananging current Discord rate limits.
         await self._do_countdown(
-            length=self._config.countdown_length,
+            length=length if length is not None else self._config.countdown_length,
             incremental_start=self._config.incremental_countdown_start,
             warnings=[5],
             mute=mute
@@ -667,15 +771,17 @@ class Race(object):
         countdown_timer = length
 
         if incremental_start is not None:
-            await self._write(mute=mute, text='The race will begin in {0} seconds.'.format(countdown_timer))
+            await self._write(
+                mute=mute, urgent=True, text='The race will begin in {0} seconds.'.format(countdown_timer)
+            )
         while countdown_timer > 0:
             sleep_time = float(countdown_systemtime_begin + length - countdown_timer + 1 - time.monotonic())
 
             if countdown_timer in warnings:
-                await self._write(mute=mute, text='{} seconds...'.format(countdown_timer))
+                await self._write(mute=mute, urgent=True, text='{} seconds...'.format(countdown_timer))
 
             if incremental_start is None or countdown_timer <= incremental_start:
-                await self._write(mute=mute, text='{}'.format(countdown_timer))
+                await self._write(mute=mute, urgent=True, text='{}'.format(countdown_timer))
 
             if sleep_time < fudge:
                 countdown_systemtime_begin += fudge - sleep_time
@@ -684,7 +790,7 @@ class Race(object):
             # print('Countdown cycle: Timer = {0}, Sleep Time = {1}'.format(countdown_timer, sleep_time))
 
             if sleep_time > 0:
-                await asyncio.sleep(sleep_time)         # sleep until the next tick
+                await timerwheel.sleep(sleep_time, name='race-countdown')   # sleep until the next tick
             countdown_timer -= 1
 
     # Countdown for an unpause
@@ -699,20 +805,27 @@ class Race(object):
     # Actually unpause the race
     async def _do_unpause_race(self, mute=False):
         if self._status == RaceStatus.paused:
-            await self._write(mute=mute, text='GO!')
+            await self._write(mute=mute, urgent=True, text='GO!')
             self._status = RaceStatus.racing
             self._adj_start_time += time.monotonic() - self._last_pause_time
             await self._process(RaceEvent.EventType.RACE_UNPAUSE)
             return True
         return False
 
-    # Countdown coroutine to be wrapped in self._finalize_future.
+    # Schedule the race's finalization on the timer wheel, as self._finalize_timer.
     # Warning: Do not call this -- use end_race instead.
-    async def _finalization_countdown(self):
-        self.delay_record = True
-        while self.delay_record:
-            self.delay_record = False
-            await asyncio.sleep(self._config.finalize_time_sec)
+    def _start_finalization_countdown(self):
+        self._delay_record = False
+        self._finalize_timer = timerwheel.schedule(
+            self._config.finalize_time_sec, self._finalize, name='race-finalize'
+        )
+
+    # Called by self._finalize_timer
+    async def _finalize(self):
+        # If recording was delayed during the countdown, count down again instead
+        if self._delay_record:
+            self._start_finalization_countdown()
+            return
 
         # Perform the finalization and record the race. At this point, the finalization cannot be canceled.
         self._status = RaceStatus.finalized
@@ -739,9 +852,9 @@ class Race(object):
     # Returns False only if race IS completed, AND we failed to restart it
     async def _cancel_finalization(self, mute=False):
         if self._status == RaceStatus.completed:
-            if self._finalize_future:
-                if self._finalize_future.cancel():
-                    self._finalize_future = None
+            if self._finalize_timer:
+                if self._finalize_timer.cancel():
+                    self._finalize_timer = None
                     self._status = RaceStatus.racing
                     await self._process(RaceEvent.EventType.RACE_CANCEL_FINALIZE)
                     await self._write(mute=mute, text='Race end canceled -- unfinished racers may continue!')
@@ -755,7 +868,7 @@ class Race(object):
         if racer.forfeit(self.current_time):
             await self._check_for_race_end()
 
-    # Write text
-    async def _write(self, text: str, mute=False):
+    # Write text. Urgent text (the countdown) should be posted ahead of any other text waiting to be posted.
+    async def _write(self, text: str, mute=False, urgent=False):
         if not mute:
-            await self.parent.write(text)
+            await self.parent.write(text, urgent=urgent)
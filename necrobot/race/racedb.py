@@ -2,56 +2,98 @@
 Interaction with the races, race_types, and race_runs databases (necrobot or condor event schema).
 """
 
+from typing import Dict, Tuple
+
 from necrobot.database.dbconnect import DBConnect
 from necrobot.database.dbutil import tn
 from necrobot.race.race import Race
 from necrobot.race.raceinfo import RaceInfo
 
 
+# Process-wide registry of the race_types table, in both directions. Rows of race_types are never changed or deleted,
+# so entries never go stale; types registered by another bot are picked up on the first lookup that misses.
+_race_type_ids = dict()     # type: Dict[Tuple, int]
+_race_type_keys = dict()    # type: Dict[int, Tuple]
+
+
 # Record a race-------------------------------------------------------------------
 async def record_race(race: Race) -> None:
     type_id = await get_race_type_id(race.race_info, register=True)
 
     async with DBConnect(commit=True) as cursor:
-        # Record the race
-        race_params = (
-            race.start_datetime.strftime('%Y-%m-%d %H:%M:%S'),
-            type_id,
-            race.race_info.seed,
-            race.race_info.condor_race,
-            race.race_info.private_race,
-        )
-
-        cursor.execute(
-            """
-            INSERT INTO {0} 
-                (timestamp, type_id, seed, condor, private) 
-            VALUES (%s,%s,%s,%s,%s)
-            """.format(tn('races')),
-            race_params
+        # Record the race, and store the new race ID in the Race object
+        race.race_id = await _insert_race(
+            cursor=cursor,
+            timestamp=race.start_datetime,
+            type_id=type_id,
+            seed=race.race_info.seed,
+            condor=race.race_info.condor_race,
+            private=race.race_info.private_race
         )
 
-        # Store the new race ID in the Race object
-        cursor.execute("SELECT LAST_INSERT_ID()")
-        race.race_id = int(cursor.fetchone()[0])
-
         # Record each racer in race_runs
         rank = 1
+        run_params = []
         for racer in race.racers:
-            racer_params = (race.race_id, racer.user_id, racer.time, rank, racer.igt, racer.comment, racer.level)
-            cursor.execute(
-                """
-                INSERT INTO {0} 
-                    (race_id, user_id, time, rank, igt, comment, level) 
-                VALUES (%s,%s,%s,%s,%s,%s,%s)
-                """.format(tn('race_runs')),
-                racer_params
+            run_params.append(
+                (race.race_id, racer.user_id, racer.time, rank, racer.igt, racer.comment, racer.level)
             )
             if racer.is_finished:
                 rank += 1
+        await _insert_race_runs(cursor, run_params)
+
+
+async def _insert_race(cursor, timestamp, type_id: int, seed: int, condor: bool, private: bool) -> int:
+    """Insert a row into races, and return its race_id."""
+    await cursor.execute(
+        """
+        INSERT INTO {0} 
+            (timestamp, type_id, seed, condor, private) 
+        VALUES (%s,%s,%s,%s,%s)
+        """.format(tn('races')),
+        (timestamp.strftime('%Y-%m-%d %H:%M:%S'), type_id, seed, condor, private,)
+    )
+    return int(cursor.lastrowid)
+
+
+async def _insert_race_runs(cursor, run_params: list) -> None:
+    """Insert all the given rows into race_runs with a single multi-row INSERT.
+
+    Parameters
+    ----------
+    cursor
+        The cursor of an open DBConnect.
+    run_params: list[tuple]
+        One (race_id, user_id, time, rank, igt, comment, level) tuple per row.
+    """
+    if not run_params:
+        return
+
+    await cursor.execute(
+        """
+        INSERT INTO {0} 
+            (race_id, user_id, time, rank, igt, comment, level) 
+        VALUES {1}
+        """.format(tn('race_runs'), ','.join(['(%s,%s,%s,%s,%s,%s,%s)'] * len(run_params))),
+        [param for row in run_params for param in row]
+    )
 
 
 # Race type functions-------------------------------------------------------------------
+async def load_race_types() -> None:
+    """Read the whole race_types table into the registry. Call once at startup."""
+    async with DBConnect(commit=False) as cursor:
+        await cursor.execute(
+            """
+            SELECT `type_id`, `character`, `descriptor`, `seeded`, `amplified`, `seed_fixed` 
+            FROM `race_types` 
+            ORDER BY `type_id` ASC
+            """
+        )
+        for row in cursor:
+            _cache_race_type(int(row[0]), *row[1:])
+
+
 async def get_race_type_id(race_info: RaceInfo, register: bool = False) -> int or None:
     params = (
         race_info.character_str,
@@ -60,9 +102,14 @@ async def get_race_type_id(race_info: RaceInfo, register: bool = False) -> int o
         race_info.amplified,
         race_info.seed_fixed,
     )
+    key = _race_type_key(*params)
+    if key in _race_type_ids:
+        return _race_type_ids[key]
 
-    async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+    # Not in the registry; it may have been registered by the other bot, so check the primary database
+
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
+        await cursor.execute(
             """
             SELECT `type_id` 
             FROM `race_types` 
@@ -78,15 +125,18 @@ async def get_race_type_id(race_info: RaceInfo, register: bool = False) -> int o
 
         row = cursor.fetchone()
         if row is not None:
+            _cache_race_type(int(row[0]), *params)
             return int(row[0])
 
     # If here, the race type was not found
     if not register:
         return None
 
-    # Create the new race type
-    async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+    # Create the new race type. This is committed on its own even inside a UnitOfWork, since the registry caches it;
+    # but if no second connection is free, it joins the unit of work (see DBConnect), and may yet be rolled back
+    db_connect = DBConnect(commit=True, independent=True)
+    async with db_connect as cursor:
+        await cursor.execute(
             """
             INSERT INTO race_types 
             (`character`, descriptor, seeded, amplified, seed_fixed) 
@@ -94,40 +144,56 @@ async def get_race_type_id(race_info: RaceInfo, register: bool = False) -> int o
             """,
             params
         )
-        cursor.execute("SELECT LAST_INSERT_ID()")
-        return int(cursor.fetchone()[0])
+        type_id = int(cursor.lastrowid)
+
+    if not db_connect.in_unit_of_work:
+        _cache_race_type(type_id, *params)
+    return type_id
 
 
 async def get_race_info_from_type_id(race_type: int) -> RaceInfo or None:
-    params = (race_type,)
-    async with DBConnect(commit=False) as cursor:
-        cursor.execute(
-            """
-            SELECT `character`, `descriptor`, `seeded`, `amplified`, `seed_fixed` 
-            FROM `race_types` 
-            WHERE `type_id`=%s
-            """,
-            params
-        )
+    if race_type not in _race_type_keys:
+        async with DBConnect(commit=False, read_your_writes=True) as cursor:
+            await cursor.execute(
+                """
+                SELECT `character`, `descriptor`, `seeded`, `amplified`, `seed_fixed` 
+                FROM `race_types` 
+                WHERE `type_id`=%s
+                """,
+                (race_type,)
+            )
 
-        row = cursor.fetchone()
-        if row is not None:
-            race_info = RaceInfo()
-            race_info.set_char(row[0])
-            race_info.descriptor = row[1]
-            race_info.seeded = bool(row[2])
-            race_info.amplified = bool(row[3])
-            race_info.seed_fixed = bool(row[4])
-            return race_info
-        else:
-            return None
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            _cache_race_type(race_type, *row)
+
+    character, descriptor, seeded, amplified, seed_fixed = _race_type_keys[race_type]
+    race_info = RaceInfo()
+    race_info.set_char(character)
+    race_info.descriptor = descriptor
+    race_info.seeded = seeded
+    race_info.amplified = amplified
+    race_info.seed_fixed = seed_fixed
+    return race_info
+
+
+def _race_type_key(character: str, descriptor: str, seeded, amplified, seed_fixed) -> Tuple:
+    # MySQL compares these strings case-insensitively, so we do too
+    return str(character).lower(), descriptor.lower(), bool(seeded), bool(amplified), bool(seed_fixed)
+
+
+def _cache_race_type(type_id: int, character: str, descriptor: str, seeded, amplified, seed_fixed) -> None:
+    # If two rows differ only by case, MySQL's lookup returns the first, which is the one loaded first
+    _race_type_ids.setdefault(_race_type_key(character, descriptor, seeded, amplified, seed_fixed), type_id)
+    _race_type_keys[type_id] = (str(character), descriptor, bool(seeded), bool(amplified), bool(seed_fixed))
 
 
 # Stat functions-------------------------------------------------------------------
 async def get_allzones_race_numbers(user_id: int, amplified: bool) -> list:
     async with DBConnect(commit=False) as cursor:
         params = (user_id,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT `race_types`.`character`, COUNT(*) as num 
             FROM {1} 
@@ -147,7 +213,7 @@ async def get_allzones_race_numbers(user_id: int, amplified: bool) -> list:
 async def get_all_racedata(user_id: int, char_name: str, amplified: bool) -> list:
     async with DBConnect(commit=False) as cursor:
         params = (user_id, char_name)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT {1}.`time`, {1}.`level` 
             FROM {1} 
@@ -167,7 +233,7 @@ async def get_all_racedata(user_id: int, char_name: str, amplified: bool) -> lis
 async def get_fastest_times_leaderboard(character_name: str, amplified: bool, limit: int) -> list:
     async with DBConnect(commit=False) as cursor:
         params = {'character': character_name, 'limit': limit, }
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT
                 users.`discord_name`,
@@ -215,7 +281,7 @@ async def get_fastest_times_leaderboard(character_name: str, amplified: bool, li
 async def get_most_races_leaderboard(character_name: str, limit: int) -> list:
     async with DBConnect(commit=False) as cursor:
         params = (character_name, character_name, limit,)
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT 
                 user_name, 
@@ -260,7 +326,7 @@ async def get_most_races_leaderboard(character_name: str, limit: int) -> list:
 async def get_largest_race_number(user_id: int) -> int:
     async with DBConnect(commit=False) as cursor:
         params = (user_id,)
-        cursor.execute(
+        await cursor.execute_prepared(
             """
             SELECT race_id 
             FROM {0} 
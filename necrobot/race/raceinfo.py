@@ -5,6 +5,11 @@ from necrobot.util.necrodancer.character import NDChar
 
 
 class RaceInfo(object):
+    __slots__ = (
+        'seed', 'character', 'seed_fixed', 'seeded', 'descriptor', 'amplified', 'can_be_solo', 'post_results',
+        'condor_race', 'private_race'
+    )
+
     @staticmethod
     def copy(race_info):
         the_copy = RaceInfo()
@@ -0,0 +1,239 @@
+"""
+A durable journal of live races, so that a race in progress survives a restart of the bot.
+
+Every RaceEvent is written to the journal (see necrobot.util.journal), along with the race state it may have changed:
+an event about one racer carries that racer's state, and any other event carries the state of every racer. Records
+carry the ID of the race's channel and the race's journal ID, since a room can have two live races at once (after a
+rematch, the new race, and the previous one until it is finalized). Once a race is finalized or canceled, its
+records are dropped. Every Config.JOURNAL_COMPACT_EVENTS events, the journal is compacted into one snapshot per live
+race (plus the recently published NecroEvents; see necroevent).
+
+On startup, `load()` replays the journal into the last known state of the latest race that was live in each channel.
+A room can then claim the state for its channel with `pop_saved_state()`, and pick up the race with `Race.restore()`.
+"""
+
+import unittest
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from necrobot.botbase import necroevent
+from necrobot.config import Config
+from necrobot.race.raceinfo import RaceInfo
+from necrobot.util import journal
+from necrobot.util.necrodancer.character import NDChar
+
+_END_EVENTS = ('RACE_FINALIZE', 'RACE_CANCEL')
+
+_live_races = weakref.WeakValueDictionary()     # type: weakref.WeakValueDictionary     # By (channel ID, journal ID)
+_saved_states = dict()                          # type: Dict[int, dict]
+_num_events = 0
+
+
+def load(records: List[dict]) -> None:
+    """Replay the given journal records, and compact the default journal to the result."""
+    global _saved_states
+    _saved_states = replay(records)
+    necroevent.load(records)
+    the_journal = journal.get_journal()
+    if the_journal is not None:
+        the_journal.compact(
+            [
+                _snapshot_record((channel_id, state['n']), state['race'], state['racers'])
+                for channel_id, state in _saved_states.items()
+            ] + necroevent.recent_records()
+        )
+
+
+def replay(records: List[dict]) -> Dict[int, dict]:
+    """The last state of the latest live race in each channel described by the journal records, by channel ID.
+
+    Returns
+    -------
+    Dict[int, dict]
+        Each state is a dict {'race': the state from Race.journal_state(), 'racers': a list of the states from
+        Racer.journal_state(), 'n': the race's journal ID}.
+    """
+    states = dict()
+    for record in records:
+        if record.get('k') is None:
+            continue
+        key = (record['k'], record.get('n'),)
+
+        if record.get('end'):
+            states.pop(key, None)
+            continue
+
+        state = states.setdefault(key, {'race': None, 'racers': [], 'n': key[1]})
+        state['race'] = record['s']
+        if 'racers' in record:
+            state['racers'] = list(record['racers'])
+        elif 'r' in record:
+            state['racers'] = [r for r in state['racers'] if r['id'] != record['r']['id']] + [record['r']]
+            state['racers'].sort(key=lambda r: r['order'])
+        elif 'u' in record:
+            state['racers'] = [r for r in state['racers'] if r['id'] != record['u']]
+
+    # A channel's earlier live race (one completed but not yet finalized when a rematch was made) is dropped
+    latest_states = dict()
+    for (channel_id, journal_id), state in states.items():
+        latest = latest_states.get(channel_id)
+        if latest is None or (journal_id or 0) > (latest['n'] or 0):
+            latest_states[channel_id] = state
+    return latest_states
+
+
+def get_saved_states() -> Dict[int, dict]:
+    """The states of the races that were live when the journal was loaded, and haven't been claimed yet."""
+    return dict(_saved_states)
+
+
+def pop_saved_state(channel_id: int) -> Optional[dict]:
+    """Claim the saved state of the race in the given channel, if any."""
+    return _saved_states.pop(channel_id, None)
+
+
+def record_event(race, event_type, racer_member=None) -> None:
+    """Write a RaceEvent to the default journal.
+
+    Parameters
+    ----------
+    race: Race
+        The race the event happened to. Its parent must have a channel.
+    event_type: RaceEvent.EventType
+        The type of the event.
+    racer_member: Optional[discord.Member]
+        The racer the event is about, if any.
+    """
+    global _num_events
+    the_journal = journal.get_journal()
+    key = _race_key(race)
+    if the_journal is None or key is None:
+        return
+
+    if event_type.name in _END_EVENTS:
+        _live_races.pop(key, None)
+        the_journal.append({'k': key[0], 'n': key[1], 'end': True})
+        return
+
+    record = {'k': key[0], 'n': key[1], 'e': event_type.name, 's': race.journal_state()}
+    racer = race.get_racer(racer_member) if racer_member is not None else None
+    if event_type.name == 'RACER_UNENTER':
+        record['u'] = int(racer_member.id)
+    elif racer is not None and event_type.name.startswith('RACER_'):
+        record['r'] = racer.journal_state(order=race.racers.index(racer))
+    else:
+        record['racers'] = [r.journal_state(order=idx) for idx, r in enumerate(race.racers)]
+
+    _live_races[key] = race
+    the_journal.append(record)
+    _num_events += 1
+    if _num_events >= Config.JOURNAL_COMPACT_EVENTS:
+        compact()
+
+
+def record_snapshot(race) -> None:
+    """Write the full state of the race to the default journal, e.g. after restoring it."""
+    the_journal = journal.get_journal()
+    key = _race_key(race)
+    if the_journal is None or key is None:
+        return
+    _live_races[key] = race
+    the_journal.append(_race_snapshot_record(key, race))
+
+
+def compact() -> None:
+    """Replace the default journal with a snapshot of each live race, and the recently published NecroEvents."""
+    global _num_events
+    _num_events = 0
+    the_journal = journal.get_journal()
+    if the_journal is not None:
+        the_journal.compact(
+            [_race_snapshot_record(key, race) for key, race in list(_live_races.items())]
+            + necroevent.recent_records()
+        )
+
+
+def race_info_to_dict(race_info: RaceInfo) -> dict:
+    info_dict = {name: getattr(race_info, name) for name in RaceInfo.__slots__}
+    info_dict['character'] = race_info.character.name if race_info.character is not None else None
+    return info_dict
+
+
+def race_info_from_dict(info_dict: dict) -> RaceInfo:
+    race_info = RaceInfo()
+    for name in RaceInfo.__slots__:
+        if name in info_dict:
+            setattr(race_info, name, info_dict[name])
+    race_info.character = NDChar[info_dict['character']] if info_dict.get('character') is not None else None
+    return race_info
+
+
+def _race_key(race) -> Optional[Tuple[int, int]]:
+    channel = getattr(race.parent, 'channel', None)
+    return (int(channel.id), race.journal_id,) if channel is not None else None
+
+
+def _race_snapshot_record(key: Tuple[int, int], race) -> dict:
+    return _snapshot_record(
+        key, race.journal_state(), [r.journal_state(order=idx) for idx, r in enumerate(race.racers)]
+    )
+
+
+def _snapshot_record(key: Tuple[int, int], race_state: dict, racer_states: List[dict]) -> dict:
+    return {'k': key[0], 'n': key[1], 'e': 'SNAPSHOT', 's': race_state, 'racers': racer_states}
+
+
+class TestRaceJournal(unittest.TestCase):
+    @staticmethod
+    def _racer(discord_id: int, order: int, status: int = 1) -> dict:
+        return {'id': discord_id, 'order': order, 'status': status}
+
+    def test_replay(self):
+        records = [
+            {'k': 1, 'e': 'SNAPSHOT', 's': {'status': 1}, 'racers': [self._racer(10, 0), self._racer(11, 1)]},
+            {'k': 2, 'e': 'RACER_ENTER', 's': {'status': 1}, 'r': self._racer(20, 0)},
+            {'ne': 'notify', 't': 0.0, 'args': {'message': 'Race 1 has begun.'}},
+            {'k': 1, 'e': 'RACER_READY', 's': {'status': 1}, 'r': self._racer(10, 0, status=2)},
+            {'k': 1, 'e': 'RACER_ENTER', 's': {'status': 1}, 'r': self._racer(12, 2)},
+            {'k': 1, 'e': 'RACER_UNENTER', 's': {'status': 1}, 'u': 11},
+            {'k': 2, 'end': True},
+            {'k': 1, 'e': 'RACE_BEGIN_COUNTDOWN', 's': {'status': 2}, 'racers': [self._racer(10, 0, status=2)]},
+        ]
+        states = replay(records)
+        self.assertEqual(list(states.keys()), [1])
+        self.assertEqual(states[1]['race'], {'status': 2})
+        self.assertEqual(states[1]['racers'], [self._racer(10, 0, status=2)])
+
+        states = replay(records[:-1])
+        self.assertEqual([r['id'] for r in states[1]['racers']], [10, 12])
+        self.assertEqual(states[1]['racers'][0]['status'], 2)
+
+    def test_rematch(self):
+        # Race 1 in channel 5 is complete but not finalized when its rematch, race 2, is made
+        records = [
+            {'k': 5, 'n': 1, 'e': 'RACE_END', 's': {'status': 5}, 'racers': [self._racer(10, 0, status=5)]},
+            {'k': 5, 'n': 2, 'e': 'SNAPSHOT', 's': {'status': 1}, 'racers': []},
+            {'k': 5, 'n': 2, 'e': 'RACER_ENTER', 's': {'status': 1}, 'r': self._racer(11, 0)},
+            {'k': 5, 'n': 1, 'e': 'ADD_EXTRANEOUS', 's': {'status': 5}, 'racers': [self._racer(10, 0, status=5)]},
+        ]
+        states = replay(records)
+        self.assertEqual(states[5]['n'], 2)
+        self.assertEqual(states[5]['race'], {'status': 1})
+        self.assertEqual(states[5]['racers'], [self._racer(11, 0)])
+
+        # Finalizing race 1 leaves race 2 alone
+        states = replay(records + [{'k': 5, 'n': 1, 'end': True}])
+        self.assertEqual(states[5]['racers'], [self._racer(11, 0)])
+
+        # Until its rematch is made, the completed race is the one restored
+        states = replay(records[:1])
+        self.assertEqual(states[5]['n'], 1)
+
+    def test_race_info(self):
+        race_info = RaceInfo()
+        race_info.seed = 12345
+        race_info.character = NDChar.Aria
+        race_info.descriptor = 'Low%'
+        copy = race_info_from_dict(race_info_to_dict(race_info))
+        self.assertEqual(race_info_to_dict(copy), race_info_to_dict(race_info))
+        self.assertEqual(copy.character, NDChar.Aria)
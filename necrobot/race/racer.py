@@ -10,6 +10,8 @@ FIELD_UNKNOWN = int(-1)
 
 
 class Racer(object):
+    __slots__ = ('_user', '_discord_id', '_state', 'time', 'igt', 'level', 'comment')
+
     def __init__(self, member: discord.Member):
         self._user = None
         self._discord_id = int(member.id)
@@ -150,3 +152,23 @@ class Racer(object):
 
     def add_comment(self, comment: str):
         self.comment = comment
+
+    def journal_state(self, order: int) -> dict:
+        """The state of this racer, for the race journal. `order` is the racer's place in the race's list of racers."""
+        return {
+            'id': self._discord_id,
+            'order': order,
+            'status': int(self._state),
+            'time': self.time,
+            'igt': self.igt,
+            'level': self.level,
+            'comment': self.comment,
+        }
+
+    def restore_journal_state(self, state: dict) -> None:
+        """Restore this racer from a state returned by journal_state()."""
+        self._state = RacerStatus(state['status'])
+        self.time = state['time']
+        self.igt = state['igt']
+        self.level = state['level']
+        self.comment = state['comment']
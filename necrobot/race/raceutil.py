@@ -2,6 +2,7 @@ import discord
 
 from necrobot.botbase.necrobot import Necrobot
 from necrobot.config import Config
+from necrobot.race import racejournal
 from necrobot.race.publicrace.raceroom import RaceRoom
 from necrobot.user.userprefs import UserPrefs
 from necrobot.util import console
@@ -46,6 +47,25 @@ async def make_room(race_info):
     return race_channel
 
 
+# Remake the RaceRooms for public races that were in progress when the bot last stopped, from the race journal
+async def recover_rooms():
+    for channel_id, race_state in racejournal.get_saved_states().items():
+        if race_state['race']['room'] != RaceRoom.__name__:
+            continue
+
+        racejournal.pop_saved_state(channel_id)
+        race_channel = server.find_channel(channel_id=channel_id)
+        if race_channel is None:
+            console.info("Couldn't find the channel with ID {0} to restore its race.".format(channel_id))
+            continue
+
+        race_info = racejournal.race_info_from_dict(race_state['race']['race_info'])
+        new_room = RaceRoom(race_discord_channel=race_channel, race_info=race_info)
+        Necrobot().register_bot_channel(race_channel, new_room)
+        await new_room.restore(race_state)
+        console.info('Restored the race in channel {0}.'.format(race_channel.name))
+
+
 # Return a new (unique) race room name from the race info
 def get_raceroom_name(race_info):
     name_prefix = race_info.raceroom_name
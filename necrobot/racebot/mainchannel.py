@@ -1,12 +1,14 @@
 from necrobot.botbase import cmd_seedgen
 from necrobot.botbase import cmd_admin
 from necrobot.botbase.botchannel import BotChannel
+from necrobot.database import cmd_database
 from necrobot.race import cmd_racemake
 from necrobot.race import cmd_racestats
 # from necrobot.speedrun import cmd_speedrun
 # from necrobot.ladder import cmd_ladder
 from necrobot.botbase import cmd_color, cmd_role
 from necrobot.user import cmd_user
+from necrobot.test import cmd_test
 
 
 class MainBotChannel(BotChannel):
@@ -14,10 +16,18 @@ class MainBotChannel(BotChannel):
         BotChannel.__init__(self)
         self.channel_commands = [
             cmd_admin.Die(self),
+            cmd_admin.EventStats(self),
+            cmd_admin.OutboxStats(self),
+            cmd_admin.RecentEvents(self),
             # cmd_admin.Reboot(self),
+            cmd_admin.Timers(self),
+            cmd_admin.TopicStats(self),
 
             cmd_color.ColorMe(self),
 
+            cmd_database.DBMigrate(self),
+            cmd_database.DBStats(self),
+
             # cmd_ladder.ForceRanked(self),
             # cmd_ladder.Ranked(self),
             # cmd_ladder.Rating(self),
@@ -46,4 +56,10 @@ class MainBotChannel(BotChannel):
             cmd_user.Twitch(self),
             cmd_user.ViewPrefs(self),
             cmd_user.UserInfo(self),
+
+            cmd_test.TestBenchDispatch(self),
+            cmd_test.TestBenchJournal(self),
+            cmd_test.TestBenchMemory(self),
+            cmd_test.TestBenchPrepared(self),
+            cmd_test.TestBenchRecordRace(self),
         ]
@@ -28,7 +28,7 @@ async def submit(
         submission_time
     )
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO {speedruns}
             (user_id, type_id, score, vod, submission_time)
@@ -40,7 +40,7 @@ async def submit(
 
 async def get_raw_data():
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT 
                 submission_id,
@@ -60,7 +60,7 @@ async def get_raw_data():
 async def set_verified(run_id: int, verified: bool):
     async with DBConnect(commit=True) as cursor:
         params = (verified, run_id,)
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE {speedruns}
             SET verified = %s
@@ -1,14 +1,30 @@
 import asyncio
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
 import discord
 import googleapiclient.errors
 
 import necrobot.exception
 from necrobot.util import server
-from necrobot.botbase.command import Command
+from necrobot.botbase.command import Command, TestCommand
 from necrobot.botbase.commandtype import CommandType
 from necrobot.botbase.necrobot import Necrobot
 from necrobot.test import msgqueue
 from necrobot.config import Config
+from necrobot.database import querystats
+from necrobot.database.dbconnect import DBConnect
+from necrobot.database.dbutil import tn
+from necrobot.match import matchdb, matchutil
+from necrobot.race import racedb
+from necrobot.race.raceinfo import RaceInfo
+from necrobot.race.racer import Racer
+from necrobot.user import userdb, userlib
+from necrobot.util import journal
 
 from necrobot.gsheet.matchupsheet import MatchupSheet
 from necrobot.gsheet import sheetlib
@@ -41,6 +57,256 @@ class TestCommandType(CommandType):
         return await msgqueue.register_event(starts_with_str)
 
 
+class TestBenchRecordRace(TestCommandType):
+    def __init__(self, bot_channel):
+        TestCommandType.__init__(self, bot_channel, 'testbenchrecordrace')
+        self.help_text = "Time writing the race_runs for races of increasing size, with one INSERT per racer vs. " \
+                         "one multi-row INSERT. Runs in transactions that are rolled back, so nothing is recorded."
+
+    async def _do_execute(self, cmd: Command):
+        race_sizes = [2, 8, 32, 128]
+        num_trials = 5
+
+        async with DBConnect(commit=False, read_your_writes=True) as cursor:
+            await cursor.execute(
+                "SELECT `user_id` FROM `users` LIMIT %s",
+                (max(race_sizes),)
+            )
+            user_ids = [int(row[0]) for row in cursor.fetchall()]
+        type_id = await racedb.get_race_type_id(RaceInfo(), register=True)
+
+        results = ''
+        for race_size in race_sizes:
+            if race_size > len(user_ids):
+                break
+            run_params = [(uid, 60000 + idx, idx + 1, -1, '', -2) for idx, uid in enumerate(user_ids[:race_size])]
+            per_row_ms = statistics.median(
+                [await self._time_record(type_id, run_params, batched=False) for _ in range(num_trials)]
+            )
+            batched_ms = statistics.median(
+                [await self._time_record(type_id, run_params, batched=True) for _ in range(num_trials)]
+            )
+            results += '{0:>4} racers: {1:>8.2f} ms per-row, {2:>8.2f} ms batched\n'.format(
+                race_size, per_row_ms, batched_ms
+            )
+
+        if not results:
+            await cmd.channel.send('Error: not enough users in the database to benchmark.')
+            return
+        await cmd.channel.send('Median time to record a race ({0} trials):\n```\n{1}```'.format(num_trials, results))
+
+    @staticmethod
+    async def _time_record(type_id: int, run_params: list, batched: bool) -> float:
+        async with DBConnect(commit=False, read_your_writes=True) as cursor:
+            start = time.perf_counter()
+            race_id = await racedb._insert_race(
+                cursor=cursor,
+                timestamp=datetime.datetime.utcnow(),
+                type_id=type_id,
+                seed=0,
+                condor=False,
+                private=True
+            )
+            if batched:
+                await racedb._insert_race_runs(cursor, [(race_id,) + params for params in run_params])
+            else:
+                for params in run_params:
+                    await cursor.execute(
+                        """
+                        INSERT INTO {0} 
+                            (race_id, user_id, time, rank, igt, comment, level) 
+                        VALUES (%s,%s,%s,%s,%s,%s,%s)
+                        """.format(tn('race_runs')),
+                        (race_id,) + params
+                    )
+            return 1000 * (time.perf_counter() - start)
+
+
+class TestBenchPrepared(TestCommandType):
+    def __init__(self, bot_channel):
+        TestCommandType.__init__(self, bot_channel, 'testbenchprepared')
+        self.help_text = "Re-run the 20 most frequent SELECT statements seen so far, and compare their round-trip " \
+                         "times as plain and as prepared statements."
+
+    async def _do_execute(self, cmd: Command):
+        num_statements = 20
+        num_trials = 20
+
+        samples = [
+            stats for stats in querystats.get_query_stats()
+            if stats.sample_operation is not None and '%(' not in stats.sample_operation
+        ]
+        samples = sorted(samples, key=lambda s: s.count, reverse=True)[:num_statements]
+        if not samples:
+            await cmd.channel.send('No SELECT statements have been recorded yet.')
+            return
+
+        results = ''
+        total_plain_ms = 0.0
+        total_prepared_ms = 0.0
+        async with DBConnect(commit=False) as cursor:
+            for stats in samples:
+                # Warm up both paths, so that the prepared timings don't include the PREPARE itself
+                await cursor.execute(stats.sample_operation, stats.sample_params)
+                cursor.fetchall()
+                await cursor.execute_prepared(stats.sample_operation, stats.sample_params)
+
+                start = time.perf_counter()
+                for _ in range(num_trials):
+                    await cursor.execute(stats.sample_operation, stats.sample_params)
+                    cursor.fetchall()
+                plain_ms = 1000 * (time.perf_counter() - start) / num_trials
+
+                start = time.perf_counter()
+                for _ in range(num_trials):
+                    await cursor.execute_prepared(stats.sample_operation, stats.sample_params)
+                    cursor.fetchall()
+                prepared_ms = 1000 * (time.perf_counter() - start) / num_trials
+
+                total_plain_ms += plain_ms
+                total_prepared_ms += prepared_ms
+                results += '{0:>7.2f} {1:>7.2f}  {2}\n'.format(plain_ms, prepared_ms, stats.fingerprint[:50])
+
+        results += '{0:>7.2f} {1:>7.2f}  (total)\n'.format(total_plain_ms, total_prepared_ms)
+        await cmd.channel.send(
+            'Mean round-trip ms over {0} trials (plain, prepared):\n```\n{1}```'.format(num_trials, results)
+        )
+
+
+class _PlainObject(object):
+    pass
+
+
+class TestBenchDispatch(TestCommandType):
+    def __init__(self, bot_channel):
+        TestCommandType.__init__(self, bot_channel, 'testbenchdispatch')
+        self.help_text = "Time dispatching messages on this channel through Necrobot._execute, which looks up the " \
+                         "command by name, vs. offering each message to every command. Uses a command name that no " \
+                         "command answers to, so nothing is run."
+
+    async def _do_execute(self, cmd: Command):
+        num_messages = 20000
+        test_cmd = TestCommand(channel=cmd.channel, author=cmd.author, message_str='.benchnotacommand some args')
+
+        start = time.perf_counter()
+        for _ in range(num_messages):
+            await Necrobot()._execute(test_cmd)
+        indexed_rate = num_messages / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(num_messages):
+            for cmd_type in self.bot_channel.all_commands:
+                await cmd_type.execute(test_cmd)
+        scan_rate = num_messages / (time.perf_counter() - start)
+
+        await cmd.channel.send(
+            'Messages per second ({0} messages, {1} commands on this channel):\n'
+            '```\n'
+            'Indexed: {2:>10.0f}\n'
+            'Scan:    {3:>10.0f}\n'
+            '```'.format(num_messages, len(self.bot_channel.all_commands), indexed_rate, scan_rate)
+        )
+
+
+class TestBenchJournal(TestCommandType):
+    def __init__(self, bot_channel):
+        TestCommandType.__init__(self, bot_channel, 'testbenchjournal')
+        self.help_text = "Time writing race events for a 20-racer race to a scratch journal: the time each event " \
+                         "costs the event loop, and the throughput with batched fsyncs vs. an fsync per event."
+
+    async def _do_execute(self, cmd: Command):
+        num_events = 20000
+        num_synced_events = 200
+        racer_record = {
+            'k': cmd.channel.id, 'e': 'RACER_FINISH', 's': {'status': 3, 'start': time.time(), 'room': 'RaceRoom'},
+            'r': {'id': cmd.author.id, 'order': 0, 'status': 5, 'time': 123456, 'igt': -1, 'level': -2, 'comment': ''}
+        }
+        race_record = dict(racer_record, e='RACE_END', racers=[racer_record['r']] * 20)
+        del race_record['r']
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Batched: the event loop only queues each record
+            the_journal = journal.Journal(os.path.join(directory, 'bench.journal'))
+            start = time.perf_counter()
+            for idx in range(num_events):
+                the_journal.append(race_record if idx % 10 == 0 else racer_record)
+            append_us = 1000000 * (time.perf_counter() - start) / num_events
+            await asyncio.get_event_loop().run_in_executor(None, the_journal.flush)
+            batched_rate = num_events / (time.perf_counter() - start)
+            num_syncs = the_journal.num_syncs
+            num_bytes = the_journal.bytes_written
+            await asyncio.get_event_loop().run_in_executor(None, the_journal.close)
+
+            # Unbatched: flush (and so fsync) after every record. Run off the event loop, since each flush blocks
+            def write_synced(synced_journal: journal.Journal):
+                for i in range(num_synced_events):
+                    synced_journal.append(race_record if i % 10 == 0 else racer_record)
+                    synced_journal.flush()
+                synced_journal.close()
+
+            the_journal = journal.Journal(os.path.join(directory, 'bench-synced.journal'))
+            start = time.perf_counter()
+            await asyncio.get_event_loop().run_in_executor(None, write_synced, the_journal)
+            synced_rate = num_synced_events / (time.perf_counter() - start)
+
+        await cmd.channel.send(
+            'Journal writes ({0} events, {1:.0f} bytes per event):\n'
+            '```\n'
+            'Event loop cost:  {2:>8.1f} us per event\n'
+            'Batched fsync:    {3:>8.0f} events/s ({4} fsyncs)\n'
+            'fsync per event:  {5:>8.0f} events/s\n'
+            '```'.format(num_events, num_bytes / num_events, append_us, batched_rate, num_syncs, synced_rate)
+        )
+
+
+class TestBenchMemory(TestCommandType):
+    def __init__(self, bot_channel):
+        TestCommandType.__init__(self, bot_channel, 'testbenchmemory')
+        self.help_text = "Load every match and user, and compare the bytes per object of the slotted domain classes " \
+                         "with the same objects stored in an instance dict."
+
+    async def _do_execute(self, cmd: Command):
+        users = list((await userlib.get_users(user_ids=[row[8] for row in await userdb.get_all_users()])).values())
+        raw_matches = await matchdb.get_all_matches_raw_data()
+        match_users = await matchutil.prefetch_match_users(raw_matches)
+        matches = [await matchutil.make_match_from_raw_db_data(row, users=match_users) for row in raw_matches]
+        objects = [
+            ('NecroUser', users),
+            ('Racer', [Racer(user.member) for user in users if user.member is not None]),
+            ('Match', matches),
+            ('MatchInfo', [match.match_info for match in matches]),
+            ('RaceInfo', [match.race_info for match in matches]),
+        ]
+
+        results = ''
+        total_slotted = 0
+        total_dict = 0
+        for class_name, objs in objects:
+            if not objs:
+                continue
+            slotted_bytes = sum(sys.getsizeof(obj) for obj in objs)
+            dict_bytes = sum(self._dict_backed_size(obj) for obj in objs)
+            total_slotted += slotted_bytes
+            total_dict += dict_bytes
+            results += '{0:<10} {1:>6} {2:>7.1f} {3:>7.1f}\n'.format(
+                class_name, len(objs), dict_bytes / len(objs), slotted_bytes / len(objs)
+            )
+        results += '{0:<10} {1:>6} {2:>6.1f}K {3:>6.1f}K\n'.format('(total)', '', total_dict/1024, total_slotted/1024)
+
+        await cmd.channel.send(
+            'Bytes per object, excluding attribute values (count, dict-backed, slotted):\n```\n{0}```'.format(results)
+        )
+
+    @staticmethod
+    def _dict_backed_size(obj) -> int:
+        """The size obj would have without __slots__: a plain object, plus an instance dict of the same attributes."""
+        plain = _PlainObject()
+        for name in type(obj).__slots__:
+            if name != '__weakref__' and hasattr(obj, name):
+                setattr(plain, name, getattr(obj, name))
+        return sys.getsizeof(plain) + sys.getsizeof(plain.__dict__)
+
+
 class TestCreateCategory(TestCommandType):
     def __init__(self, bot_channel):
         TestCommandType.__init__(self, bot_channel, 'testcreatecategory')
@@ -18,6 +18,12 @@ cmd_user
 necrouser
     NecroUser: Class representing a RaceBot user.
     
+usercache
+    UserCache: Bounded cache of checked-out NecroUsers.
+
+userindex
+    UserIndex: In-memory index of the users table, by ID, discord ID, and case-insensitive name.
+
 userlib
     Module for caching database information for RaceBot users.
     
@@ -45,22 +51,35 @@ necrouser
         console
         server
         strutil
+        writebehind
         
 userdb
     database/
         dbconnect
+        dbmigrate
     user/
         necrouser
         userprefs
     util/
         console    
        
+usercache
+    config
+    user/
+        necrouser
+
+userindex
+    user/
+        necrouser
+
 userlib
     exception
     database/
         userdb
     user/
         necrouser
+        usercache
+        userindex
         userprefs
     util/
         console
@@ -1,15 +1,21 @@
-import asyncio
 import discord
 import pytz
 import re
+import functools
 import unittest
-from typing import Callable, Optional
+from typing import Callable, Optional, Sequence
 
-from necrobot.util import console, server, strutil
+from necrobot.util import console, server, strutil, writebehind
 from necrobot.user.userprefs import UserPrefs
 
 
 class NecroUser(object):
+    # __weakref__ is needed by the user cache (see usercache)
+    __slots__ = (
+        '_user_id', '_discord_id', '_discord_name', '_discord_member', '_twitch_name', '_rtmp_name', '_timezone',
+        '_user_info', '_user_prefs', '_commit', '_name_regex', '_name_regex_names', '__weakref__'
+    )
+
     def __init__(self, commit_fn):
         """Initialization. There should be no reason to directly create NecroUser objects; use userlib 
         instead.
@@ -31,6 +37,10 @@ class NecroUser(object):
 
         self._commit = commit_fn        # type: Callable[[], None]
 
+        # Cache for name_regex, and the names it was compiled from
+        self._name_regex = None         # type: Optional[re.Pattern]
+        self._name_regex_names = None   # type: Optional[tuple]
+
     def __eq__(self, other):
         return self.user_id == other.user_id
 
@@ -49,6 +59,11 @@ class NecroUser(object):
         return self.display_name
 
     async def commit(self) -> None:
+        """Write the user to the database now, through the write-behind queue (see writebehind.commit)."""
+        await writebehind.commit(self)
+
+    async def write(self) -> None:
+        """Write the user to the database. Called by the write-behind queue; use commit() instead."""
         await self._commit(self)
 
     @property
@@ -57,23 +72,20 @@ class NecroUser(object):
 
     @property
     def name_regex(self):
-        """A compiled Regular Expression Object matching the racer's various names"""
-        re_str = r''
-        if self.rtmp_name is not None:
-            re_str += re.escape(self.rtmp_name) + r'|'
-        if self.discord_name is not None:
-            re_str += re.escape(self.discord_name) + r'|'
-        if self.twitch_name is not None:
-            re_str += re.escape(self.twitch_name) + r'|'
-        if self.display_name is not None:
-            re_str += re.escape(self.display_name) + r'|'
-
-        if re_str == r'':
-            return None
-
-        re_str = re_str[:-1]
+        """A compiled Regular Expression Object matching the racer's various names. Cached until one of the names
+        changes.
+        """
+        names = self.names
+        if names != self._name_regex_names:
+            alternation = _name_alternation(names)
+            self._name_regex = re.compile(r'(?i)^\s*(' + alternation + r')\s*$') if alternation is not None else None
+            self._name_regex_names = names
+        return self._name_regex
 
-        return re.compile(r'(?i)^\s*(' + re_str + r')\s*$')
+    @property
+    def names(self) -> tuple:
+        """The names name_regex matches: (rtmp_name, discord_name, twitch_name, display_name). Any may be None."""
+        return self.rtmp_name, self.discord_name, self.twitch_name, self.display_name
 
     @property
     def discord_id(self) -> int:
@@ -255,7 +267,48 @@ class NecroUser(object):
             changed_any = True
 
         if changed_any and commit:
-            asyncio.ensure_future(self.commit())
+            writebehind.mark_dirty(self)
+
+
+def find_by_name(users: Sequence[NecroUser], name: str) -> Optional[NecroUser]:
+    """Find the first of the users whose name_regex matches the name. Tests the name against every user's names in a
+    single regex match, rather than one per user.
+
+    Parameters
+    ----------
+    users: Sequence[NecroUser]
+        The users to search, in order of priority. May contain None.
+    name: str
+        The name to match.
+
+    Returns
+    -------
+    Optional[NecroUser]
+        The first matching user, or None if no user matches.
+    """
+    users = [user for user in users if user is not None]
+    regex = _combined_name_regex(tuple(user.names for user in users))
+    if regex is None:
+        return None
+    match = regex.match(name)
+    return users[int(match.lastgroup[1:])] if match is not None else None
+
+
+def _name_alternation(names: tuple) -> Optional[str]:
+    escaped_names = [re.escape(name) for name in names if name is not None]
+    return '|'.join(escaped_names) if escaped_names else None
+
+
+@functools.lru_cache(maxsize=256)
+def _combined_name_regex(names_by_user: tuple):
+    groups = []
+    for idx, names in enumerate(names_by_user):
+        alternation = _name_alternation(names)
+        if alternation is not None:
+            groups.append('(?P<u{0}>{1})'.format(idx, alternation))
+    if not groups:
+        return None
+    return re.compile(r'(?i)^\s*(?:' + '|'.join(groups) + r')\s*$')
 
 
 class TestNecroUser(unittest.TestCase):
@@ -274,3 +327,20 @@ class TestNecroUser(unittest.TestCase):
         self.assertTrue(user_1.name_regex.match(' incnone rtmp '))
         self.assertTrue(user_1.name_regex.match(' Incnone_Twitch '))
         self.assertFalse(user_1.name_regex.match('incnone_nomatch'))
+
+        regex = user_1.name_regex
+        self.assertIs(user_1.name_regex, regex)
+        user_1.set(twitch_name='incnone_new', commit=False)
+        self.assertIsNot(user_1.name_regex, regex)
+        self.assertFalse(user_1.name_regex.match('incnone_twitch'))
+
+    def test_find_by_name(self):
+        user_1 = NecroUser(self.commit_fn)
+        user_1.set(rtmp_name='alpha', twitch_name='shared', commit=False)
+        user_2 = NecroUser(self.commit_fn)
+        user_2.set(rtmp_name='beta', twitch_name='shared', commit=False)
+        users = [user_1, None, user_2]
+        self.assertIs(find_by_name(users, ' BETA '), user_2)
+        self.assertIs(find_by_name(users, 'shared'), user_1)
+        self.assertIsNone(find_by_name(users, 'gamma'))
+        self.assertIsNone(find_by_name([], 'alpha'))
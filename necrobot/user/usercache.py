@@ -0,0 +1,132 @@
+"""
+A bounded cache of checked-out NecroUsers, by user ID and discord ID.
+
+The cache holds strong references to at most Config.USER_CACHE_SIZE recently used users, each for at most
+Config.USER_CACHE_TTL seconds since it was last used; older entries are evicted. Every cached user is also held by
+weak reference, so a user that is still referenced elsewhere (e.g. by a live Race or Match) stays findable after
+eviction; i.e. such users are effectively pinned, and there is never more than one NecroUser object for a user ID.
+"""
+
+import collections
+import time
+import types
+import unittest
+import weakref
+from typing import List, Optional
+
+from necrobot.config import Config
+from necrobot.user.necrouser import NecroUser
+
+
+class UserCache(object):
+    def __init__(self, capacity: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Parameters
+        ----------
+        capacity: Optional[int]
+            The maximum number of users to hold strong references to. If None, Config.USER_CACHE_SIZE.
+        ttl: Optional[float]
+            The number of seconds to hold a strong reference to an unused user. If None, Config.USER_CACHE_TTL.
+        """
+        self._capacity = capacity
+        self._ttl = ttl
+        self._recent = collections.OrderedDict()            # type: collections.OrderedDict
+        self._by_uid = weakref.WeakValueDictionary()        # type: weakref.WeakValueDictionary
+        self._by_did = weakref.WeakValueDictionary()        # type: weakref.WeakValueDictionary
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._by_uid)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity if self._capacity is not None else Config.USER_CACHE_SIZE
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl if self._ttl is not None else Config.USER_CACHE_TTL
+
+    @property
+    def num_recent(self) -> int:
+        """The number of users the cache holds strong references to."""
+        return len(self._recent)
+
+    def add(self, user: NecroUser) -> None:
+        """Cache the user, who must have a user ID."""
+        self._by_uid[user.user_id] = user
+        if user.discord_id is not None:
+            self._by_did[user.discord_id] = user
+        self._touch(user)
+
+    def get(self, user_id: int = None, discord_id: int = None) -> Optional[NecroUser]:
+        """Find a cached user by user ID, or failing that, by discord ID."""
+        user = self._by_uid.get(user_id) if user_id is not None else None
+        if user is None and discord_id is not None:
+            user = self._by_did.get(discord_id)
+            # The user's discord ID may have changed since they were cached
+            if user is not None and user.discord_id != discord_id:
+                user = None
+
+        if user is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(user)
+        return user
+
+    def users(self) -> List[NecroUser]:
+        """All cached users, including evicted users that are still referenced elsewhere."""
+        return list(self._by_uid.values())
+
+    def _touch(self, user: NecroUser) -> None:
+        now = time.monotonic()
+        self._recent[user.user_id] = (user, now)
+        self._recent.move_to_end(user.user_id)
+
+        capacity = self.capacity
+        ttl = self.ttl
+        while self._recent:
+            _, (_, last_used) = next(iter(self._recent.items()))
+            if len(self._recent) <= capacity and now - last_used <= ttl:
+                break
+            self._recent.popitem(last=False)
+            self.evictions += 1
+
+
+class TestUserCache(unittest.TestCase):
+    @staticmethod
+    def _make_user(user_id: int, discord_id: int = None) -> NecroUser:
+        user = NecroUser(commit_fn=None)
+        user._user_id = user_id
+        if discord_id is not None:
+            user._discord_id = discord_id
+            user._discord_member = types.SimpleNamespace(id=discord_id)
+        return user
+
+    def test_eviction(self):
+        cache = UserCache(capacity=2, ttl=3600)
+        pinned = self._make_user(1, discord_id=101)
+        cache.add(pinned)
+        cache.add(self._make_user(2))
+        cache.add(self._make_user(3))
+
+        # User 1 was evicted, but is still referenced here, so is still cached; using it evicts user 2
+        self.assertIs(cache.get(discord_id=101), pinned)
+        self.assertIsNotNone(cache.get(user_id=3))
+        self.assertEqual(cache.num_recent, 2)
+
+        # Users 1 and 3 are evicted, and only user 1 is still referenced; using it again evicts user 4
+        cache.add(self._make_user(4))
+        cache.add(self._make_user(5))
+        self.assertIsNone(cache.get(user_id=3))
+        self.assertIs(cache.get(user_id=1), pinned)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(sorted(user.user_id for user in cache.users()), [1, 5])
+
+    def test_ttl(self):
+        cache = UserCache(capacity=10, ttl=-1)
+        cache.add(self._make_user(1))
+        self.assertIsNone(cache.get(user_id=1))
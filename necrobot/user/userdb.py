@@ -4,6 +4,8 @@ Interaction with the users table.
 Methods
 -------
 write_user
+get_all_users
+get_users_with_ids
 get_users_with_any
 get_users_with_all
 get_all_discord_ids_matching_prefs
@@ -15,7 +17,8 @@ from typing import Iterable
 
 from necrobot.util import console
 
-from necrobot.database.dbconnect import DBConnect
+from necrobot.database import dbmigrate
+from necrobot.database.dbconnect import DBConnect, UnitOfWork
 from necrobot.user.necrouser import NecroUser
 from necrobot.user.userprefs import UserPrefs
 
@@ -48,10 +51,22 @@ from necrobot.user.userprefs import UserPrefs
 
 
 # Commit function
-async def write_user(necro_user: NecroUser) -> None:
+async def write_user(necro_user: NecroUser) -> int or None:
+    """Write the user to the database, registering them if they have no user ID.
+
+    Returns
+    -------
+    Optional[int]
+        The user ID of an RTMP-only entry with the same rtmp_name, if one was merged into this user and deleted.
+    """
+    async with UnitOfWork():
+        return await _write_user(necro_user)
+
+
+async def _write_user(necro_user: NecroUser) -> int or None:
     if necro_user.user_id is None:
         await _register_user(necro_user)
-        return
+        return None
 
     rtmp_clash_user_id = await _get_resolvable_rtmp_clash_user_id(necro_user)
     if rtmp_clash_user_id is not None:
@@ -72,7 +87,7 @@ async def write_user(necro_user: NecroUser) -> None:
     async with DBConnect(commit=True) as cursor:
         if rtmp_clash_user_id is not None:
             rtmp_clash_params = (rtmp_clash_user_id,)
-            cursor.execute(
+            await cursor.execute(
                 """
                 DELETE FROM users 
                 WHERE user_id=%s
@@ -80,7 +95,7 @@ async def write_user(necro_user: NecroUser) -> None:
                 rtmp_clash_params
             )
 
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE users 
             SET 
@@ -96,9 +111,64 @@ async def write_user(necro_user: NecroUser) -> None:
             """,
             params
         )
+    return rtmp_clash_user_id
 
 
 # Search
+async def get_all_users() -> list:
+    """All rows of the users table, in the format of the other search functions."""
+    async with DBConnect(commit=False) as cursor:
+        await cursor.execute(
+            """
+            SELECT 
+               discord_id, 
+               discord_name, 
+               twitch_name, 
+               rtmp_name, 
+               timezone, 
+               user_info, 
+               daily_alert, 
+               race_alert, 
+               user_id 
+            FROM users
+            """
+        )
+        return cursor.fetchall()
+
+
+async def get_users_with_ids(user_ids: Iterable[int] = (), discord_ids: Iterable[int] = ()) -> list:
+    """All users whose user ID is in user_ids, or whose discord ID is in discord_ids, in a single query."""
+    user_ids = tuple(int(user_id) for user_id in user_ids)
+    discord_ids = tuple(int(discord_id) for discord_id in discord_ids)
+    where_query = ''
+    if user_ids:
+        where_query += ' OR user_id IN ({0})'.format(','.join(['%s'] * len(user_ids)))
+    if discord_ids:
+        where_query += ' OR discord_id IN ({0})'.format(','.join(['%s'] * len(discord_ids)))
+    if not where_query:
+        return []
+
+    async with DBConnect(commit=False) as cursor:
+        await cursor.execute(
+            """
+            SELECT 
+               discord_id, 
+               discord_name, 
+               twitch_name, 
+               rtmp_name, 
+               timezone, 
+               user_info, 
+               daily_alert, 
+               race_alert, 
+               user_id 
+            FROM users 
+            WHERE {0}
+            """.format(where_query[len(' OR '):]),
+            user_ids + discord_ids
+        )
+        return cursor.fetchall()
+
+
 async def get_users_with_any(
         discord_id: int = None,
         discord_name: str = None,
@@ -132,7 +202,7 @@ async def get_all_users_with_any(names: Iterable[str]):
         params = params + params + params
         print(params)
 
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT 
                discord_id, 
@@ -145,10 +215,15 @@ async def get_all_users_with_any(names: Iterable[str]):
                race_alert, 
                user_id 
             FROM users 
-            WHERE LOWER(discord_name) IN ({fm})
-            OR LOWER(twitch_name) IN ({fm})
-            OR LOWER(rtmp_name) IN ({fm})
-            """.format(fm=format_strings),
+            WHERE {discord_name} IN ({fm})
+            OR {twitch_name} IN ({fm})
+            OR {rtmp_name} IN ({fm})
+            """.format(
+                fm=format_strings,
+                discord_name=dbmigrate.lower_name('discord_name'),
+                twitch_name=dbmigrate.lower_name('twitch_name'),
+                rtmp_name=dbmigrate.lower_name('rtmp_name')
+            ),
             params
         )
         return cursor.fetchall()
@@ -187,7 +262,7 @@ async def get_all_discord_ids_matching_prefs(user_prefs: UserPrefs) -> list:
     where_query = where_query[5:]
 
     async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT discord_id 
             FROM users 
@@ -202,7 +277,7 @@ async def get_all_discord_ids_matching_prefs(user_prefs: UserPrefs) -> list:
 async def register_discord_user(user: discord.User):
     params = (user.id, user.display_name,)
     async with DBConnect(commit=True) as cursor:
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO users 
                 (discord_id, discord_name) 
@@ -245,20 +320,20 @@ async def _get_users_helpfn(
             where_query += ' {0} discord_id=%s'.format(connector)
         if discord_name is not None:
             where_query += ' {0} discord_name=%s'.format(connector) if case_sensitive \
-                else ' {0} LOWER(discord_name)=%s'.format(connector)
+                else ' {0} {1}=%s'.format(connector, dbmigrate.lower_name('discord_name'))
         if twitch_name is not None:
             where_query += ' {0} twitch_name=%s'.format(connector) if case_sensitive \
-                else ' {0} LOWER(twitch_name)=%s'.format(connector)
+                else ' {0} {1}=%s'.format(connector, dbmigrate.lower_name('twitch_name'))
         if rtmp_name is not None:
             where_query += ' {0} rtmp_name=%s'.format(connector) if case_sensitive \
-                else ' {0} LOWER(rtmp_name)=%s'.format(connector)
+                else ' {0} {1}=%s'.format(connector, dbmigrate.lower_name('rtmp_name'))
         if timezone is not None:
             where_query += ' {0} timezone=%s'.format(connector)
         if user_id is not None:
             where_query += ' {0} user_id=%s'.format(connector)
         where_query = where_query[len(connector):] if where_query else 'TRUE'
 
-        cursor.execute(
+        await cursor.execute_prepared(
             """
             SELECT 
                discord_id, 
@@ -294,7 +369,7 @@ async def _register_user(necro_user: NecroUser):
     async with DBConnect(commit=True) as cursor:
         if rtmp_clash_user_id is None:
             try:
-                cursor.execute(
+                await cursor.execute(
                     """
                     INSERT INTO users 
                     (discord_id, discord_name, twitch_name, timezone, user_info, daily_alert, race_alert, rtmp_name) 
@@ -302,14 +377,14 @@ async def _register_user(necro_user: NecroUser):
                     """,
                     params
                 )
-                cursor.execute("SELECT LAST_INSERT_ID()")
+                await cursor.execute("SELECT LAST_INSERT_ID()")
                 uid = int(cursor.fetchone()[0])
                 necro_user._user_id = uid
             except mysql.connector.IntegrityError:
                 console.warning('Tried to insert a duplicate racer entry. Params: {0}'.format(params))
                 raise
         else:
-            cursor.execute(
+            await cursor.execute(
                 """
                 UPDATE users 
                 SET 
@@ -346,8 +421,8 @@ async def _get_resolvable_rtmp_clash_user_id(necro_user: NecroUser) -> int or No
 
     rtmp_params = (necro_user.rtmp_name,)
 
-    async with DBConnect(commit=False) as cursor:
-        cursor.execute(
+    async with DBConnect(commit=False, read_your_writes=True) as cursor:
+        await cursor.execute(
             """
             SELECT `user_id`, `discord_id` 
             FROM `users` 
@@ -394,7 +469,7 @@ async def _transfer_user_id(from_user_id: int, to_user_id: int):
 
     async with DBConnect(commit=True) as cursor:
         # Update main-database matches
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE matches 
             SET racer_1_id=%(to_uid)s 
@@ -402,7 +477,7 @@ async def _transfer_user_id(from_user_id: int, to_user_id: int):
             """,
             params
         )
-        cursor.execute(
+        await cursor.execute(
             """
             UPDATE matches 
             SET racer_2_id=%(to_uid)s 
@@ -412,7 +487,7 @@ async def _transfer_user_id(from_user_id: int, to_user_id: int):
         )
 
         # Update leagues
-        cursor.execute(
+        await cursor.execute(
             """
             SELECT `schema_name` 
             FROM leagues 
@@ -424,7 +499,7 @@ async def _transfer_user_id(from_user_id: int, to_user_id: int):
             schema_names.append(row[0])
 
         for schema_name in schema_names:
-            cursor.execute(
+            await cursor.execute(
                 """
                 UPDATE `{schema_name}`.entrants 
                 SET user_id=%(to_uid)s 
@@ -432,7 +507,7 @@ async def _transfer_user_id(from_user_id: int, to_user_id: int):
                 """.format(schema_name=schema_name),
                 params
             )
-            cursor.execute(
+            await cursor.execute(
                 """
                 UPDATE `{schema_name}`.matches 
                 SET racer_1_id=%(to_uid)s 
@@ -440,7 +515,7 @@ async def _transfer_user_id(from_user_id: int, to_user_id: int):
                 """.format(schema_name=schema_name),
                 params
             )
-            cursor.execute(
+            await cursor.execute(
                 """
                 UPDATE `{schema_name}`.matches 
                 SET racer_2_id=%(to_uid)s 
@@ -0,0 +1,168 @@
+"""
+An in-memory index of the `users` table, so that looking up a user by ID, discord ID, or (case-insensitive) name
+doesn't need a database query. userlib loads the index at startup and updates it whenever a user is written.
+
+Rows are stored in the format returned by userdb's queries: (discord_id, discord_name, twitch_name, rtmp_name,
+timezone, user_info, daily_alert, race_alert, user_id).
+"""
+
+import unittest
+from typing import Dict, Iterable, List, Optional, Set
+
+from necrobot.user.necrouser import NecroUser
+
+
+class UserIndex(object):
+    def __init__(self):
+        self.loaded = False
+        self._rows = dict()             # type: Dict[int, tuple]
+        self._by_discord_id = dict()    # type: Dict[int, int]
+        self._by_discord_name = dict()  # type: Dict[str, Set[int]]
+        self._by_twitch_name = dict()   # type: Dict[str, Set[int]]
+        self._by_rtmp_name = dict()     # type: Dict[str, Set[int]]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Replace the contents of the index with the given rows."""
+        self._rows.clear()
+        self._by_discord_id.clear()
+        self._by_discord_name.clear()
+        self._by_twitch_name.clear()
+        self._by_rtmp_name.clear()
+        for row in rows:
+            self.add_row(row)
+        self.loaded = True
+
+    def add_row(self, row: tuple) -> None:
+        """Add the row to the index, replacing any row with the same user ID."""
+        user_id = int(row[8])
+        self.remove(user_id)
+        self._rows[user_id] = tuple(row)
+        if row[0] is not None:
+            self._by_discord_id[int(row[0])] = user_id
+        for name, name_dict in self._name_dicts(row):
+            name_dict.setdefault(name.lower(), set()).add(user_id)
+
+    def add_user(self, user: NecroUser) -> None:
+        """Add or update the row for the user, which must have a user ID."""
+        self.add_row((
+            user.discord_id,
+            user.discord_name,
+            user.twitch_name,
+            user.rtmp_name,
+            user.timezone_str,
+            user.user_info,
+            user.user_prefs.daily_alert,
+            user.user_prefs.race_alert,
+            user.user_id
+        ))
+
+    def remove(self, user_id: int) -> None:
+        row = self._rows.pop(user_id, None)
+        if row is None:
+            return
+        if row[0] is not None and self._by_discord_id.get(int(row[0])) == user_id:
+            del self._by_discord_id[int(row[0])]
+        for name, name_dict in self._name_dicts(row):
+            user_ids = name_dict.get(name.lower())
+            if user_ids is not None:
+                user_ids.discard(user_id)
+                if not user_ids:
+                    del name_dict[name.lower()]
+
+    def find(
+            self,
+            discord_id: int = None,
+            discord_name: str = None,
+            twitch_name: str = None,
+            rtmp_name: str = None,
+            user_id: int = None
+    ) -> List[tuple]:
+        """All rows matching every given parameter, with names compared case-insensitively (as
+        userdb.get_users_with_all). Returns no rows if no parameters are given.
+        """
+        candidates = []     # type: List[Set[int]]
+        if user_id is not None:
+            candidates.append({user_id} if user_id in self._rows else set())
+        if discord_id is not None:
+            found_id = self._by_discord_id.get(int(discord_id))
+            candidates.append({found_id} if found_id is not None else set())
+        if discord_name is not None:
+            candidates.append(self._by_discord_name.get(discord_name.lower(), set()))
+        if twitch_name is not None:
+            candidates.append(self._by_twitch_name.get(twitch_name.lower(), set()))
+        if rtmp_name is not None:
+            candidates.append(self._by_rtmp_name.get(rtmp_name.lower(), set()))
+
+        if not candidates:
+            return []
+        return [self._rows[found_id] for found_id in sorted(set.intersection(*candidates))]
+
+    def find_any_name(self, name: str) -> Optional[tuple]:
+        """The row whose rtmp, discord, or twitch name is the given name, case-insensitive. If there are several,
+        prioritize by name_priority, then by lowest user ID.
+        """
+        name_lower = name.lower()
+        user_ids = self._by_rtmp_name.get(name_lower, set()) \
+            | self._by_discord_name.get(name_lower, set()) \
+            | self._by_twitch_name.get(name_lower, set())
+        if not user_ids:
+            return None
+        return max(
+            (self._rows[user_id] for user_id in user_ids),
+            key=lambda row: (name_priority(row, name, name, name), -row[8])
+        )
+
+    def _name_dicts(self, row: tuple):
+        if row[1] is not None:
+            yield row[1], self._by_discord_name
+        if row[2] is not None:
+            yield row[2], self._by_twitch_name
+        if row[3] is not None:
+            yield row[3], self._by_rtmp_name
+
+
+def name_priority(row: tuple, discord_name: str, twitch_name: str, rtmp_name: str) -> int:
+    """Ranks how well a user row matches the given names: rtmp name matches rank above discord name matches, which
+    rank above twitch name matches, and an exact-case match ranks above a case-insensitive one.
+    """
+    return \
+        32*int(row[3] == rtmp_name) \
+        + 16*int(row[3].lower() == rtmp_name.lower() if row[3] is not None else 0) + \
+        8*int(row[1] == discord_name) \
+        + 4*int(row[1].lower() == discord_name.lower() if row[1] is not None else 0) + \
+        2*int(row[2] == twitch_name) \
+        + 1*int(row[2].lower() == twitch_name.lower() if row[2] is not None else 0)
+
+
+class TestUserIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = UserIndex()
+        self.index.load([
+            (101, 'Alpha', 'alphaTV', None, None, None, 0, 0, 1),
+            (102, 'beta', 'Alpha', 'BetaR', None, None, 0, 0, 2),
+            (None, None, None, 'alpha', None, None, 0, 0, 3),
+        ])
+
+    def test_find(self):
+        self.assertEqual(self.index.find(discord_id=101)[0][8], 1)
+        self.assertEqual([row[8] for row in self.index.find(twitch_name='ALPHATV')], [1])
+        self.assertEqual(self.index.find(discord_name='alpha', twitch_name='betar'), [])
+        self.assertEqual(self.index.find(), [])
+
+    def test_find_any_name(self):
+        # rtmp beats discord beats twitch
+        self.assertEqual(self.index.find_any_name('ALPHA')[8], 3)
+        self.index.remove(3)
+        self.assertEqual(self.index.find_any_name('alpha')[8], 1)
+        self.assertEqual(self.index.find_any_name('betar')[8], 2)
+        self.assertIsNone(self.index.find_any_name('gamma'))
+
+    def test_update(self):
+        self.index.add_row((101, 'Gamma', None, None, None, None, 0, 0, 1))
+        self.assertIsNone(self.index.find_any_name('alphatv'))
+        self.assertEqual(self.index.find(discord_name='gamma')[0][8], 1)
+        self.assertEqual(self.index.find(discord_id=101)[0][8], 1)
+        self.assertEqual(len(self.index), 3)
@@ -3,19 +3,33 @@ Module for the NecroUser library.
 
 NecroUser represents a bot user, and is in correspondence with data stored in a row of the `users` table of
 the database. This module is responsible for checking out users from the database and storing a library, indexed
-by user ID, of checked out users.
+by user ID, of checked out users (a bounded cache; see usercache). Lookups go through an in-memory index of the
+`users` table (see userindex), which is loaded at startup by load_user_index(); users not found in the index are
+looked up in the database, in case another bot instance has registered them.
 """
 
+from typing import Dict, Iterable
+
 import necrobot.exception
 from necrobot.user.necrouser import NecroUser
+from necrobot.user.usercache import UserCache
+from necrobot.user.userindex import UserIndex, name_priority
 from necrobot.user.userprefs import UserPrefs
 from necrobot.util import console
 from necrobot.util import server
 from necrobot.user import userdb
 
-# Libraries of checked out users
-user_library_by_uid = {}
-user_library_by_did = {}
+# Library of checked out users
+user_library = UserCache()
+
+# Index of the users table
+user_index = UserIndex()
+
+
+async def load_user_index() -> None:
+    """Load every row of the users table into the in-memory user index."""
+    user_index.load(await userdb.get_all_users())
+    console.info('Loaded {0} users into the user index.'.format(len(user_index)))
 
 
 async def fill_user_dict(user_dict: dict):
@@ -23,8 +37,23 @@ async def fill_user_dict(user_dict: dict):
     For each key in the given dict, find a NecroUser, if possible, matching that key (via the logic used for the
     'any_name' field of get_user), and put that NecroUser into the value.
     """
+    if user_index.loaded:
+        missing_names = []
+        for name in user_dict.keys():
+            row = user_index.find_any_name(name)
+            if row is not None:
+                user_dict[name] = _get_user_from_db_row(row)
+            else:
+                missing_names.append(name)
+        if not missing_names:
+            return user_dict
+    else:
+        missing_names = list(user_dict.keys())
+
     # TODO: be more careful about name duplication
-    raw_db_data = await userdb.get_all_users_with_any(user_dict.keys())
+    raw_db_data = await userdb.get_all_users_with_any(missing_names)
+    for row in raw_db_data:
+        user_index.add_row(row)
     for row in raw_db_data:
         necrouser = _get_user_from_db_row(row)
         if necrouser.discord_name is not None and necrouser.discord_name.lower() in user_dict:
@@ -87,20 +116,30 @@ async def get_user(
     if cached_user is not None:
         return cached_user
 
-    raw_db_data = await userdb.get_users_with_all(
+    raw_db_data = user_index.find(
         discord_id=discord_id,
         discord_name=discord_name,
         twitch_name=twitch_name,
         rtmp_name=rtmp_name,
         user_id=user_id
     )
+    if not raw_db_data:
+        raw_db_data = await userdb.get_users_with_all(
+            discord_id=discord_id,
+            discord_name=discord_name,
+            twitch_name=twitch_name,
+            rtmp_name=rtmp_name,
+            user_id=user_id
+        )
+        for row in raw_db_data:
+            user_index.add_row(row)
 
     # If no user found, register if asked, otherwise return None
     if not raw_db_data:
         if not register:
             return None
         elif rtmp_name is not None:
-            user = NecroUser(commit_fn=userdb.write_user)
+            user = NecroUser(commit_fn=_write_user)
             user.set(rtmp_name=rtmp_name, commit=False)
             await user.commit()
             _cache_user(user)
@@ -108,7 +147,7 @@ async def get_user(
         elif discord_id is not None:
             discord_member = server.find_member(discord_id=discord_id)
             if discord_member is not None:
-                user = NecroUser(commit_fn=userdb.write_user)
+                user = NecroUser(commit_fn=_write_user)
                 user.set(discord_member=discord_member, commit=False)
                 await user.commit()
                 _cache_user(user)
@@ -130,8 +169,57 @@ async def get_user(
     return None
 
 
+async def get_users(user_ids: Iterable[int] = None, discord_ids: Iterable[int] = None) -> Dict[int, NecroUser]:
+    """Find many NecroUsers at once, by user ID or by discord ID. Users that aren't already checked out or in the
+    user index are looked up with a single database query. Use this to prefetch the users for a batch of work, rather
+    than calling get_user in a loop. Behavior only guaranteed when exactly one of the parameters is non-None.
+
+    Parameters
+    ----------
+    user_ids: Iterable[int]
+        The users' database IDs.
+    discord_ids: Iterable[int]
+        The users' discord IDs.
+
+    Returns
+    -------
+    Dict[int, NecroUser]
+        A dict from each found ID (of the kind given) to its NecroUser. IDs with no user are left out.
+    """
+    by_discord_id = user_ids is None
+    ids = set(int(x) for x in (discord_ids if by_discord_id else user_ids) or [])
+
+    found_users = dict()
+    missing_ids = []
+    for the_id in ids:
+        if by_discord_id:
+            user = _get_cached_user(discord_id=the_id)
+            rows = user_index.find(discord_id=the_id) if user is None else []
+        else:
+            user = _get_cached_user(user_id=the_id)
+            rows = user_index.find(user_id=the_id) if user is None else []
+
+        if user is None and rows:
+            user = _get_user_from_db_row(rows[0])
+        if user is not None:
+            found_users[the_id] = user
+        else:
+            missing_ids.append(the_id)
+
+    if missing_ids:
+        if by_discord_id:
+            raw_db_data = await userdb.get_users_with_ids(discord_ids=missing_ids)
+        else:
+            raw_db_data = await userdb.get_users_with_ids(user_ids=missing_ids)
+        for row in raw_db_data:
+            user_index.add_row(row)
+            found_users[int(row[0] if by_discord_id else row[8])] = _get_user_from_db_row(row)
+
+    return found_users
+
+
 async def commit_all_checked_out_users():
-    for user in user_library_by_uid.values():
+    for user in user_library.users():
         await user.commit()
 
 
@@ -140,7 +228,7 @@ def _get_user_from_db_row(user_row):
     if cached_user is not None:
         return cached_user
 
-    user = NecroUser(commit_fn=userdb.write_user)
+    user = NecroUser(commit_fn=_write_user)
     console.debug('Getting user from data: {}'.format(user_row))
     user.set(
         discord_id=user_row[0],
@@ -158,54 +246,50 @@ def _get_user_from_db_row(user_row):
 
 
 async def _get_user_any_name(name: str, register: bool) -> NecroUser or None:
+    indexed_row = user_index.find_any_name(name)
+    if indexed_row is not None:
+        return _get_user_from_db_row(indexed_row)
+
     raw_db_data = await userdb.get_users_with_any(
         discord_name=name,
         twitch_name=name,
         rtmp_name=name,
     )
+    for row in raw_db_data:
+        user_index.add_row(row)
 
     if not raw_db_data:
         if not register:
             return None
         else:
-            user = NecroUser(commit_fn=userdb.write_user)
+            user = NecroUser(commit_fn=_write_user)
             user.set(rtmp_name=name, commit=False)
             await user.commit()
             _cache_user(user)
             return user
 
-    raw_db_data = sorted(raw_db_data, key=lambda x: _raw_db_sort_fn(x, name, name, name), reverse=True)
+    raw_db_data = sorted(raw_db_data, key=lambda x: name_priority(x, name, name, name), reverse=True)
     for user_row in raw_db_data:
         return _get_user_from_db_row(user_row)
 
 
+async def _write_user(user: NecroUser) -> None:
+    merged_user_id = await userdb.write_user(user)
+    if merged_user_id is not None:
+        user_index.remove(merged_user_id)
+    user_index.add_user(user)
+
+
 def _cache_user(user: NecroUser):
     if user.user_id is None:
         console.warning('Trying to cache a user with no user ID.')
         return
 
-    user_library_by_uid[user.user_id] = user
-    if user.discord_id is not None:
-        user_library_by_did[user.discord_id] = user
+    user_library.add(user)
 
 
 def _get_cached_user(
         user_id: int = None,
         discord_id: int = None,
 ) -> NecroUser or None:
-    if user_id is not None and user_id in user_library_by_uid:
-        return user_library_by_uid[user_id]
-    elif discord_id is not None and discord_id in user_library_by_did:
-        return user_library_by_did[discord_id]
-    else:
-        return None
-
-
-def _raw_db_sort_fn(row, discord_name, twitch_name, rtmp_name):
-    return \
-        32*int(row[3] == rtmp_name) \
-        + 16*int(row[3].lower() == rtmp_name.lower() if row[3] is not None else 0) + \
-        8*int(row[1] == discord_name) \
-        + 4*int(row[1].lower() == discord_name.lower() if row[1] is not None else 0) + \
-        2*int(row[2] == twitch_name) \
-        + 1*int(row[2].lower() == twitch_name.lower() if row[2] is not None else 0)
+    return user_library.get(user_id=user_id, discord_id=discord_id)
@@ -15,11 +15,22 @@ Dependencies
     console
     
     decorators
+        writebehind
+    
+    journal
+        config
+        console
     
     level
     
+    logsink
+    
     ordinal
     
+    outbox
+        config
+        console
+    
     racetime
     
     ratelimit
@@ -35,7 +46,19 @@ Dependencies
     
     strutil
     
+    timerwheel
+        console
+    
     timestr
     
+    topicupdater
+        config
+        console
+        timerwheel
+    
+    writebehind
+        config
+        console
+    
     writechannel
 """
\ No newline at end of file
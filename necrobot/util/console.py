@@ -1,27 +1,116 @@
-import inspect
+"""
+Logging for the bot, through the 'necrobot' logger. Each message is prefixed with the name of the calling module.
+
+The calling module is read directly off the caller's frame, and nothing is done for a level that isn't enabled. Extra
+positional arguments are %-formatted into the message lazily, only if the record is emitted, e.g.
+`console.debug('Found %s users', len(users))`. Records also carry the calling module as the attribute `caller`.
+
+start_background_logging() moves all handler I/O onto a background thread, so that logging from the event loop never
+blocks on disk or terminal writes.
+"""
+
 import logging
+import logging.handlers
+import queue
+import sys
+import unittest
+from typing import Dict, List
+
+_logger = logging.getLogger('necrobot')
+_listeners = []     # type: List[logging.handlers.QueueListener]
+
+
+def debug(info_str: str, *args):
+    _log(logging.DEBUG, info_str, args)
+
+
+def info(info_str: str, *args):
+    _log(logging.INFO, info_str, args)
+
+
+def warning(error_str: str, *args):
+    _log(logging.WARNING, error_str, args)
+
+
+def error(error_str: str, *args):
+    _log(logging.ERROR, error_str, args, exc_info=True)
+
+
+def critical(error_str: str, *args):
+    _log(logging.CRITICAL, error_str, args, exc_info=True)
+
+
+def _log(level: int, msg: str, args: tuple, exc_info: bool = False) -> None:
+    if not _logger.isEnabledFor(level):
+        return
+
+    # Frame 0 is _log, frame 1 is debug/info/etc., frame 2 is the caller
+    caller_mod_name = sys._getframe(2).f_globals.get('__name__', '<unknown>')
+    if args:
+        msg, args = '[%s] ' + msg, (caller_mod_name,) + args
+    else:
+        msg, args = '[%s] %s', (caller_mod_name, msg)
+    _logger.log(level, msg, *args, exc_info=exc_info, extra={'caller': caller_mod_name})
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener is in this process, so the record needn't be pickleable; leave formatting to the listener
+        return record
+
+
+def start_background_logging(handlers_by_logger: Dict[str, List[logging.Handler]]) -> None:
+    """Attach the given handlers to the given loggers, such that the handlers are run on a background thread. Each
+    logger gets a queue, which a listener thread drains into its handlers.
 
+    Parameters
+    ----------
+    handlers_by_logger: Dict[str, List[logging.Handler]]
+        A dict from logger names to the handlers to attach to that logger.
+    """
+    for logger_name, handlers in handlers_by_logger.items():
+        record_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=True)
+        logging.getLogger(logger_name).addHandler(_InProcessQueueHandler(record_queue))
+        listener.start()
+        _listeners.append(listener)
 
-def debug(info_str: str):
-    caller_mod_name = inspect.getmodule(inspect.stack()[1][0]).__name__
-    logging.getLogger('necrobot').debug('[{0}] {1}'.format(caller_mod_name, info_str))
 
+def stop_background_logging() -> None:
+    """Write out all queued records, and stop the listener threads started by start_background_logging."""
+    while _listeners:
+        _listeners.pop().stop()
 
-def info(info_str: str):
-    caller_mod_name = inspect.getmodule(inspect.stack()[1][0]).__name__
-    logging.getLogger('necrobot').info('[{0}] {1}'.format(caller_mod_name, info_str))
 
+class TestConsole(unittest.TestCase):
+    class ListHandler(logging.Handler):
+        def __init__(self):
+            logging.Handler.__init__(self)
+            self.records = []
 
-def warning(error_str: str):
-    caller_mod_name = inspect.getmodule(inspect.stack()[1][0]).__name__
-    logging.getLogger('necrobot').warning('[{0}] {1}'.format(caller_mod_name, error_str))
+        def emit(self, record):
+            self.records.append(record)
 
+    def setUp(self):
+        self._old_level = _logger.level
+        self._old_handlers = list(_logger.handlers)
+        self.handler = TestConsole.ListHandler()
+        _logger.setLevel(logging.INFO)
+        start_background_logging({'necrobot': [self.handler]})
 
-def error(error_str: str):
-    caller_mod_name = inspect.getmodule(inspect.stack()[1][0]).__name__
-    logging.getLogger('necrobot').error('[{0}] {1}'.format(caller_mod_name, error_str), exc_info=True)
+    def tearDown(self):
+        stop_background_logging()
+        _logger.setLevel(self._old_level)
+        _logger.handlers = self._old_handlers
 
+    def test_log(self):
+        debug('not logged %s', 'at all')
+        info('Found %s users', 3)
+        warning('100% literal')
+        stop_background_logging()
 
-def critical(error_str: str):
-    caller_mod_name = inspect.getmodule(inspect.stack()[1][0]).__name__
-    logging.getLogger('necrobot').critical('[{0}] {1}'.format(caller_mod_name, error_str), exc_info=True)
+        self.assertEqual(
+            [record.getMessage() for record in self.handler.records],
+            ['[{0}] Found 3 users'.format(__name__), '[{0}] 100% literal'.format(__name__)]
+        )
+        self.assertEqual(self.handler.records[0].caller, __name__)
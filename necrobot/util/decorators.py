@@ -1,11 +1,14 @@
-import asyncio
+from necrobot.util import writebehind
 
 
 def commits(func):
+    """Decorator for setters of objects with a coroutine method commit(). After the setter runs, the object is queued
+    to be committed (see writebehind), unless the keyword argument commit=False is given.
+    """
     def func_wrapper(self, *args, **kwargs):
         func(self, *args, **kwargs)
 
         if 'commit' not in kwargs or kwargs['commit']:
-            asyncio.ensure_future(self.commit())
+            writebehind.mark_dirty(self)
 
     return func_wrapper
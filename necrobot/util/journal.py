@@ -0,0 +1,239 @@
+"""
+An append-only journal of JSON records, for state that should survive a restart (see necrobot.race.racejournal).
+
+`append()` only queues the record; a background thread writes queued records in batches, and fsyncs once per batch,
+at most every Config.JOURNAL_FSYNC_MS milliseconds. So a crash loses at most the last few milliseconds of records, and
+the event loop never waits on the disk. `compact()` replaces the journal's contents with the given records (e.g.
+snapshots of everything still live), in order with the records appended around it. Call `flush()` to wait until
+everything queued is on disk, e.g. on shutdown.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from typing import Iterable, List, Optional
+
+from necrobot.config import Config
+from necrobot.util import console
+
+_journal = None     # type: Optional[Journal]
+
+
+class Journal(object):
+    def __init__(self, filename: str, fsync_interval: Optional[float] = None):
+        """
+        Parameters
+        ----------
+        filename: str
+            The journal file. Its directory is created if necessary.
+        fsync_interval: Optional[float]
+            The minimum number of seconds between fsyncs. If None, Config.JOURNAL_FSYNC_MS.
+        """
+        self.filename = filename
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self._fsync_interval = fsync_interval
+        _truncate_torn_record(filename)
+        self._file = open(filename, 'a', encoding='utf-8')
+
+        self._pending = []                  # type: List[tuple]
+        self._cond = threading.Condition()
+        self._num_queued = 0
+        self._num_written = 0
+        self._num_flushing = 0
+        self._closed = False
+        self._stopped = False
+
+        self.num_records = 0
+        self.num_syncs = 0
+        self.num_compactions = 0
+        self.bytes_written = 0
+
+        self._thread = threading.Thread(target=self._write_loop, name='journal-writer', daemon=True)
+        self._thread.start()
+
+    @property
+    def fsync_interval(self) -> float:
+        return self._fsync_interval if self._fsync_interval is not None else Config.JOURNAL_FSYNC_MS / 1000
+
+    def append(self, record: dict) -> None:
+        """Queue the record to be written. The record must be JSON-serializable."""
+        self._queue(('append', json.dumps(record, separators=(',', ':'))))
+
+    def compact(self, records: Iterable[dict]) -> None:
+        """Queue a rewrite of the journal so that it contains only the given records, followed by any records appended
+        after this call.
+        """
+        self._queue(('compact', [json.dumps(record, separators=(',', ':')) for record in records]))
+
+    def flush(self) -> None:
+        """Block until every queued record is written and synced to disk."""
+        with self._cond:
+            target = self._num_queued
+            self._num_flushing += 1
+            self._cond.notify_all()
+            while self._num_written < target and not self._stopped:
+                self._cond.wait()
+            self._num_flushing -= 1
+
+    def close(self) -> None:
+        """Write out everything queued, and stop the writer thread."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+
+    def _queue(self, op: tuple) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Journal {0} is closed.'.format(self.filename))
+            self._pending.append(op)
+            self._num_queued += 1
+            self._cond.notify_all()
+
+    def _write_loop(self) -> None:
+        try:
+            self._do_write_loop()
+        finally:
+            with self._cond:
+                self._stopped = True
+                self._cond.notify_all()
+
+    def _do_write_loop(self) -> None:
+        last_sync = 0.0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                # Let a burst of records gather, unless someone is waiting in flush()
+                deadline = last_sync + self.fsync_interval
+                while not self._closed and not self._num_flushing:
+                    wait = deadline - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                ops, self._pending = self._pending, []
+
+            try:
+                self._write(ops)
+            except OSError as e:
+                console.warning('Failed to write to journal {0}: {1}'.format(self.filename, e))
+            last_sync = time.monotonic()
+
+            with self._cond:
+                self._num_written += len(ops)
+                self._cond.notify_all()
+
+    def _write(self, ops: List[tuple]) -> None:
+        lines = []
+        for op, data in ops:
+            if op == 'append':
+                lines.append(data)
+            else:
+                # Everything before the compaction is superseded by it
+                self._file.close()
+                self._rewrite(data)
+                self._file = open(self.filename, 'a', encoding='utf-8')
+                self.num_compactions += 1
+                lines = []
+
+        if lines:
+            text = '\n'.join(lines) + '\n'
+            self._file.write(text)
+            self.bytes_written += len(text)
+            self.num_records += len(lines)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.num_syncs += 1
+
+    def _rewrite(self, lines: List[str]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as f:
+            for line in lines:
+                f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f.name, self.filename)
+        self.bytes_written += sum(len(line) + 1 for line in lines)
+        self.num_records += len(lines)
+
+
+def read(filename: str) -> List[dict]:
+    """Read the records in a journal file. A partly-written last record (from a crash) is ignored."""
+    records = []
+    if not os.path.exists(filename):
+        return records
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                console.warning('Ignoring unreadable record in journal {0}.'.format(filename))
+    return records
+
+
+def _truncate_torn_record(filename: str) -> None:
+    """Cut a partly-written last record off the file, so that new records don't get appended to it."""
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'rb+') as file:
+        data = file.read()
+        if data and not data.endswith(b'\n'):
+            file.truncate(data.rfind(b'\n') + 1)
+
+
+def open_journal(filename: str) -> List[dict]:
+    """Open the default journal, and return the records already in it."""
+    global _journal
+    records = read(filename)
+    _journal = Journal(filename)
+    return records
+
+
+def get_journal() -> Optional[Journal]:
+    """The default journal, or None if none has been opened."""
+    return _journal
+
+
+def close() -> None:
+    """Write out and close the default journal, if one is open."""
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
+
+class TestJournal(unittest.TestCase):
+    def test_append_and_compact(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'test.journal')
+            journal = Journal(filename, fsync_interval=0.01)
+            for idx in range(100):
+                journal.append({'n': idx})
+            journal.flush()
+            self.assertEqual(len(read(filename)), 100)
+            self.assertLess(journal.num_syncs, 100)
+
+            journal.append({'n': 100})
+            journal.compact([{'snapshot': True}])
+            journal.append({'n': 101})
+            journal.close()
+            self.assertEqual(read(filename), [{'snapshot': True}, {'n': 101}])
+
+    def test_torn_write(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'test.journal')
+            with open(filename, 'w') as file:
+                file.write('{"n":0}\n{"n":1}\n{"n":')
+            self.assertEqual(read(filename), [{'n': 0}, {'n': 1}])
+
+            journal = Journal(filename)
+            journal.append({'n': 2})
+            journal.close()
+            self.assertEqual(read(filename), [{'n': 0}, {'n': 1}, {'n': 2}])
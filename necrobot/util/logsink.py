@@ -0,0 +1,178 @@
+"""
+Rotating log files with compressed archives.
+
+A `RotatingLogSink` is a logging handler that writes to a single file, e.g. `logging/necrobot/discord.log`, and
+rotates it when it reaches a maximum size or age. The rotated file is renamed with a timestamp, then gzipped on a
+background thread; once it's compressed, the oldest archives in the directory are deleted until the directory's log
+files total at most the sink's retained-bytes limit.
+"""
+
+import datetime
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from typing import Optional
+
+_archive_queue = queue.Queue()              # type: queue.Queue
+_archive_thread = None                      # type: Optional[threading.Thread]
+_archive_thread_lock = threading.Lock()
+
+
+class RotatingLogSink(logging.handlers.BaseRotatingHandler):
+    def __init__(
+            self,
+            filename: str,
+            max_bytes: int = 0,
+            max_age: float = 0,
+            retain_bytes: int = 0,
+            encoding: str = 'utf-8'
+    ):
+        """
+        Parameters
+        ----------
+        filename: str
+            The log file. Its directory is created if necessary. Archives are written to the same directory.
+        max_bytes: int
+            Rotate the file before it would exceed this size. If 0, don't rotate by size.
+        max_age: float
+            Rotate the file after this many seconds. If 0, don't rotate by time.
+        retain_bytes: int
+            After archiving, delete the oldest archives in the directory until the log files in the directory total
+            at most this many bytes. If 0, keep all archives.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        logging.handlers.BaseRotatingHandler.__init__(self, filename, mode='a', encoding=encoding, delay=False)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retain_bytes = retain_bytes
+        self._rollover_at = time.time() + max_age
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        if self.max_age > 0 and time.time() >= self._rollover_at:
+            return True
+        if self.max_bytes > 0:
+            # max_bytes is a byte limit, so measure the encoded line
+            msg = '{0}\n'.format(self.format(record)).encode(self.encoding or 'utf-8')
+            self.stream.seek(0, 2)
+            if self.stream.tell() + len(msg) >= self.max_bytes:
+                return True
+        return False
+
+    def doRollover(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            archive_name = self._archive_name()
+            os.rename(self.baseFilename, archive_name)
+            _queue_archive(archive_name, self.retain_bytes)
+
+        self.stream = self._open()
+        self._rollover_at = time.time() + self.max_age
+
+    def _archive_name(self) -> str:
+        root, ext = os.path.splitext(self.baseFilename)
+        timestamp = datetime.datetime.utcnow().strftime('%Y-%m-%d-%H-%M-%S')
+        archive_name = '{0}-{1}{2}'.format(root, timestamp, ext)
+        dupe_number = 1
+        while os.path.exists(archive_name) or os.path.exists(archive_name + '.gz'):
+            archive_name = '{0}-{1}-{2}{3}'.format(root, timestamp, dupe_number, ext)
+            dupe_number += 1
+        return archive_name
+
+
+def wait_for_archives() -> None:
+    """Block until every rotated log file has been compressed, and old archives deleted."""
+    _archive_queue.join()
+
+
+def _queue_archive(filename: str, retain_bytes: int) -> None:
+    global _archive_thread
+    with _archive_thread_lock:
+        if _archive_thread is None or not _archive_thread.is_alive():
+            _archive_thread = threading.Thread(target=_archive_worker, name='logsink-archiver', daemon=True)
+            _archive_thread.start()
+    _archive_queue.put((filename, retain_bytes))
+
+
+def _archive_worker() -> None:
+    while True:
+        filename, retain_bytes = _archive_queue.get()
+        try:
+            _compress(filename)
+            if retain_bytes > 0:
+                _enforce_retention(os.path.dirname(filename), retain_bytes)
+        except OSError as e:
+            # Can't log this through logging, since we're downstream of its handlers
+            print('Failed to archive log file {0}: {1}'.format(filename, e), file=sys.stderr)
+        finally:
+            _archive_queue.task_done()
+
+
+def _compress(filename: str) -> None:
+    directory = os.path.dirname(filename)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as temp_file:
+        with open(filename, 'rb') as infile, gzip.GzipFile(fileobj=temp_file, mode='wb') as outfile:
+            shutil.copyfileobj(infile, outfile)
+    os.replace(temp_file.name, filename + '.gz')
+    os.remove(filename)
+
+
+def _enforce_retention(directory: str, retain_bytes: int) -> None:
+    files = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and (entry.name.endswith('.log') or entry.name.endswith('.log.gz')):
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.path, stat.st_size))
+
+    total_bytes = sum(size for _, _, size in files)
+    archives = sorted(f for f in files if f[1].endswith('.gz'))
+    for _, path, size in archives:
+        if total_bytes <= retain_bytes:
+            break
+        os.remove(path)
+        total_bytes -= size
+
+
+class TestRotatingLogSink(unittest.TestCase):
+    def test_rotate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sink = RotatingLogSink(os.path.join(directory, 'test.log'), max_bytes=200, retain_bytes=300)
+            sink.setFormatter(logging.Formatter('%(message)s'))
+            for idx in range(40):
+                sink.emit(logging.makeLogRecord({'msg': 'Line {0:03} with some padding text'.format(idx)}))
+            sink.close()
+            wait_for_archives()
+
+            names = os.listdir(directory)
+            archives = [name for name in names if name.endswith('.log.gz')]
+            self.assertIn('test.log', names)
+            self.assertTrue(archives)
+            self.assertFalse([name for name in names if name.endswith('.tmp')])
+            self.assertLessEqual(sum(os.path.getsize(os.path.join(directory, name)) for name in archives), 300)
+            self.assertLess(os.path.getsize(os.path.join(directory, 'test.log')), 200)
+
+            with gzip.open(os.path.join(directory, sorted(archives)[-1]), 'rt') as archive:
+                self.assertTrue(archive.readline().startswith('Line'))
+
+    def test_rotate_non_ascii(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sink = RotatingLogSink(os.path.join(directory, 'test.log'), max_bytes=200)
+            sink.setFormatter(logging.Formatter('%(message)s'))
+            for idx in range(20):
+                sink.emit(logging.makeLogRecord({'msg': 'Línea {0:03} — ñandú'.format(idx)}))
+            sink.close()
+            wait_for_archives()
+            self.assertLess(os.path.getsize(os.path.join(directory, 'test.log')), 200)
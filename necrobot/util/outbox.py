@@ -0,0 +1,256 @@
+"""
+Per-channel outbound message queues, so that rooms don't wait on Discord to post their race and match updates.
+
+`write()` queues a line of text for a channel and returns at once; each channel's queue is sent by its own task.
+Lines that arrive within Config.OUTBOX_BATCH_MS of the first line of a batch are merged into one message (up to
+Discord's message length limit), so that e.g. a burst of "X is ready" lines costs one send instead of hitting the
+channel's rate limit. Urgent lines (countdown numbers and "GO!") go in a priority lane: each is sent on its own, as
+soon as any send already in flight finishes, ahead of the batch.
+
+Call `flush_all()` to send everything queued now, e.g. on shutdown.
+"""
+
+import asyncio
+import collections
+import time
+import unittest
+from typing import Dict, List, Optional
+
+import discord
+
+from necrobot.config import Config
+from necrobot.util import console
+
+MAX_MESSAGE_LENGTH = 2000
+
+
+class OutboxStats(object):
+    def __init__(self):
+        self.lines = 0              # Lines queued
+        self.urgent = 0             # Lines queued in the priority lane
+        self.messages = 0           # Messages sent
+        self.merged = 0             # Lines that went out as part of another line's message
+        self.failed = 0             # Messages that failed to send
+
+
+class Outbox(object):
+    def __init__(self, channel: discord.TextChannel, window: Optional[float] = None, stats: OutboxStats = None):
+        """
+        Parameters
+        ----------
+        channel: discord.TextChannel
+            The channel to send to.
+        window: Optional[float]
+            The number of seconds to wait for more lines to merge into a message. If None, Config.OUTBOX_BATCH_MS.
+        stats: OutboxStats
+            The statistics to add to. If None, this Outbox's own.
+        """
+        self.channel = channel
+        self._window = window
+        self.stats = stats if stats is not None else OutboxStats()
+
+        self._urgent = collections.deque()      # type: collections.deque
+        self._lines = collections.deque()       # type: collections.deque
+        self._batch_start = 0.0                 # When the first line of the current batch was queued
+        self._wakeup = asyncio.Event()
+        self._num_flushing = 0
+        self._sender = None                     # type: Optional[asyncio.Task]
+
+    def __len__(self):
+        return len(self._urgent) + len(self._lines)
+
+    @property
+    def window(self) -> float:
+        return self._window if self._window is not None else Config.OUTBOX_BATCH_MS / 1000
+
+    @property
+    def idle(self) -> bool:
+        return not self and (self._sender is None or self._sender.done())
+
+    def write(self, text: str, urgent: bool = False) -> None:
+        """Queue a line of text to be sent."""
+        self.stats.lines += 1
+        if urgent:
+            self.stats.urgent += 1
+            self._urgent.append(text)
+            self._wakeup.set()
+        else:
+            if not self._lines:
+                self._batch_start = time.monotonic()
+            self._lines.append(text)
+
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.ensure_future(self._send_loop())
+
+    async def flush(self) -> None:
+        """Send everything queued without waiting out the batching window, and wait until it's sent."""
+        self._num_flushing += 1
+        self._wakeup.set()
+        try:
+            while self._sender is not None and not self._sender.done():
+                await asyncio.wait([self._sender])
+        finally:
+            self._num_flushing -= 1
+
+    def close(self) -> None:
+        """Drop everything queued, and stop sending."""
+        self._urgent.clear()
+        self._lines.clear()
+        if self._sender is not None:
+            self._sender.cancel()
+
+    async def _send_loop(self) -> None:
+        while self._urgent or self._lines:
+            if self._urgent:
+                await self._send(self._urgent.popleft(), num_lines=1)
+                continue
+
+            # Give more lines a chance to arrive, unless something urgent (or a flush) comes first
+            wait = self._batch_start + self.window - time.monotonic()
+            if wait > 0 and not self._num_flushing:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch = [self._lines.popleft()]
+            length = len(batch[0])
+            while self._lines and length + 1 + len(self._lines[0]) <= MAX_MESSAGE_LENGTH:
+                length += 1 + len(self._lines[0])
+                batch.append(self._lines.popleft())
+            await self._send('\n'.join(batch), num_lines=len(batch))
+
+    async def _send(self, text: str, num_lines: int) -> None:
+        try:
+            await self.channel.send(text)
+            self.stats.messages += 1
+            self.stats.merged += num_lines - 1
+        except discord.HTTPException as e:
+            self.stats.failed += 1
+            console.warning('Failed to send a message to channel {0}: {1}'.format(self.channel.id, e))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Anything else (e.g. a connection error from the HTTP layer) mustn't stop the rest of the queue draining
+            self.stats.failed += 1
+            console.error('Error sending a message to channel {0}: {1}'.format(self.channel.id, e))
+
+
+_outboxes = dict()      # type: Dict[int, Outbox]
+_stats = OutboxStats()
+
+
+def write(channel: discord.TextChannel, text: str, urgent: bool = False) -> None:
+    """Queue a line of text to be sent to the channel. See Outbox.write."""
+    outbox = _outboxes.get(channel.id)
+    if outbox is None:
+        # Forget the channels with nothing left to send, so that deleted channels don't pile up
+        _drop_idle_outboxes()
+        outbox = Outbox(channel, stats=_stats)
+        _outboxes[channel.id] = outbox
+    outbox.channel = channel
+    outbox.write(text, urgent=urgent)
+
+
+async def flush_all() -> None:
+    """Send everything queued for every channel now, and wait until it's sent."""
+    for outbox in list(_outboxes.values()):
+        await outbox.flush()
+    _drop_idle_outboxes()
+
+
+def close(channel: discord.TextChannel) -> None:
+    """Drop everything queued for the channel, e.g. because it's about to be deleted."""
+    outbox = _outboxes.pop(channel.id, None)
+    if outbox is not None:
+        outbox.close()
+
+
+def get_outboxes() -> List[Outbox]:
+    return list(_outboxes.values())
+
+
+def get_stats() -> OutboxStats:
+    return _stats
+
+
+def _drop_idle_outboxes() -> None:
+    for channel_id in [channel_id for channel_id, outbox in _outboxes.items() if outbox.idle]:
+        del _outboxes[channel_id]
+
+
+class TestOutbox(unittest.TestCase):
+    class Channel(object):
+        def __init__(self, delay: float = 0):
+            self.id = 1
+            self.delay = delay
+            self.messages = []
+
+        async def send(self, text: str):
+            await asyncio.sleep(self.delay)
+            self.messages.append(text)
+
+    def test_batch(self):
+        channel = TestOutbox.Channel()
+
+        async def run():
+            outbox = Outbox(channel, window=0.05)
+            for idx in range(5):
+                outbox.write('line {0}'.format(idx))
+            outbox.write('x' * (MAX_MESSAGE_LENGTH - 10))
+            self.assertEqual(channel.messages, [])
+            await asyncio.sleep(0.1)
+            self.assertEqual(outbox.stats.messages, 2)
+            self.assertEqual(outbox.stats.merged, 4)
+
+            outbox.write('late')
+            await outbox.flush()
+            self.assertTrue(outbox.idle)
+
+        asyncio.run(run())
+        self.assertEqual(channel.messages, [
+            'line 0\nline 1\nline 2\nline 3\nline 4',
+            'x' * (MAX_MESSAGE_LENGTH - 10),
+            'late'
+        ])
+
+    def test_send_error(self):
+        class FlakyChannel(TestOutbox.Channel):
+            async def send(self, text: str):
+                if text == 'bad':
+                    raise asyncio.TimeoutError()
+                await TestOutbox.Channel.send(self, text)
+
+        channel = FlakyChannel()
+
+        async def run():
+            outbox = Outbox(channel, window=0.01)
+            outbox.write('bad', urgent=True)
+            outbox.write('good', urgent=True)
+            await outbox.flush()
+            self.assertEqual(outbox.stats.failed, 1)
+
+        asyncio.run(run())
+        self.assertEqual(channel.messages, ['good'])
+
+    def test_priority(self):
+        channel = TestOutbox.Channel(delay=0.02)
+
+        async def run():
+            outbox = Outbox(channel, window=0.2)
+            outbox.write('a is ready')
+            outbox.write('3', urgent=True)
+            await asyncio.sleep(0.01)
+            outbox.write('b is ready')
+            outbox.write('2', urgent=True)
+            outbox.write('1', urgent=True)
+            start = time.monotonic()
+            while len(channel.messages) < 3:
+                await asyncio.sleep(0.01)
+            self.assertLess(time.monotonic() - start, 0.15)
+            await outbox.flush()
+
+        asyncio.run(run())
+        self.assertEqual(channel.messages, ['3', '2', '1', 'a is ready\nb is ready'])
@@ -5,7 +5,9 @@ discord.py.
 
 import discord
 import discord.http
-from typing import List, Optional, Union
+import types
+import unittest
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from necrobot.config import Config
 
 
@@ -13,15 +15,132 @@ client = None           # type: Optional[discord.Client]
 guild = None           # type: Optional[discord.Guild]
 admin_roles = list()    # type: List[discord.Role]
 
+# Indexes of the guild's members, channels and roles by lowercase name, built on first use and kept current by the
+# gateway event handlers below (see Necrobot.ready_client_events). Lookups by ID use discord.py's own dicts.
+_indexed_guild = None   # type: Optional[discord.Guild]
+_admin_role_ids = set()  # type: Set[int]
+
+
+class NameIndex(object):
+    """A map from lowercase names to the objects (anything with an id) having that name, in the order they were
+    added. An object may be indexed under several names.
+    """
+    def __init__(self):
+        self._by_name = dict()      # type: Dict[str, Dict[int, Any]]
+        self._names_by_id = dict()  # type: Dict[int, Tuple[str, ...]]
+
+    def add(self, obj, *names: str) -> None:
+        """Index obj under the given names, replacing any names it was indexed under before."""
+        self.remove(obj.id)
+        names = tuple(set(name.lower() for name in names if name is not None))
+        self._names_by_id[obj.id] = names
+        for name in names:
+            self._by_name.setdefault(name, dict())[obj.id] = obj
+
+    def remove(self, obj_id: int) -> None:
+        for name in self._names_by_id.pop(obj_id, ()):
+            objs = self._by_name[name]
+            del objs[obj_id]
+            if not objs:
+                del self._by_name[name]
+
+    def find(self, name: str) -> Optional[Any]:
+        """The first object indexed under the name, if any"""
+        objs = self._by_name.get(name.lower())
+        return next(iter(objs.values())) if objs else None
+
+    def find_all(self, name: str) -> List[Any]:
+        """All objects indexed under the name"""
+        return list(self._by_name.get(name.lower(), dict()).values())
+
+
+_members_by_name = NameIndex()          # by display name and username
+_members_by_display_name = NameIndex()
+_channels_by_name = NameIndex()
+_roles_by_name = NameIndex()
+
 
 def init(client_: discord.Client, guild_: discord.Guild) -> None:
-    global client, guild, admin_roles
+    global client, guild, admin_roles, _admin_role_ids
     client = client_
     guild = guild_
+    admin_roles = list()
     for rolename in Config.ADMIN_ROLE_NAMES:
         for role in guild.roles:
             if role.name == rolename:
                 admin_roles.append(role)
+    _admin_role_ids = set(role.id for role in admin_roles)
+    _build_indexes()
+
+
+def _build_indexes() -> None:
+    global _indexed_guild, _members_by_name, _members_by_display_name, _channels_by_name, _roles_by_name
+    _members_by_name = NameIndex()
+    _members_by_display_name = NameIndex()
+    _channels_by_name = NameIndex()
+    _roles_by_name = NameIndex()
+    _indexed_guild = guild
+    for member in guild.members:
+        index_member(member)
+    for channel in guild.channels:
+        index_channel(channel)
+    for role in guild.roles:
+        index_role(role)
+
+
+def _check_indexes() -> None:
+    if _indexed_guild is not guild:
+        _build_indexes()
+
+
+def _in_guild(obj) -> bool:
+    return guild is not None and _indexed_guild is guild and obj.guild.id == guild.id
+
+
+def index_member(member: discord.Member) -> None:
+    """Add or update the member in the name indexes. Call when a member joins or changes their name or nick."""
+    if _in_guild(member):
+        _members_by_name.add(member, member.display_name, member.name)
+        _members_by_display_name.add(member, member.display_name)
+
+
+def unindex_member(member: discord.Member) -> None:
+    """Remove the member from the name indexes. Call when a member leaves."""
+    if _in_guild(member):
+        _members_by_name.remove(member.id)
+        _members_by_display_name.remove(member.id)
+
+
+def index_user(user: discord.User) -> None:
+    """Update the name indexes for the user's member on the server, if any. Call when a user changes their name."""
+    if guild is not None and _indexed_guild is guild:
+        member = guild.get_member(user.id)
+        if member is not None:
+            index_member(member)
+
+
+def index_channel(channel: discord.abc.GuildChannel) -> None:
+    """Add or update the channel in the name index. Call when a channel is created or renamed."""
+    if _in_guild(channel):
+        _channels_by_name.add(channel, channel.name)
+
+
+def unindex_channel(channel: discord.abc.GuildChannel) -> None:
+    """Remove the channel from the name index. Call when a channel is deleted."""
+    if _in_guild(channel):
+        _channels_by_name.remove(channel.id)
+
+
+def index_role(role: discord.Role) -> None:
+    """Add or update the role in the name index. Call when a role is created or renamed."""
+    if _in_guild(role):
+        _roles_by_name.add(role, role.name)
+
+
+def unindex_role(role: discord.Role) -> None:
+    """Remove the role from the name index. Call when a role is deleted."""
+    if _in_guild(role):
+        _roles_by_name.remove(role.id)
 
 
 def find_admin(ignore: Optional[List[str]] = None) -> Optional[discord.Member]:
@@ -32,49 +151,43 @@ def find_admin(ignore: Optional[List[str]] = None) -> Optional[discord.Member]:
     for member in guild.members:
         if member.display_name in ignore or member.id == client.user.id:
             continue
-        for role in member.roles:
-            if role in admin_roles:
-                return member
+        if is_admin(member):
+            return member
     return None
 
 
 def find_channel(channel_name: str = None, channel_id: Union[str, int] = None) -> Optional[discord.TextChannel]:
     """Returns a channel with the given name on the server, if any"""
     if channel_id is not None:
-        for channel in guild.channels:
-            if int(channel.id) == int(channel_id):
-                return channel
+        return guild.get_channel(int(channel_id))
     elif channel_name is not None:
-        for channel in guild.channels:
-            if channel.name.lower() == channel_name.lower():
-                return channel
+        _check_indexes()
+        return _channels_by_name.find(channel_name)
     return None
 
 
 def find_category(channel_name: str = None) -> Optional[discord.CategoryChannel]:
     """Returns a channel with the given name on the server, if any"""
-    for channel in guild.categories:
-        if channel.name.lower() == channel_name.lower():
-            return channel
-    return None
+    found_channels = find_all_categories(channel_name)
+    return found_channels[0] if found_channels else None
 
 
 def find_all_channels(channel_name: str) -> List[discord.TextChannel]:
     """Returns all channels with the given name on the server"""
-    found_channels = []
-    for channel in guild.text_channels:
-        if channel.name.lower() == channel_name.lower():
-            found_channels.append(channel)
-    return found_channels
+    _check_indexes()
+    return [
+        channel for channel in _channels_by_name.find_all(channel_name)
+        if isinstance(channel, discord.TextChannel)
+    ]
 
 
 def find_all_categories(channel_name: str) -> List[discord.CategoryChannel]:
     """Returns all channels with the given name on the server"""
-    found_channels = []
-    for channel in guild.categories:
-        if channel.name.lower() == channel_name.lower():
-            found_channels.append(channel)
-    return found_channels
+    _check_indexes()
+    return [
+        channel for channel in _channels_by_name.find_all(channel_name)
+        if isinstance(channel, discord.CategoryChannel)
+    ]
 
 
 def find_member(discord_name: str = None, discord_id: Union[str, int] = None) -> Optional[discord.Member]:
@@ -83,40 +196,30 @@ def find_member(discord_name: str = None, discord_id: Union[str, int] = None) ->
         return None
 
     if discord_id is not None:
-        for member in guild.members:
-            if int(member.id) == int(discord_id):
-                return member
+        member = guild.get_member(int(discord_id))
+        if member is not None:
+            return member
 
     if discord_name is not None:
-        for member in guild.members:
-            if member.display_name.lower() == discord_name.lower() \
-                    or member.name.lower() == discord_name.lower():
-                return member
+        _check_indexes()
+        return _members_by_name.find(discord_name)
 
 
 def find_members(username: str) -> List[discord.Member]:
     """Returns a list of all members with a given username (capitalization ignored)"""
-    to_return = []
-    for member in guild.members:
-        if member.display_name.lower() == username.lower():
-            to_return.append(member)
-    return to_return
+    _check_indexes()
+    return _members_by_display_name.find_all(username)
 
 
 def find_role(role_name: str) -> Optional[discord.Role]:
     """Finds a discord.Role with the given name, if any"""
-    for role in guild.roles:
-        if role.name.lower() == role_name.lower():
-            return role
-    return None
+    _check_indexes()
+    return _roles_by_name.find(role_name)
 
 
 def get_as_member(user: discord.User) -> Optional[discord.Member]:
     """Returns the given Discord user as a member of the server"""
-    for member in guild.members:
-        if member.id == user.id:
-            return member
-    return None
+    return guild.get_member(user.id)
 
 
 def is_admin(user: Union[discord.User, discord.Member]) -> bool:
@@ -127,7 +230,7 @@ def is_admin(user: Union[discord.User, discord.Member]) -> bool:
         member = user                   # type: discord.Member
 
     for role in member.roles:
-        if role in admin_roles:
+        if role.id in _admin_role_ids:
             return True
     return False
 
@@ -138,3 +241,48 @@ async def set_channel_category(channel: discord.TextChannel, category: discord.C
 
 async def create_channel_category(name: str) -> discord.CategoryChannel:
     return await guild.create_category(name=name)
+
+
+class TestServerIndexes(unittest.TestCase):
+    def setUp(self):
+        global guild
+        self._old_guild = guild
+        self.guild = types.SimpleNamespace(id=1, members=[], channels=[], roles=[])
+        self.guild.get_member = lambda member_id: next((m for m in self.guild.members if m.id == member_id), None)
+        self.alice = self._make_member(10, 'alice', 'Ally')
+        self.bob = self._make_member(11, 'bob', 'ALLY')
+        self.guild.members.extend([self.alice, self.bob])
+        self.guild.roles.append(types.SimpleNamespace(id=20, name='Racers', guild=self.guild))
+        guild = self.guild
+
+    def tearDown(self):
+        global guild
+        guild = self._old_guild
+
+    def _make_member(self, member_id: int, name: str, display_name: str):
+        return types.SimpleNamespace(id=member_id, name=name, display_name=display_name, guild=self.guild)
+
+    def test_find(self):
+        self.assertIs(find_member(discord_name='ALICE'), self.alice)
+        self.assertIs(find_member(discord_name='ally'), self.alice)
+        self.assertIs(find_member(discord_id='11'), self.bob)
+        self.assertEqual(find_members('ally'), [self.alice, self.bob])
+        self.assertEqual(find_role('racers').id, 20)
+        self.assertIsNone(find_role('admin'))
+
+    def test_update(self):
+        find_member(discord_name='alice')
+        self.alice.display_name = 'Alice'
+        index_member(self.alice)
+        self.assertEqual(find_members('ally'), [self.bob])
+
+        carol = self._make_member(12, 'carol', 'carol')
+        self.guild.members.append(carol)
+        index_member(carol)
+        self.assertIs(find_member(discord_name='Carol'), carol)
+        unindex_member(carol)
+        self.assertIsNone(find_member(discord_name='carol'))
+
+        # Events from other guilds are ignored
+        index_member(types.SimpleNamespace(id=13, name='dave', display_name='dave', guild=types.SimpleNamespace(id=2)))
+        self.assertIsNone(find_member(discord_name='dave'))
@@ -0,0 +1,321 @@
+"""
+A hierarchical timer wheel: one scheduler for all of the bot's timers (room cleanup checks, match alerts, race
+countdowns and finalization, dailies), in place of a task sleeping for each of them.
+
+Timers are kept in NUM_LEVELS levels of NUM_SLOTS slots. A level-0 slot holds the timers due in one tick (TICK
+seconds); each slot of a higher level covers NUM_SLOTS times as many ticks as a slot of the level below, and its timers
+are moved down when the wheel reaches it. The wheel runs from a single event-loop callback, scheduled for the next
+tick that has anything to do: timers due in the same tick fire in one wakeup, and an idle wheel doesn't wake at all.
+
+Use `schedule()` to call a function (or start a coroutine) after a delay, and keep the returned TimerHandle to cancel
+it; or `await sleep()` from a coroutine.
+"""
+
+import asyncio
+import time
+import unittest
+from typing import Callable, List, Optional
+
+from necrobot.util import console
+
+TICK = 0.1
+SLOT_BITS = 6
+NUM_SLOTS = 1 << SLOT_BITS
+NUM_LEVELS = 4
+_MAX_TICKS = NUM_SLOTS ** NUM_LEVELS - 1
+
+
+class TimerHandle(object):
+    __slots__ = ('name', 'deadline', '_expiry', '_callback', '_args', '_slot', '_state')
+
+    _PENDING = 0
+    _FIRED = 1
+    _CANCELED = 2
+
+    def __init__(self, name: str, deadline: float, expiry: int, callback: Callable, args: tuple):
+        self.name = name
+        self.deadline = deadline        # System clock time the timer is due
+        self._expiry = expiry           # The wheel tick the timer is due
+        self._callback = callback
+        self._args = args
+        self._slot = None               # The wheel slot (a set) the timer is in
+        self._state = TimerHandle._PENDING
+
+    def __repr__(self):
+        return 'TimerHandle({0}, in {1:.1f}s)'.format(self.name, self.time_remaining)
+
+    @property
+    def pending(self) -> bool:
+        return self._state == TimerHandle._PENDING
+
+    @property
+    def time_remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def cancel(self) -> bool:
+        """Cancel the timer. Returns False if it has already fired or been canceled."""
+        if self._state != TimerHandle._PENDING:
+            return False
+        self._state = TimerHandle._CANCELED
+        if self._slot is not None:
+            self._slot.discard(self)
+            self._slot = None
+        return True
+
+
+class TimerWheel(object):
+    def __init__(self, tick: float = TICK):
+        self._tick = tick
+        self._epoch = time.monotonic()
+        self._current = 0                               # The last tick processed
+        self._slots = [[set() for _ in range(NUM_SLOTS)] for _ in range(NUM_LEVELS)]
+        self._wakeup = None                             # type: Optional[asyncio.TimerHandle]
+        self._wakeup_tick = None                        # type: Optional[int]
+
+        self.num_scheduled = 0
+        self.num_fired = 0
+        self.num_errors = 0
+        self.num_wakeups = 0
+
+    def __len__(self):
+        return sum(len(slot) for level in self._slots for slot in level)
+
+    def schedule(self, delay: float, callback: Callable, *args, name: str = None) -> TimerHandle:
+        """Call callback(*args) after delay seconds (rounded up to the next tick). If the callback returns a
+        coroutine, it is run as a task.
+
+        Parameters
+        ----------
+        delay: float
+            The number of seconds to wait.
+        callback: Callable
+            The function to call.
+        name: str
+            A name for the timer, for introspection. If None, the callback's name.
+
+        Returns
+        -------
+        TimerHandle
+            A handle with which to cancel the timer.
+        """
+        now = time.monotonic()
+        if not len(self):
+            # Nothing to process in between, so skip ahead
+            self._current = max(self._current, self._tick_at(now))
+
+        deadline = now + max(delay, 0.0)
+        expiry = max(int(-(-(deadline - self._epoch) // self._tick)), self._current + 1)
+        handle = TimerHandle(
+            name=name if name is not None else getattr(callback, '__qualname__', repr(callback)),
+            deadline=deadline,
+            expiry=expiry,
+            callback=callback,
+            args=args
+        )
+        self._place(handle)
+        self.num_scheduled += 1
+        self._schedule_wakeup()
+        return handle
+
+    async def sleep(self, delay: float, name: str = 'sleep') -> None:
+        """Sleep for delay seconds (rounded up to the next tick)."""
+        future = asyncio.get_event_loop().create_future()
+        handle = self.schedule(delay, _resolve, future, name=name)
+        try:
+            await future
+        finally:
+            handle.cancel()
+
+    def pending(self) -> List[TimerHandle]:
+        """Every pending timer, soonest first."""
+        return sorted(
+            (handle for level in self._slots for slot in level for handle in slot),
+            key=lambda h: h.deadline
+        )
+
+    def _tick_at(self, monotonic_time: float) -> int:
+        return int((monotonic_time - self._epoch) // self._tick)
+
+    def _place(self, handle: TimerHandle) -> None:
+        expiry = min(handle._expiry, self._current + _MAX_TICKS)
+        delta = expiry - self._current
+        level = 0
+        while level < NUM_LEVELS - 1 and delta >= NUM_SLOTS ** (level + 1):
+            level += 1
+        slot = self._slots[level][(expiry >> (SLOT_BITS * level)) & (NUM_SLOTS - 1)]
+        slot.add(handle)
+        handle._slot = slot
+
+    def _next_event_tick(self) -> Optional[int]:
+        """The next tick at which a nonempty slot is reached, or None if the wheel is empty."""
+        best = None
+        for level in range(NUM_LEVELS):
+            width = NUM_SLOTS ** level
+            base = self._current // width
+            for offset in range(1, NUM_SLOTS + 1):
+                if self._slots[level][(base + offset) & (NUM_SLOTS - 1)]:
+                    boundary = (base + offset) * width
+                    if best is None or boundary < best:
+                        best = boundary
+                    break
+        return best
+
+    def _schedule_wakeup(self) -> None:
+        next_tick = self._next_event_tick()
+        if next_tick == self._wakeup_tick:
+            return
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        self._wakeup_tick = next_tick
+        if next_tick is not None:
+            delay = self._epoch + next_tick * self._tick - time.monotonic()
+            self._wakeup = asyncio.get_event_loop().call_later(max(delay, 0), self._run)
+
+    def _run(self) -> None:
+        self._wakeup = None
+        self._wakeup_tick = None
+        self.num_wakeups += 1
+
+        # The event loop may call this a hair early
+        now_tick = self._tick_at(time.monotonic() + 0.001)
+        next_tick = self._next_event_tick()
+        while next_tick is not None and next_tick <= now_tick:
+            self._process_tick(next_tick)
+            next_tick = self._next_event_tick()
+        self._current = max(self._current, now_tick)
+        self._schedule_wakeup()
+
+    def _process_tick(self, tick: int) -> None:
+        self._current = tick
+
+        # Move timers down from each higher-level slot reached at this tick
+        for level in range(NUM_LEVELS - 1, 0, -1):
+            if tick % (NUM_SLOTS ** level) == 0:
+                slot = self._slots[level][(tick >> (SLOT_BITS * level)) & (NUM_SLOTS - 1)]
+                handles = list(slot)
+                slot.clear()
+                for handle in handles:
+                    self._place(handle)
+
+        slot = self._slots[0][tick & (NUM_SLOTS - 1)]
+        handles = sorted(slot, key=lambda h: h.deadline)
+        slot.clear()
+        for handle in handles:
+            if handle._expiry > tick:
+                self._place(handle)
+            else:
+                self._fire(handle)
+
+    def _fire(self, handle: TimerHandle) -> None:
+        handle._slot = None
+        handle._state = TimerHandle._FIRED
+        self.num_fired += 1
+        try:
+            result = handle._callback(*handle._args)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(self._await_callback(handle, result))
+        except Exception as e:
+            self.num_errors += 1
+            console.error('Error in timer {0}: {1}'.format(handle.name, e))
+
+    async def _await_callback(self, handle: TimerHandle, coro) -> None:
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.num_errors += 1
+            console.error('Error in timer {0}: {1}'.format(handle.name, e))
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_wheel = TimerWheel()
+
+
+def schedule(delay: float, callback: Callable, *args, name: str = None) -> TimerHandle:
+    """Call callback(*args) after delay seconds, on the default timer wheel. See TimerWheel.schedule."""
+    return _wheel.schedule(delay, callback, *args, name=name)
+
+
+async def sleep(delay: float, name: str = 'sleep') -> None:
+    """Sleep for delay seconds, on the default timer wheel."""
+    await _wheel.sleep(delay, name=name)
+
+
+def get_wheel() -> TimerWheel:
+    return _wheel
+
+
+class TestTimerWheel(unittest.TestCase):
+    def test_order_and_cancel(self):
+        fired = []
+
+        async def run():
+            wheel = TimerWheel(tick=0.01)
+            for delay in [0.25, 0.05, 0.9, 0.05, 0.3]:
+                wheel.schedule(delay, lambda d=delay: fired.append(d), name='t{0}'.format(delay))
+            canceled = wheel.schedule(0.2, fired.append, 'canceled')
+            self.assertEqual(len(wheel), 6)
+            self.assertTrue(canceled.cancel())
+            self.assertFalse(canceled.cancel())
+
+            await wheel.sleep(0.4)
+            self.assertEqual(fired, [0.05, 0.05, 0.25, 0.3])
+            self.assertEqual([h.name for h in wheel.pending()], ['t0.9'])
+            await asyncio.sleep(0.6)
+
+        asyncio.run(run())
+        self.assertEqual(fired, [0.05, 0.05, 0.25, 0.3, 0.9])
+
+    def test_coalesce(self):
+        fired = []
+
+        async def run():
+            wheel = TimerWheel(tick=0.05)
+            for idx in range(10):
+                wheel.schedule(0.1 + idx / 1000, fired.append, idx)
+            await asyncio.sleep(0.3)
+            # Timers due in the same tick fire in one wakeup
+            self.assertEqual(wheel.num_wakeups, 1)
+
+        asyncio.run(run())
+        self.assertEqual(fired, list(range(10)))
+
+    def test_levels(self):
+        wheel = TimerWheel(tick=1)
+        expiries = [1, 63, 64, 65, 4095, 4096, 4097, 300000, _MAX_TICKS + 5000]
+        handles = []
+        for expiry in expiries:
+            handle = TimerHandle('t', 0, expiry, _resolve, ())
+            wheel._place(handle)
+            handles.append(handle)
+
+        # Step the wheel by hand, and check each timer comes out of level 0 at its tick
+        fired = []
+        wheel._fire = lambda h: fired.append((wheel._current, h._expiry))
+        next_tick = wheel._next_event_tick()
+        while next_tick is not None:
+            wheel._process_tick(next_tick)
+            next_tick = wheel._next_event_tick()
+        self.assertEqual(fired, [(expiry, expiry) for expiry in expiries])
+
+    def test_coroutine_callback(self):
+        results = []
+
+        async def callback(value):
+            results.append(value)
+            raise RuntimeError('error in callback')
+
+        async def run():
+            wheel = TimerWheel(tick=0.01)
+            wheel.schedule(0.02, callback, 'ok')
+            await asyncio.sleep(0.1)
+            self.assertEqual(wheel.num_errors, 1)
+
+        asyncio.run(run())
+        self.assertEqual(results, ['ok'])
@@ -0,0 +1,220 @@
+"""
+Debounced, rate-limited channel topic edits (e.g. a RaceRoom's leaderboard).
+
+Discord allows only a couple of edits to a channel's topic every ten minutes, and discord.py waits out a 429 inside
+the call to `edit`, so editing the topic on every race event leaves race processing waiting on edits that land
+minutes late. Instead, `set_topic()` only records the latest topic wanted for the channel and returns. The edit is
+made from a timer on the timer wheel, Config.TOPIC_DEBOUNCE_MS after the first change of a burst, or once the
+channel's edit bucket (Config.TOPIC_EDITS_PER_PERIOD edits per Config.TOPIC_EDIT_PERIOD_SEC) has room; any topics
+set in the meantime are replaced by the newest one, and counted as coalesced.
+"""
+
+import asyncio
+import collections
+import time
+import unittest
+from typing import Dict, Optional
+
+import discord
+
+from necrobot.config import Config
+from necrobot.util import console
+from necrobot.util import timerwheel
+
+
+class _ChannelTopic(object):
+    def __init__(self, channel):
+        self.channel = channel
+        self.wanted = None                  # type: Optional[str]
+        self.current = None                 # type: Optional[str]
+        self.timer = None                   # type: Optional[timerwheel.TimerHandle]
+        self.editing = False
+        self.edit_times = collections.deque()   # type: collections.deque
+
+
+class TopicUpdater(object):
+    def __init__(
+            self,
+            debounce: Optional[float] = None,
+            edits_per_period: Optional[int] = None,
+            period: Optional[float] = None,
+            wheel: Optional[timerwheel.TimerWheel] = None
+    ):
+        """
+        Parameters
+        ----------
+        debounce: Optional[float]
+            The number of seconds to wait for more changes before editing. If None, Config.TOPIC_DEBOUNCE_MS.
+        edits_per_period: Optional[int]
+            The number of edits allowed per channel per period. If None, Config.TOPIC_EDITS_PER_PERIOD.
+        period: Optional[float]
+            The rate-limit window, in seconds. If None, Config.TOPIC_EDIT_PERIOD_SEC.
+        wheel: Optional[TimerWheel]
+            The timer wheel to schedule edits on. If None, the default wheel.
+        """
+        self._debounce = debounce
+        self._edits_per_period = edits_per_period
+        self._period = period
+        self._wheel = wheel if wheel is not None else timerwheel.get_wheel()
+        self._channels = dict()             # type: Dict[int, _ChannelTopic]
+
+        self.num_requested = 0
+        self.num_edits = 0
+        self.num_coalesced = 0
+        self.num_unchanged = 0
+        self.num_failed = 0
+
+    def __len__(self):
+        """The number of channels with a topic edit waiting."""
+        return sum(1 for state in self._channels.values() if state.wanted is not None)
+
+    @property
+    def debounce(self) -> float:
+        return self._debounce if self._debounce is not None else Config.TOPIC_DEBOUNCE_MS / 1000
+
+    @property
+    def edits_per_period(self) -> int:
+        return self._edits_per_period if self._edits_per_period is not None else Config.TOPIC_EDITS_PER_PERIOD
+
+    @property
+    def period(self) -> float:
+        return self._period if self._period is not None else Config.TOPIC_EDIT_PERIOD_SEC
+
+    def set_topic(self, channel: discord.TextChannel, topic: str) -> None:
+        """Have the channel's topic edited to the given topic, soon. Replaces any topic set for the channel that
+        hasn't been written yet.
+        """
+        state = self._channels.get(channel.id)
+        if state is None:
+            state = _ChannelTopic(channel)
+            self._channels[channel.id] = state
+        state.channel = channel
+
+        self.num_requested += 1
+        if state.wanted is not None:
+            self.num_coalesced += 1
+        state.wanted = topic
+        if state.timer is None and not state.editing:
+            self._schedule(state, self.debounce)
+
+    def cancel(self, channel: discord.TextChannel) -> None:
+        """Drop any topic edit waiting for the channel, e.g. because it's about to be deleted."""
+        state = self._channels.pop(channel.id, None)
+        if state is not None and state.timer is not None:
+            state.timer.cancel()
+
+    def _bucket_wait(self, state: _ChannelTopic) -> float:
+        """The number of seconds until the channel's edit bucket has room."""
+        now = time.monotonic()
+        while state.edit_times and state.edit_times[0] <= now - self.period:
+            state.edit_times.popleft()
+        if len(state.edit_times) < self.edits_per_period:
+            return 0.0
+        return state.edit_times[0] + self.period - now
+
+    def _schedule(self, state: _ChannelTopic, delay: float) -> None:
+        state.timer = self._wheel.schedule(
+            max(delay, self._bucket_wait(state)), self._edit, state, name='topic-edit'
+        )
+
+    async def _edit(self, state: _ChannelTopic) -> None:
+        state.timer = None
+        if state.wanted is None:
+            return
+        if state.wanted == state.current:
+            self.num_unchanged += 1
+            state.wanted = None
+            return
+
+        bucket_wait = self._bucket_wait(state)
+        if bucket_wait > 0:
+            self._schedule(state, bucket_wait)
+            return
+
+        topic = state.wanted
+        state.wanted = None
+        state.editing = True
+        state.edit_times.append(time.monotonic())
+        try:
+            await state.channel.edit(topic=topic)
+            state.current = topic
+            self.num_edits += 1
+        except discord.HTTPException as e:
+            self.num_failed += 1
+            console.warning('Failed to edit the topic of channel {0}: {1}'.format(state.channel.id, e))
+        finally:
+            state.editing = False
+
+        if self._channels.get(state.channel.id) is not state:
+            return
+        if state.wanted is not None:
+            self._schedule(state, self.debounce)
+
+
+_updater = TopicUpdater()
+
+
+def set_topic(channel: discord.TextChannel, topic: str) -> None:
+    """Have the channel's topic edited soon, by the default topic updater. See TopicUpdater.set_topic."""
+    _updater.set_topic(channel, topic)
+
+
+def cancel(channel: discord.TextChannel) -> None:
+    """Drop any topic edit waiting for the channel in the default topic updater."""
+    _updater.cancel(channel)
+
+
+def get_updater() -> TopicUpdater:
+    return _updater
+
+
+class TestTopicUpdater(unittest.TestCase):
+    class Channel(object):
+        def __init__(self, channel_id: int):
+            self.id = channel_id
+            self.topics = []
+
+        async def edit(self, topic: str):
+            self.topics.append(topic)
+
+    def test_debounce(self):
+        a = TestTopicUpdater.Channel(1)
+        b = TestTopicUpdater.Channel(2)
+
+        async def run():
+            updater = TopicUpdater(debounce=0.05, edits_per_period=10, period=1, wheel=timerwheel.TimerWheel(0.01))
+            for idx in range(5):
+                updater.set_topic(a, 'a{0}'.format(idx))
+            updater.set_topic(b, 'b0')
+            self.assertEqual(a.topics, [])
+            await asyncio.sleep(0.1)
+            self.assertEqual(updater.num_coalesced, 4)
+
+            updater.set_topic(b, 'b0')
+            await asyncio.sleep(0.1)
+            self.assertEqual(updater.num_unchanged, 1)
+            self.assertEqual(updater.num_edits, 2)
+
+        asyncio.run(run())
+        self.assertEqual(a.topics, ['a4'])
+        self.assertEqual(b.topics, ['b0'])
+
+    def test_rate_limit(self):
+        a = TestTopicUpdater.Channel(1)
+
+        async def run():
+            updater = TopicUpdater(debounce=0.01, edits_per_period=2, period=0.3, wheel=timerwheel.TimerWheel(0.01))
+            start = time.monotonic()
+            for idx in range(3):
+                updater.set_topic(a, 'a{0}'.format(idx))
+                await asyncio.sleep(0.05)
+            self.assertEqual(a.topics, ['a0', 'a1'])
+            self.assertEqual(len(updater), 1)
+
+            updater.set_topic(a, 'a3')
+            await asyncio.sleep(0.4)
+            self.assertEqual(a.topics, ['a0', 'a1', 'a3'])
+            self.assertEqual(updater.num_coalesced, 1)
+            self.assertGreater(time.monotonic() - start, 0.3)
+
+        asyncio.run(run())
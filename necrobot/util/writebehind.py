@@ -0,0 +1,183 @@
+"""
+A write-behind queue for objects that write themselves to the database (`Match`es and `NecroUser`s).
+
+Setters decorated with `decorators.commits` mark their object dirty here rather than committing it immediately. A
+single writer task waits Config.DB_COMMIT_DELAY_MS, then commits each dirty object once, in the order they were first
+marked dirty, so that several changes in quick succession (e.g. `Match.suggest_time` then `Match.confirm_time`) cost
+one write. An object's own `commit()` also goes through the queue (see `commit()` here): it drops the object from the
+queue and waits for any write already in progress, so writes to the same object never race each other. Commit an
+object before publishing an event whose subscribers read it back from the database. Call `flush()` to write
+everything now, e.g. on shutdown or in tests.
+
+Queued objects must have a coroutine method write(), which writes the object to the database.
+"""
+
+import asyncio
+import collections
+import unittest
+from typing import Optional
+
+from necrobot.config import Config
+from necrobot.util import console
+
+
+class WriteBehindQueue(object):
+    def __init__(self, delay: Optional[float] = None):
+        """
+        Parameters
+        ----------
+        delay: Optional[float]
+            The number of seconds to wait before writing a dirty object. If None, Config.DB_COMMIT_DELAY_MS.
+        """
+        self._delay = delay
+        self._dirty = collections.OrderedDict()     # type: collections.OrderedDict
+        self._writer = None                         # type: Optional[asyncio.Task]
+        self._lock = asyncio.Lock()
+        self.num_marked = 0
+        self.num_written = 0
+        self.num_failed = 0
+
+    def __len__(self):
+        return len(self._dirty)
+
+    @property
+    def delay(self) -> float:
+        return self._delay if self._delay is not None else Config.DB_COMMIT_DELAY_MS / 1000
+
+    def mark_dirty(self, obj) -> None:
+        """Queue the object to be committed. Marking an object that is already queued doesn't change its place in the
+        queue.
+        """
+        # Keyed by identity, since NecroUser defines __eq__ and so isn't hashable
+        self._dirty[id(obj)] = obj
+        self.num_marked += 1
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write_after_delay())
+
+    async def commit(self, obj) -> None:
+        """Commit the object now, rather than after the delay. Drops it from the queue, and waits for any commits
+        already in progress. Errors are raised to the caller.
+        """
+        async with self._lock:
+            self._dirty.pop(id(obj), None)
+            await obj.write()
+            self.num_written += 1
+
+    async def flush(self) -> None:
+        """Commit every queued object now, and wait for any commits already in progress."""
+        async with self._lock:
+            while self._dirty:
+                _, obj = self._dirty.popitem(last=False)
+                try:
+                    await obj.write()
+                    self.num_written += 1
+                except Exception as e:
+                    self.num_failed += 1
+                    console.error('Write-behind commit of {0} failed: {1}: {2}'.format(
+                        repr(obj), type(e).__name__, e))
+
+    async def _write_after_delay(self) -> None:
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+
+_queue = WriteBehindQueue()
+
+
+def mark_dirty(obj) -> None:
+    """Queue the object to be committed by the default write-behind queue."""
+    _queue.mark_dirty(obj)
+
+
+async def commit(obj) -> None:
+    """Commit the object now, through the default write-behind queue. See WriteBehindQueue.commit."""
+    await _queue.commit(obj)
+
+
+async def flush() -> None:
+    """Commit every object queued in the default write-behind queue now."""
+    await _queue.flush()
+
+
+def get_queue() -> WriteBehindQueue:
+    return _queue
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    class Committer(object):
+        def __init__(self, name, log, fail=False):
+            self.name = name
+            self.log = log
+            self.fail = fail
+            self.value = 0
+
+        async def write(self):
+            if self.fail:
+                raise RuntimeError('failed')
+            value = self.value
+            await asyncio.sleep(0.01)
+            self.log.append((self.name, value))
+
+    def test_coalesce(self):
+        log = []
+        a = TestWriteBehindQueue.Committer('a', log)
+        b = TestWriteBehindQueue.Committer('b', log)
+
+        async def run():
+            queue = WriteBehindQueue(delay=0.01)
+            for value in range(1, 4):
+                a.value = value
+                queue.mark_dirty(a)
+                b.value = value
+                queue.mark_dirty(b)
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(queue), 0)
+            self.assertEqual(queue.num_written, 2)
+
+        asyncio.run(run())
+        self.assertEqual(log, [('a', 3), ('b', 3)])
+
+    def test_flush(self):
+        log = []
+        a = TestWriteBehindQueue.Committer('a', log)
+        bad = TestWriteBehindQueue.Committer('bad', log, fail=True)
+
+        async def run():
+            queue = WriteBehindQueue(delay=60)
+            queue.mark_dirty(bad)
+            queue.mark_dirty(a)
+            await queue.flush()
+            self.assertEqual(queue.num_failed, 1)
+            queue._writer.cancel()
+
+        asyncio.run(run())
+        self.assertEqual(log, [('a', 0)])
+
+    def test_commit(self):
+        log = []
+        a = TestWriteBehindQueue.Committer('a', log)
+        b = TestWriteBehindQueue.Committer('b', log)
+
+        async def run():
+            queue = WriteBehindQueue(delay=60)
+            a.value = 1
+            queue.mark_dirty(a)
+            queue.mark_dirty(b)
+            flushing = asyncio.ensure_future(queue.flush())
+            await asyncio.sleep(0)
+
+            # The flush is writing a; a direct commit of a waits for that write rather than racing it
+            a.value = 2
+            await queue.commit(a)
+            self.assertEqual(log[-1], ('a', 2))
+            await flushing
+
+            # A direct commit drops the object from the queue
+            b.value = 1
+            queue.mark_dirty(b)
+            await queue.commit(b)
+            self.assertEqual(len(queue), 0)
+            queue._writer.cancel()
+
+        asyncio.run(run())
+        self.assertEqual(log, [('a', 1), ('b', 0), ('a', 2), ('b', 1)])
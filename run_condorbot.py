@@ -6,6 +6,9 @@ from necrobot.condorbot.condorpmchannel import CondorPMChannel
 from necrobot.ladder import ratingutil
 from necrobot.league.leaguemgr import LeagueMgr
 from necrobot.match.matchmgr import MatchMgr
+from necrobot.database import dbmigrate
+from necrobot.race import racedb
+from necrobot.user import userlib
 from necrobot.util import console
 from necrobot import logon
 from necrobot.config import Config
@@ -25,6 +28,12 @@ async def load_condorbot_config(necrobot):
         console.warning('Could not find the "{0}" channel.'.format('adminchat'))
     necrobot.register_bot_channel(condor_admin_channel, CondorAdminChannel())
 
+    # Database
+    for line in await dbmigrate.check():
+        console.warning(line)
+    await racedb.load_race_types()
+    await userlib.load_user_index()
+
     # Managers (Order is important!)
     necrobot.register_manager(LeagueMgr())
     necrobot.register_manager(MatchMgr())
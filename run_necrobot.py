@@ -7,6 +7,9 @@ from necrobot.config import Config
 # from necrobot.match.matchmgr import MatchMgr
 from necrobot.racebot.mainchannel import MainBotChannel
 from necrobot.racebot.pmbotchannel import PMBotChannel
+from necrobot.database import dbmigrate
+from necrobot.race import racedb, raceutil
+from necrobot.user import userlib
 from necrobot.util import console
 from necrobot import logon
 
@@ -23,6 +26,15 @@ async def load_necrobot_config(necrobot):
         console.warning('Could not find the "{0}" channel.'.format(Config.MAIN_CHANNEL_NAME))
     necrobot.register_bot_channel(main_discord_channel, MainBotChannel())
 
+    # Database
+    for line in await dbmigrate.check():
+        console.warning(line)
+    await racedb.load_race_types()
+    await userlib.load_user_index()
+
+    # Race rooms that were open when the bot stopped
+    await raceutil.recover_rooms()
+
     # Ladder Channels
     # ladder_main_channel = server.find_channel(Config.LADDER_MAIN_CHANNEL_NAME)
     # if ladder_main_channel is None: